@@ -0,0 +1,262 @@
+"""
+Benchmark parser, language map, dictionaries và các exporter trên dữ liệu giả lập
+(benchmarks/synthetic.py), so sánh với baseline đã lưu.
+
+    python -m benchmarks.run --scales 1,10 --repeat 3
+    python -m benchmarks.run --save-baseline      # ghi benchmarks/baseline.json
+    python -m benchmarks.run --check              # exit 1 nếu chậm/tốn RAM hơn baseline
+"""
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from benchmarks.synthetic import BASE_KEYS, ZERO_PADDING_PATTERNS, generate_i2_dat
+from src import data_manager, exporter, metrics, parser
+from src.config import DATA_DIR, LANGUAGES
+from src.language_table import LanguageTable
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+WORK_DIR = DATA_DIR / "bench"
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[[], Any]
+
+
+def _cases(dat_path: Path, weapon_info: Path, out_dir: Path) -> List[Case]:
+    """Các hàm cần đo; dữ liệu đầu vào của mỗi hàm được chuẩn bị trước (không tính giờ)."""
+    table = LanguageTable.from_records(parser.iter_i2_records(dat_path, sort=True))
+    lang_map = data_manager.load_language_map(table)
+    index = data_manager.build_key_index(lang_map)
+    dictionaries = data_manager.build_dictionaries(table, lang_map, index)
+
+    return [
+        Case(
+            "parser.parse_i2_asset_file", lambda: parser.parse_i2_asset_file(dat_path)
+        ),
+        Case(
+            "parser.iter_i2_records(sort=True)",
+            lambda: sum(1 for _ in parser.iter_i2_records(dat_path, sort=True)),
+        ),
+        Case(
+            "data_manager.load_language_map",
+            lambda: data_manager.load_language_map(table),
+        ),
+        Case(
+            "data_manager.build_key_index",
+            lambda: data_manager.build_key_index(lang_map),
+        ),
+        Case(
+            "data_manager.build_dictionaries",
+            lambda: data_manager.build_dictionaries(table, lang_map, index),
+        ),
+        Case(
+            "exporter.write_i2_csv",
+            lambda: exporter.write_i2_csv("bench", table.records(), out_dir),
+        ),
+        Case(
+            "exporter.write_master_txt",
+            lambda: exporter.write_master_txt(
+                "bench", weapon_info, dictionaries, out_dir
+            ),
+        ),
+        Case(
+            "exporter.export_master_data_to_json",
+            lambda: exporter.export_master_data_to_json(
+                "bench", weapon_info, dictionaries, out_dir
+            ),
+        ),
+        Case(
+            "exporter.export_filtered_weapons_from_info",
+            lambda: exporter.export_filtered_weapons_from_info(
+                weapon_info, dictionaries["weapons"], out_dir / "weapons.json"
+            ),
+        ),
+        Case(
+            "exporter.export_weapon_evo_data",
+            lambda: exporter.export_weapon_evo_data(
+                lang_map, out_dir / "weapon_skins.json", index
+            ),
+        ),
+        Case(
+            "exporter.export_needed_data_from_langmap",
+            lambda: exporter.export_needed_data_from_langmap(
+                lang_map, out_dir / "needed_data.json", index
+            ),
+        ),
+    ]
+
+
+def _measure(case: Case, repeat: int) -> Dict[str, Any]:
+    """Chạy `repeat` lần để lấy thời gian, thêm một lần dưới tracemalloc để lấy peak RAM."""
+    walls: List[float] = []
+    cpus: List[float] = []
+    for _ in range(repeat):
+        gc.collect()
+        metrics.reset()
+        start_cpu = time.process_time()
+        start = time.perf_counter()
+        case.run()
+        walls.append(time.perf_counter() - start)
+        cpus.append(time.process_time() - start_cpu)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "wall_min": round(min(walls), 6),
+        "wall_median": round(statistics.median(walls), 6),
+        "cpu_median": round(statistics.median(cpus), 6),
+        "peak_alloc_kb": peak // 1024,
+    }
+
+
+def dataset_id(scale: float, languages: int, alias_density: float, padding: str) -> str:
+    return f"scale={scale:g},langs={languages},alias={alias_density:g},pad={padding}"
+
+
+def run_benchmarks(
+    scales: List[float],
+    languages: int,
+    alias_density: float,
+    padding: str,
+    repeat: int,
+    only: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Trả về {"<dataset>/<case>": số liệu} cho mọi scale."""
+    results: Dict[str, Dict[str, Any]] = {}
+    for scale in scales:
+        ds_id = dataset_id(scale, languages, alias_density, padding)
+        ds_dir = WORK_DIR / ds_id.replace(",", "_").replace("=", "-")
+        dat_path = ds_dir / "I2Languages.dat"
+        weapon_info = ds_dir / "WeaponInfo.txt"
+        if not dat_path.exists() or not weapon_info.exists():
+            print(f"Generating {ds_id}...", flush=True)
+            generate_i2_dat(
+                dat_path, int(BASE_KEYS * scale), languages, alias_density, padding
+            )
+
+        out_dir = ds_dir / "out"
+        out_dir.mkdir(exist_ok=True)
+        for case in _cases(dat_path, weapon_info, out_dir):
+            if only and not any(o in case.name for o in only):
+                continue
+            key = f"{ds_id}/{case.name}"
+            results[key] = _measure(case, repeat)
+            r = results[key]
+            print(
+                f"{key:<90} {r['wall_median']:>9.3f}s  "
+                f"{r['peak_alloc_kb'] / 1024:>8.1f} MB",
+                flush=True,
+            )
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    """In bảng so sánh với baseline, trả về danh sách case bị chậm/tốn RAM hơn ngưỡng."""
+    regressions: List[str] = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<90} (no baseline)")
+            continue
+        time_ratio = (
+            r["wall_median"] / base["wall_median"] if base["wall_median"] else 1.0
+        )
+        mem_ratio = (
+            r["peak_alloc_kb"] / base["peak_alloc_kb"] if base["peak_alloc_kb"] else 1.0
+        )
+        flag = ""
+        if time_ratio > tolerance or mem_ratio > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:<90} time x{time_ratio:.2f}  mem x{mem_ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the I2 parsing/export pipeline")
+    ap.add_argument(
+        "--scales",
+        default="1",
+        help=f"Danh sách bội số của {BASE_KEYS} key, vd. 1,10,100",
+    )
+    ap.add_argument("--languages", type=int, default=len(LANGUAGES))
+    ap.add_argument("--alias-density", type=float, default=0.05)
+    ap.add_argument("--zero-padding", choices=ZERO_PADDING_PATTERNS, default="sparse")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", nargs="*", help="Chỉ chạy case có tên chứa chuỗi này")
+    ap.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--check", action="store_true", help="Exit 1 nếu có regression")
+    ap.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.25,
+        help="Tỉ lệ so với baseline được coi là regression",
+    )
+    ap.add_argument("--output", type=Path, help="Ghi kết quả ra file JSON")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    scales = [float(s) for s in args.scales.split(",") if s]
+    results = run_benchmarks(
+        scales,
+        args.languages,
+        args.alias_density,
+        args.zero_padding,
+        args.repeat,
+        args.only,
+    )
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.save_baseline:
+        baseline = {}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        baseline.update(results)
+        report["results"] = baseline
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline} (run with --save-baseline)")
+        return
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+    print("\nComparison with baseline:")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions and args.check:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
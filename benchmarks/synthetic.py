@@ -0,0 +1,187 @@
+"""
+Sinh dữ liệu giả lập cho benchmark: I2Languages.dat đúng định dạng mà
+parser.parse_i2_asset_file đọc, và WeaponInfo JSON khớp với các key trong đó.
+
+    python -m benchmarks.synthetic data/bench --scale 10 --alias-density 0.1
+"""
+
+import argparse
+import json
+import random
+import struct
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from src.config import LANGUAGES
+from src.parser import I2_HEADER_SIZE
+
+# Số key ước lượng của bảng I2Languages hiện tại (scale 1)
+BASE_KEYS = 50_000
+
+ZERO_PADDING_PATTERNS = ("none", "sparse", "dense")
+
+_U32 = struct.Struct("<I")
+
+# Mẫu key theo các category trong src/categories.py (kèm tỉ lệ xuất hiện), phần
+# còn lại là key "text/<n>" không thuộc category nào
+_KEY_TEMPLATES = [
+    (0.04, "weapon/weapon_{n}"),
+    (0.03, "weapon_{n}_s_{k}"),
+    (0.01, "desc_evolution_weapon_{n}"),
+    (0.03, "Buff_name_{n}"),
+    (0.03, "Buff_info_{n}"),
+    (0.02, "task/{n}"),
+    (0.02, "task/{n}_title"),
+    (0.02, "task/{n}_desc"),
+    (0.02, "material_{n}"),
+    (0.01, "material_box_{n}"),
+    (0.02, "plant_{n}"),
+    (0.02, "Pet_name_{n}"),
+    (0.01, "Pet_name_{n}_des"),
+    (0.03, "Character{c}_name_skin{k}"),
+    (0.02, "Character{c}_skill_{k}_name"),
+]
+
+
+class SyntheticDataset(NamedTuple):
+    dat_path: Path
+    weapon_info_path: Path
+    keys: int
+    languages: int
+    aliases: int
+    size_bytes: int
+
+
+def _pad(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 4)
+
+
+def generate_keys(count: int, rng: random.Random) -> List[str]:
+    """Sinh `count` key không trùng, phân bố theo _KEY_TEMPLATES."""
+    keys: List[str] = []
+    for n in range(count):
+        roll = rng.random()
+        template = "text/entry_{n}"
+        for weight, candidate in _KEY_TEMPLATES:
+            if roll < weight:
+                template = candidate
+                break
+            roll -= weight
+        keys.append(template.format(n=n, c=n, k=rng.randint(0, 20)))
+    return keys
+
+
+def _field_text(rng: random.Random, lang_index: int, key: str) -> str:
+    words = rng.randint(1, 12)
+    text = " ".join(f"w{rng.randint(0, 9999)}" for _ in range(words))
+    if rng.random() < 0.05:
+        text += "\r\nline two"
+    if lang_index in (1, 2) and rng.random() < 0.5:
+        text += " 文本"
+    return f"{key}: {text}"
+
+
+def generate_i2_dat(
+    path: Path,
+    keys: int,
+    languages: int = len(LANGUAGES),
+    alias_density: float = 0.05,
+    zero_padding: str = "sparse",
+    seed: int = 1,
+) -> SyntheticDataset:
+    """
+    Ghi file I2Languages.dat giả lập:
+    - header I2_HEADER_SIZE byte, sau đó mỗi record là [u32 len][key][pad]
+      [u32 số field][([u32 len][text][pad]) * số field][u32 flag]
+    - alias_density: tỉ lệ field dạng "{key khác}" (alias, được resolve ở data_manager)
+    - zero_padding: "none", "sparse" (thỉnh thoảng chèn word 0 trước record / trước
+      số field) hoặc "dense" (chèn ở mọi record)
+    Trả về SyntheticDataset (WeaponInfo được ghi cạnh file .dat).
+    """
+    if zero_padding not in ZERO_PADDING_PATTERNS:
+        raise ValueError(f"Unknown zero padding pattern: {zero_padding}")
+
+    rng = random.Random(seed)
+    key_list = generate_keys(keys, rng)
+    aliases = 0
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\x07" * I2_HEADER_SIZE)
+        for key in key_list:
+            pad_record = zero_padding == "dense" or (
+                zero_padding == "sparse" and rng.random() < 0.1
+            )
+            if pad_record:
+                f.write(b"\0" * 4 * rng.randint(1, 4))
+            key_bytes = key.encode("utf-8")
+            f.write(_U32.pack(len(key_bytes)) + _pad(key_bytes))
+            if pad_record and rng.random() < 0.5:
+                f.write(_U32.pack(0))
+            f.write(_U32.pack(languages))
+            for lang in range(languages):
+                if rng.random() < alias_density:
+                    text = "{" + rng.choice(key_list) + "}"
+                    aliases += 1
+                elif rng.random() < 0.05:
+                    text = ""
+                else:
+                    text = _field_text(rng, lang, key)
+                data = text.encode("utf-8")
+                f.write(_U32.pack(len(data)) + _pad(data))
+            f.write(_U32.pack(1))
+
+    weapon_info_path = path.with_name("WeaponInfo.txt")
+    generate_weapon_info(weapon_info_path, key_list, rng)
+    return SyntheticDataset(
+        path, weapon_info_path, keys, languages, aliases, path.stat().st_size
+    )
+
+
+def generate_weapon_info(path: Path, keys: List[str], rng: random.Random) -> Path:
+    """WeaponInfo JSON với một entry cho mỗi key weapon/<id> (và vài id không có tên)."""
+    weapon_ids = [k.split("/", 1)[1] for k in keys if k.startswith("weapon/")]
+    weapon_ids += [f"weapon_000_xx{i}" for i in range(3)]
+    weapons: List[Dict] = [
+        {
+            "name": wid,
+            "forgeable": rng.random() < 0.3,
+            "isMelle": rng.random() < 0.4,
+            "level": rng.randint(0, 5),
+            "type": rng.choice(["gun", "sword", "staff", "bow"]),
+        }
+        for wid in weapon_ids
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"weapons": weapons}, f)
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Generate synthetic I2Languages data")
+    ap.add_argument("out_dir", type=Path)
+    ap.add_argument("--scale", type=float, default=1.0, help="Bội số của BASE_KEYS")
+    ap.add_argument("--languages", type=int, default=len(LANGUAGES))
+    ap.add_argument("--alias-density", type=float, default=0.05)
+    ap.add_argument(
+        "--zero-padding", choices=ZERO_PADDING_PATTERNS, default="sparse"
+    )
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    ds = generate_i2_dat(
+        args.out_dir / "I2Languages.dat",
+        int(BASE_KEYS * args.scale),
+        args.languages,
+        args.alias_density,
+        args.zero_padding,
+        args.seed,
+    )
+    print(
+        f"{ds.dat_path}: {ds.keys} keys, {ds.languages} languages, "
+        f"{ds.aliases} aliases, {ds.size_bytes / 1e6:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
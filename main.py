@@ -1,131 +1,377 @@
-import shutil
+import argparse
+import itertools
 import sys
 import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 # Import các module từ src
-from src import downloader, parser, exporter, utils, extractor, data_manager
-from src.config import EXPORT_DIR, OUTPUT_DIR
+from src import (
+    categories,
+    classifier,
+    downloader,
+    exporter,
+    utils,
+    extractor,
+    data_manager,
+    i2_cache,
+    manifest,
+    metrics,
+    output_writer,
+    parser,
+    pipeline,
+    sqlite_store,
+    version_store,
+)
+from src.artifact_store import Artifact
+from src.config import (
+    EXPORT_I2_CSV,
+    METRICS_DIR,
+    METRICS_FILE_NAME,
+    OUTPUT_COMPRESSION,
+    OUTPUT_DIR,
+    OUTPUT_PROFILE,
+    PIPELINE_MAX_WORKERS,
+    PROFILE_DIR_NAME,
+    SQLITE_STORE_ENABLED,
+    VERSION_STORE_ENABLED,
+)
 
 
-def main() -> None:
-    utils.setup_logger()
-    logging.info("Starting Soul Knight Data Extraction (Ubuntu/AssetStudioCLI Mode)")
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Soul Knight data extractor")
+    ap.add_argument(
+        "--force",
+        action="store_true",
+        help="Build lại kể cả khi output/<version> đã có manifest hoàn tất",
+    )
+    ap.add_argument(
+        "--profile",
+        nargs="*",
+        metavar="STAGE",
+        help="Chạy cProfile cho các stage (không ghi tên = mọi stage), ghi vào "
+        "data/metrics/<version>/profile/",
+    )
+    ap.add_argument(
+        "--output-profile",
+        choices=output_writer.PROFILES,
+        default=OUTPUT_PROFILE,
+        help="JSON indent 2 (pretty) hoặc minified",
+    )
+    ap.add_argument(
+        "--compress",
+        nargs="*",
+        choices=sorted(output_writer.COMPRESSION_SUFFIXES),
+        default=OUTPUT_COMPRESSION,
+        metavar="METHOD",
+        help="Ghi thêm bản nén cạnh mỗi output: gzip (.gz), br (.br)",
+    )
+    return ap.parse_args(argv)
 
-    # --- 1. Get Info, Download & Setup ---
-    try:
-        version, link = downloader.get_latest_apk_info()
-        logging.info(f"Latest version: {version}")
 
-        sk_extracted_path = downloader.ensure_apk_extracted(version, link)
-        downloader.ensure_asset_studio()
+def select_i2_artifact(extracted: Dict[str, List[Artifact]]) -> Artifact:
+    """Chọn file I2Languages (.dat, >= I2_MIN_SIZE) trong artifact của target i2language."""
+    i2_artifacts = [
+        a
+        for a in extracted.get("i2language", [])
+        if a.path.name.startswith("I2Languages") and a.size >= extractor.I2_MIN_SIZE
+    ]
+    i2_artifact = next(
+        (a for a in i2_artifacts if a.path.suffix == ".dat"),
+        next((a for a in i2_artifacts if a.path.suffix == ""), None),
+    )
+    if not i2_artifact:
+        raise FileNotFoundError("No valid I2Languages .dat file found (>= 2MB)")
+    return i2_artifact
 
-    except Exception as e:
-        logging.error(f"Initialization failed: {e}")
-        sys.exit(1)
 
-    # --- 2. Extract Assets ---
-    try:
-        logging.info("Starting AssetStudio extraction...")
-        extractor.run_asset_extractions(sk_extracted_path)
-    except Exception as e:
-        logging.error(f"Extraction failed: {e}")
-        sys.exit(1)
+def select_weapon_files(
+    extracted: Dict[str, List[Artifact]]
+) -> Tuple[Optional[Artifact], Optional[Artifact]]:
+    """(WeaponInfo, WeaponItem) trong artifact của từng target, None nếu không có."""
+    weapon_info = None
+    weapon_item = None
+    for a in extracted.get("WeaponInfo", []):
+        if "weaponinfo" in a.path.name.lower() and a.path.suffix == ".txt":
+            weapon_info = a
+    for a in extracted.get("WeaponItem", []):
+        if "weaponitem" in a.path.name.lower() and a.path.suffix == ".txt":
+            weapon_item = a
+    return weapon_info, weapon_item
 
-    # --- 3. Parse Data (I2Languages) ---
-    try:
-        # Tạo thư mục output theo version
-        version_output_dir = OUTPUT_DIR / version
-        version_output_dir.mkdir(parents=True, exist_ok=True)
-        logging.info(f"Output directory: {version_output_dir}")
 
-        # Tìm file I2Languages
-        i2_files = list(EXPORT_DIR.rglob("I2Languages*.dat"))
-        valid_i2 = None
-        for f in i2_files:
-            if f.stat().st_size >= 2_000_000:
-                valid_i2 = f
-                break
+def build_pipeline(version: str, link: str, output_dir: Path) -> pipeline.Pipeline:
+    """
+    Các bước xử lý một version dưới dạng DAG:
+    apk -> extract -> i2_file/weapon_files -> table -> lang_data -> các export.
+    Mỗi export là một target độc lập, chỉ chạy lại khi input (hash I2/WeaponInfo)
+    hoặc code liên quan thay đổi.
+    """
 
-        if not valid_i2:
-            # Fallback tìm file không đuôi
-            for f in EXPORT_DIR.rglob("I2Languages*"):
-                if f.is_file() and f.stat().st_size >= 2_000_000 and f.suffix == "":
-                    valid_i2 = f
-                    break
+    def extract(run: pipeline.PipelineRun) -> Dict[str, List[Artifact]]:
+        logging.info("Starting asset extraction...")
+        return extractor.run_asset_extractions(run.get("apk"))
 
-        if not valid_i2:
-            raise FileNotFoundError("No valid I2Languages .dat file found (>= 2MB)")
+    def parse_table(run: pipeline.PipelineRun):
+        i2_artifact = run.get("i2_file")
+        logging.info(f"Parsing I2 file: {i2_artifact.path.name}")
+        return i2_cache.cached_language_table(
+            i2_artifact.path, dat_hash=i2_artifact.sha256
+        )
 
-        logging.info(f"Parsing I2 file: {valid_i2.name}")
-        records, _ = parser.parse_i2_asset_file(valid_i2)
+    def lang_data(run: pipeline.PipelineRun) -> Dict[str, Any]:
+        table = run.get("table")
+        resolved = data_manager.resolve_language_maps(
+            table, ["English", "Chinese (Simplified)"]
+        )
+        full_lang_map = resolved["English"]
+        full_lang_map_cn = resolved["Chinese (Simplified)"]
+        # Phân loại key một lần, dùng chung cho dictionaries và mọi exporter
+        key_index = data_manager.build_key_index(full_lang_map, full_lang_map_cn)
+        return {
+            "en": full_lang_map,
+            "cn": full_lang_map_cn,
+            "key_index": key_index,
+            "dictionaries": data_manager.build_dictionaries(
+                table, full_lang_map, key_index
+            ),
+        }
 
-        csv_path = exporter.write_i2_csv(version, records, version_output_dir)
-        logging.info(f"Raw CSV exported: {csv_path}")
+    # Đổi output profile thì mọi target phải ghi lại
+    profile = output_writer.get_profile().to_json()
 
-    except Exception as e:
-        logging.error(f"Parsing failed: {e}")
-        sys.exit(1)
+    def i2_inputs(run: pipeline.PipelineRun) -> Dict[str, Any]:
+        return {"i2": run.get("i2_file").sha256, "profile": profile}
 
-    # --- 4. Process Data & Final Exports ---
-    try:
-        lang_maps = data_manager.build_dictionaries(csv_path)
-        full_lang_map = data_manager.load_language_map(csv_path, "English")
-        full_lang_map_cn = data_manager.load_language_map(
-            csv_path, "Chinese (Simplified)"
-        )
+    def weapon_inputs(run: pipeline.PipelineRun) -> Dict[str, Any]:
+        weapon_info, _ = run.get("weapon_files")
+        return {
+            "i2": run.get("i2_file").sha256,
+            "weapon_info": weapon_info.sha256 if weapon_info else None,
+            "profile": profile,
+        }
 
-        # --- XỬ LÝ WEAPON FILES (Info & Item) ---
-        weapon_info_file = None
-        weapon_item_file = None
+    def weapon_item_inputs(run: pipeline.PipelineRun) -> Dict[str, Any]:
+        _, weapon_item = run.get("weapon_files")
+        return {
+            "weapon_item": weapon_item.sha256 if weapon_item else None,
+            "profile": profile,
+        }
 
-        # 1. Quét thư mục MỘT LẦN duy nhất để tìm các file cần thiết
-        for f in EXPORT_DIR.iterdir():
-            name_lower = f.name.lower()
+    def output_files(*names: str) -> Tuple[Path, ...]:
+        return output_writer.with_siblings(output_dir / name for name in names)
 
-            if "weaponinfo" in name_lower and f.suffix == ".txt":
-                weapon_info_file = f
-            elif "weaponitem" in name_lower and f.suffix == ".txt":
-                weapon_item_file = f
+    def export_i2_csv(run: pipeline.PipelineRun) -> None:
+        csv_path = exporter.write_i2_csv(
+            version, run.get("table").records(), output_dir
+        )
+        logging.info(f"Raw CSV exported: {csv_path}")
 
-        # 2. Xử lý WeaponInfo (Parse & Export JSON)
-        if not weapon_info_file:
+    def export_master_data(run: pipeline.PipelineRun) -> None:
+        weapon_info, _ = run.get("weapon_files")
+        if not weapon_info:
             logging.warning("WeaponInfo.txt not found. Skipping weapon exports.")
-        else:
-            exporter.export_master_data_to_json(
-                version, weapon_info_file, lang_maps, version_output_dir
-            )
-            logging.info("Master data exported to multiple JSON files.")
-
-            exporter.export_filtered_weapons_from_info(
-                weapon_info_file,
-                lang_maps["weapons"],
-                version_output_dir / "weapons.json",
-            )
+            return
+        exporter.export_master_data_to_json(
+            version, weapon_info.path, run.get("lang_data")["dictionaries"], output_dir
+        )
+        logging.info("Master data exported to multiple JSON files.")
 
-        # 3. Xử lý WeaponItem
-        if not weapon_item_file:
-            logging.warning("WeaponItem file not found in export directory.")
-        else:
-            dest_path = version_output_dir / "weapon_items.json"
+    def export_weapons(run: pipeline.PipelineRun) -> None:
+        weapon_info, _ = run.get("weapon_files")
+        if not weapon_info:
+            return
+        exporter.export_filtered_weapons_from_info(
+            weapon_info.path,
+            run.get("lang_data")["dictionaries"]["weapons"],
+            output_dir / "weapons.json",
+        )
 
-            shutil.copy2(weapon_item_file, dest_path)
+    def copy_weapon_items(run: pipeline.PipelineRun) -> None:
+        _, weapon_item = run.get("weapon_files")
+        if not weapon_item:
+            logging.warning("WeaponItem file not found in extracted artifacts.")
+            return
+        dest_path = output_dir / "weapon_items.json"
+        if output_writer.copy_file(weapon_item.path, dest_path):
             logging.info(f"Copied and renamed WeaponItem to: {dest_path}")
 
+    def export_weapon_skins(run: pipeline.PipelineRun) -> None:
+        data = run.get("lang_data")
         exporter.export_weapon_evo_data(
-            full_lang_map, version_output_dir / "weapon_skins.json"
+            data["en"], output_dir / "weapon_skins.json", data["key_index"]
         )
-        exporter.export_needed_data_from_langmap(
-            full_lang_map, version_output_dir / "needed_data.json"
+
+    def export_needed_data(lang: str, file_name: str):
+        def run_export(run: pipeline.PipelineRun) -> None:
+            data = run.get("lang_data")
+            exporter.export_needed_data_from_langmap(
+                data[lang], output_dir / file_name, data["key_index"]
+            )
+
+        return run_export
+
+    lang_modules = (exporter, data_manager, categories, classifier)
+    stages = [
+        pipeline.Stage("apk", lambda run: downloader.ensure_apk_extracted(version, link)),
+        pipeline.Stage("extract", extract, deps=("apk",)),
+        pipeline.Stage(
+            "i2_file", lambda run: select_i2_artifact(run.get("extract")), ("extract",)
+        ),
+        pipeline.Stage(
+            "weapon_files",
+            lambda run: select_weapon_files(run.get("extract")),
+            ("extract",),
+        ),
+        pipeline.Stage("table", parse_table, deps=("i2_file",)),
+        pipeline.Stage("lang_data", lang_data, deps=("table",)),
+        pipeline.Stage(
+            "master_data",
+            export_master_data,
+            deps=("weapon_files", "lang_data"),
+            inputs=weapon_inputs,
+            outputs=output_files(*exporter.MASTER_DATA_FILES),
+            modules=lang_modules,
+        ),
+        pipeline.Stage(
+            "weapons",
+            export_weapons,
+            deps=("weapon_files", "lang_data"),
+            inputs=weapon_inputs,
+            outputs=output_files("weapons.json"),
+            modules=lang_modules,
+        ),
+        pipeline.Stage(
+            "weapon_items",
+            copy_weapon_items,
+            deps=("weapon_files",),
+            inputs=weapon_item_inputs,
+            outputs=output_files("weapon_items.json"),
+        ),
+        pipeline.Stage(
+            "weapon_skins",
+            export_weapon_skins,
+            deps=("lang_data",),
+            inputs=i2_inputs,
+            outputs=output_files("weapon_skins.json"),
+            modules=lang_modules,
+        ),
+        pipeline.Stage(
+            "needed_data",
+            export_needed_data("en", "needed_data.json"),
+            deps=("lang_data",),
+            inputs=i2_inputs,
+            outputs=output_files("needed_data.json"),
+            modules=lang_modules,
+        ),
+        pipeline.Stage(
+            "needed_data_cn",
+            export_needed_data("cn", "needed_data_cn.json"),
+            deps=("lang_data",),
+            inputs=i2_inputs,
+            outputs=output_files("needed_data_cn.json"),
+            modules=lang_modules,
+        ),
+    ]
+    if EXPORT_I2_CSV:
+        stages.append(
+            pipeline.Stage(
+                "i2_csv",
+                export_i2_csv,
+                deps=("table",),
+                inputs=i2_inputs,
+                outputs=output_files("I2language.csv"),
+                modules=(exporter, parser),
+            )
+        )
+    return pipeline.Pipeline(version, stages)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    utils.setup_logger()
+    metrics.reset()
+    output_writer.reset()
+    try:
+        output_writer.set_profile(
+            output_writer.OutputProfile(args.output_profile, tuple(args.compress))
         )
-        exporter.export_needed_data_from_langmap(
-            full_lang_map_cn, version_output_dir / "needed_data_cn.json"
+    except (ValueError, RuntimeError) as e:
+        logging.error(f"Invalid output profile: {e}")
+        sys.exit(1)
+    logging.info("Starting Soul Knight Data Extraction (Ubuntu/AssetStudioCLI Mode)")
+
+    # --- 1. Get Info ---
+    try:
+        version, link = downloader.get_latest_apk_info()
+        logging.info(f"Latest version: {version}")
+
+        version_output_dir = OUTPUT_DIR / version
+        if not args.force and manifest.is_version_complete(
+            version, version_output_dir
+        ):
+            logging.info(
+                f"Version {version} already exported and unchanged. Nothing to do "
+                "(use --force to rebuild)."
+            )
+            return
+        # Không xóa manifest cũ: nó chỉ được coi là hoàn tất khi mọi hash output
+        # còn khớp, và giữ nguyên thì build lại ra cùng output không tạo diff
+
+    except Exception as e:
+        logging.error(f"Initialization failed: {e}")
+        sys.exit(1)
+
+    # --- 2. Download, Extract, Parse & Export (chỉ các stage stale) ---
+    try:
+        version_output_dir.mkdir(parents=True, exist_ok=True)
+        logging.info(f"Output directory: {version_output_dir}")
+
+        workers = PIPELINE_MAX_WORKERS
+        if args.profile is not None:
+            metrics.enable_profiling(
+                args.profile, METRICS_DIR / version / PROFILE_DIR_NAME
+            )
+            # cProfile chỉ cho một profiler active: chạy tuần tự khi profile
+            workers = 1
+
+        run = build_pipeline(version, link, version_output_dir).run(
+            force=args.force, max_workers=workers
         )
+        logging.info(f"Executed stages: {', '.join(run.executed) or 'none'}")
 
+        weapon_info, weapon_item = run.get("weapon_files")
+        manifest.write_manifest(
+            version,
+            version_output_dir,
+            {
+                "apk": downloader.versioned_apk_path(version),
+                "i2languages": run.get("i2_file").path,
+                "weapon_info": weapon_info.path if weapon_info else None,
+                "weapon_item": weapon_item.path if weapon_item else None,
+            },
+        )
+        if VERSION_STORE_ENABLED:
+            version_store.VersionStore().add_version(version, version_output_dir)
+        if SQLITE_STORE_ENABLED:
+            i2_file = run.get("i2_file")
+            facts = sqlite_store.table_facts(run.get("table"))
+            weapon_facts = sqlite_store.weapon_output_facts(version_output_dir)
+            source_hash = "/".join(
+                a.sha256 if a else "" for a in (i2_file, weapon_info, weapon_item)
+            )
+            with sqlite_store.SQLiteStore() as store:
+                store.load_version(
+                    version, itertools.chain(facts, weapon_facts), source_hash
+                )
         logging.info("All exports completed successfully.")
 
     except Exception as e:
-        logging.error(f"Exporting failed: {e}")
+        logging.error(f"Pipeline failed: {e}")
         sys.exit(1)
+    finally:
+        metrics.record("outputs", **output_writer.log_summary())
+        metrics.write_report(METRICS_DIR / version / METRICS_FILE_NAME, version)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from .config import ARTIFACT_DIR
+from .utils import file_sha256
+
+# Tăng khi đổi cách trích xuất/lọc output để các artifact cũ không được dùng lại
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_MANIFEST_NAME = "artifacts.json"
+
+
+class Artifact(NamedTuple):
+    """Một file đã trích xuất trong store: đường dẫn, kích thước, sha256."""
+
+    path: Path
+    size: int
+    sha256: str
+
+
+def artifact_key(bundle_hash: str, asset_type: str, mode: str, filter_name: str) -> str:
+    """Key = hash(bundle, asset type, mode, filter tên) + version định dạng."""
+    h = hashlib.sha256()
+    h.update(
+        f"{ARTIFACT_FORMAT_VERSION}:{bundle_hash}:{asset_type.lower()}:{mode}:"
+        f"{filter_name.lower()}".encode()
+    )
+    return h.hexdigest()
+
+
+def _entry_dir(key: str) -> Path:
+    return ARTIFACT_DIR / key
+
+
+def load_artifacts(key: str) -> Optional[List[Artifact]]:
+    """
+    Danh sách artifact của key, hoặc None nếu chưa có / không còn nguyên vẹn.
+    Manifest được ghi sau cùng nên có manifest nghĩa là entry đã hoàn tất. Manifest
+    rỗng (không file nào) cũng coi như chưa có.
+    """
+    entry = _entry_dir(key)
+    manifest_file = entry / ARTIFACT_MANIFEST_NAME
+    if not manifest_file.exists():
+        return None
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        artifacts = [
+            Artifact(entry / item["name"], item["size"], item["sha256"])
+            for item in data["files"]
+        ]
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable artifact manifest {manifest_file}: {e}")
+        return None
+    if not artifacts:
+        logging.warning(f"Ignoring empty artifact manifest {manifest_file}")
+        return None
+
+    for a in artifacts:
+        if not a.path.exists() or a.path.stat().st_size != a.size:
+            logging.warning(f"Artifact {a.path} missing or modified; re-extracting")
+            return None
+    return artifacts
+
+
+def store_artifacts(key: str, files: List[Path], meta: Dict) -> List[Artifact]:
+    """
+    Chuyển các file vừa trích xuất vào ARTIFACT_DIR/<key>/ và ghi manifest
+    (tên, kích thước, sha256 của từng file + meta của target). Không lưu kết quả
+    rỗng: lần chạy sau phải trích xuất lại thay vì dùng lại một lần trích xuất hỏng.
+    """
+    if not files:
+        raise ValueError(f"Refusing to store empty artifact list ({meta})")
+    entry = _entry_dir(key)
+    if entry.exists():
+        shutil.rmtree(entry)
+    entry.mkdir(parents=True)
+
+    artifacts: List[Artifact] = []
+    for f in files:
+        dest = entry / f.name
+        shutil.move(str(f), str(dest))
+        artifacts.append(Artifact(dest, dest.stat().st_size, file_sha256(dest)))
+
+    data = dict(meta)
+    data["format"] = ARTIFACT_FORMAT_VERSION
+    data["files"] = [
+        {"name": a.path.name, "size": a.size, "sha256": a.sha256} for a in artifacts
+    ]
+    tmp = entry / (ARTIFACT_MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, entry / ARTIFACT_MANIFEST_NAME)
+    return artifacts
@@ -0,0 +1,44 @@
+from typing import Dict, List, Tuple
+from .classifier import KeyClassifier
+
+# Các bảng rule (category, pattern) cho KeyClassifier, thử theo thứ tự khai báo.
+# Mỗi bảng là một "view" của không gian key, được phân loại chung trong một lần quét
+# (xem data_manager.build_key_index).
+
+# build_dictionaries. Số group quyết định key lưu vào dict:
+#   0 group -> key gốc, 1 group -> group đó, 2 group -> dict lồng [g1][g2]
+DICTIONARY_CATEGORIES: List[Tuple[str, str]] = [
+    ("weapons", r"weapon/(.*)"),
+    ("buff_names", r"Buff_name_"),
+    ("buff_infos", r"Buff_info_"),
+    ("challenge_titles", r"task/([^_]+)_title"),
+    ("challenge_descs", r"task/([^_]+)_desc"),
+    ("challenge_names", r"task/([^_]+)"),
+    ("materials", r"material_"),
+    ("plants", r"plant_[^/]*\Z"),
+    ("pets", r"(?!.*_des\Z)(?!.*_lock\Z)Pet_name_"),
+    ("characters", r"Character(\d+)_name_skin(\d+)"),
+]
+
+# exporter.export_weapon_evo_data
+WEAPON_EVO_CATEGORIES: List[Tuple[str, str]] = [
+    ("skins", r"(weapon_\w+)_s_\d+\Z"),
+    ("evolutions", r"desc_evolution_(weapon_\w+)\Z"),
+]
+
+# exporter.export_needed_data_from_langmap
+NEEDED_DATA_CATEGORIES: List[Tuple[str, str]] = [
+    ("skin", r"Character(\d+)_name_skin(\d+)\Z"),
+    ("pet", r"Pet_name_(\d+)\Z"),
+    (
+        "material",
+        r"(material_(?!.*(?:activity|book|fragment|tape|skill|new|money|multi|box)).*)\Z",
+    ),
+    ("character_skill", r"(Character\d+_skill_\d+_name)\Z"),
+]
+
+KEY_VIEWS: Dict[str, KeyClassifier] = {
+    "dictionaries": KeyClassifier(DICTIONARY_CATEGORIES),
+    "weapon_evo": KeyClassifier(WEAPON_EVO_CATEGORIES),
+    "needed_data": KeyClassifier(NEEDED_DATA_CATEGORIES),
+}
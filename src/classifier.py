@@ -0,0 +1,82 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+Groups = Tuple[Optional[str], ...]
+
+
+class KeyClassifier:
+    """
+    Phân loại key bằng một regex duy nhất ghép từ bảng rule (category, pattern).
+    Rule được thử theo thứ tự khai báo (giống chuỗi if/elif) với re.match, nên pattern
+    muốn match toàn bộ key phải tự thêm \\Z. Group trong pattern được đánh số riêng
+    cho từng rule; không dùng backreference dạng số (\\1) trong pattern.
+    Nhiều rule có thể cùng trỏ về một category.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, str]]) -> None:
+        self.rules = list(rules)
+        self._slots: Dict[int, Tuple[str, int, int]] = {}
+
+        parts: List[str] = []
+        group = 1
+        for category, pattern in self.rules:
+            n_groups = re.compile(pattern).groups
+            # Group bọc ngoài của rule, các group con nằm ngay sau nó
+            self._slots[group] = (category, group, group + n_groups)
+            parts.append(f"({pattern})")
+            group += n_groups + 1
+
+        self._regex = re.compile("|".join(parts)) if parts else None
+
+    @property
+    def categories(self) -> List[str]:
+        """Danh sách category theo thứ tự khai báo (không trùng)."""
+        return list(dict.fromkeys(category for category, _ in self.rules))
+
+    def classify(self, key: str) -> Optional[Tuple[str, Groups]]:
+        """Trả về (category, groups của rule) hoặc None nếu không rule nào match."""
+        if self._regex is None:
+            return None
+        m = self._regex.match(key)
+        if m is None:
+            return None
+        category, outer, last = self._slots[m.lastindex]
+        return category, m.groups()[outer:last]
+
+
+class KeyIndex:
+    """
+    Kết quả phân loại key cho nhiều "view" (mỗi view là một KeyClassifier) trong
+    một lần quét. Một key có thể thuộc nhiều view khác nhau (vd. material_x vừa
+    là material trong dictionaries vừa là material trong needed_data).
+    """
+
+    def __init__(self, views: Dict[str, KeyClassifier]) -> None:
+        self._views = views
+        self._entries: Dict[str, Dict[str, List[Tuple[str, Groups]]]] = {
+            name: {category: [] for category in clf.categories}
+            for name, clf in views.items()
+        }
+        self._seen: Set[str] = set()
+
+    def add_keys(self, keys: Iterable[str]) -> None:
+        """Phân loại các key chưa gặp (giữ thứ tự xuất hiện)."""
+        seen = self._seen
+        views = [
+            (clf.classify, self._entries[name]) for name, clf in self._views.items()
+        ]
+        for key in keys:
+            if key in seen:
+                continue
+            seen.add(key)
+            for classify, entries in views:
+                hit = classify(key)
+                if hit is not None:
+                    entries[hit[0]].append((key, hit[1]))
+
+    def view(self, name: str) -> Dict[str, List[Tuple[str, Groups]]]:
+        """category -> list (key, groups) của một view."""
+        return self._entries[name]
+
+    def entries(self, view: str, category: str) -> List[Tuple[str, Groups]]:
+        return self._entries[view][category]
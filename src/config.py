@@ -25,6 +25,87 @@ EXPORT_DIR = DATA_DIR / "export"
 RAW_DUMP_DIR = DATA_DIR / "raw_dump"
 OUTPUT_DIR = PROJECT_ROOT / "output"
 
+# Các member trong APK mà pipeline cần (file cụ thể, hoặc thư mục nếu kết thúc bằng "/").
+# Chỉ những member này được giải nén, không extractall cả APK.
+APK_REQUIRED_MEMBERS: List[str] = [
+    "assets/bin/Data/data.unity3d",
+    "assets/bin/Data/Managed/",
+]
+# Index tên file -> đường dẫn (tương đối) của các member đã giải nén
+APK_MEMBER_INDEX_NAME = ".members.json"
+
 # AssetStudio Paths
 ASSET_STUDIO_DIR = DATA_DIR / "AssetStudio"
 ASSET_STUDIO_ZIP = DATA_DIR / "AssetStudio.zip"
+
+# Số record tối đa giữ trong RAM cho mỗi run khi sort I2 (external merge sort)
+I2_SORT_RUN_SIZE = 50_000
+
+# Cache nhị phân của bảng I2 đã parse (key = hash nội dung .dat)
+I2_CACHE_DIR = DATA_DIR / "cache" / "i2"
+I2_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Ghi I2language.csv (chỉ là một dạng serialize của LanguageTable)
+EXPORT_I2_CSV = True
+
+# Manifest hoàn tất cho mỗi output/<version>. Tăng PIPELINE_VERSION khi logic export
+# thay đổi để các version đã export được build lại.
+PIPELINE_VERSION = "1"
+MANIFEST_FILE_NAME = "manifest.json"
+
+# Download engine (http_download)
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_SEGMENT_SIZE = 8 * 1024 * 1024
+DOWNLOAD_PARALLEL_MIN_SIZE = 16 * 1024 * 1024
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_BACKOFF_SECONDS = 1.0
+
+# Cache metadata HTTP (ETag/Last-Modified + kết quả đã parse) cho các lookup version
+HTTP_CACHE_FILE = DATA_DIR / "cache" / "http_meta.json"
+HTTP_CACHE_TTL_SECONDS = 600
+
+# Số job AssetStudioModCLI chạy song song tối đa và timeout cho mỗi job
+ASSET_STUDIO_MAX_WORKERS = 2
+ASSET_STUDIO_TIMEOUT_SECONDS = 1800
+
+# Backend trích xuất asset: "native" (đọc UnityFS bằng Python), "assetstudio" (CLI)
+# hoặc "auto" (thử native, lỗi thì fallback sang CLI)
+EXTRACTION_BACKEND = "auto"
+
+# Index object (tên, loại, path ID -> block/offset) của data.unity3d, theo hash bundle
+OBJECT_INDEX_DIR = DATA_DIR / "cache" / "objects"
+
+# Artifact store: output trích xuất theo (hash bundle, asset type, mode, filter)
+ARTIFACT_DIR = DATA_DIR / "cache" / "artifacts"
+
+# State của pipeline (fingerprint mỗi stage) và số stage chạy song song tối đa
+PIPELINE_STATE_DIR = DATA_DIR / "state"
+PIPELINE_MAX_WORKERS = 4
+
+# Báo cáo đo đạc (metrics.json) và thư mục cProfile (--profile) trong
+# METRICS_DIR/<version>, ngoài output/ để số liệu thời gian không tạo commit mới
+METRICS_DIR = DATA_DIR / "metrics"
+METRICS_FILE_NAME = "metrics.json"
+PROFILE_DIR_NAME = "profile"
+
+# Số task export (build + ghi một file JSON) chạy song song tối đa
+EXPORT_MAX_WORKERS = 4
+
+# Profile của output: "pretty" (JSON indent 2) hoặc "minified"; OUTPUT_COMPRESSION là
+# các bản nén ghi cạnh mỗi output ("gzip" -> .gz, "br" -> .br, cần package brotli)
+OUTPUT_PROFILE = "pretty"
+OUTPUT_COMPRESSION: List[str] = []
+
+# Kho version dạng delta: snapshot đầy đủ mỗi VERSION_SNAPSHOT_INTERVAL version, các
+# version còn lại lưu delta so với version trước; cache các version đã dựng lại.
+# VERSION_STORE_ENABLED: main thêm mỗi version export xong vào kho
+VERSION_STORE_ENABLED = False
+VERSION_STORE_DIR = PROJECT_ROOT / "history"
+VERSION_CACHE_DIR = DATA_DIR / "cache" / "versions"
+VERSION_SNAPSHOT_INTERVAL = 10
+VERSION_CACHE_SIZE = 4
+
+# SQLite chứa mọi version (I2 theo ngôn ngữ, các category, WeaponInfo/WeaponItem) để
+# truy vấn chéo version; SQLITE_STORE_ENABLED: main nạp mỗi version export xong
+SQLITE_STORE_ENABLED = False
+SQLITE_DB_PATH = DATA_DIR / "sk_data.sqlite3"
@@ -1,121 +1,202 @@
-import csv
-import re
 import logging
 from pathlib import Path
-from typing import Dict, Set, Optional, Any
+from typing import Dict, List, Set, Optional, Any, Union
+from . import metrics
+from .categories import KEY_VIEWS
+from .classifier import KeyIndex
+from .language_table import LanguageTable
 
+LanguageSource = Union[Path, LanguageTable]
 
-def load_language_map(csv_path: Path, language: str = "English") -> Dict[str, str]:
+
+def _as_table(source: LanguageSource) -> LanguageTable:
+    if isinstance(source, LanguageTable):
+        return source
+    return LanguageTable.from_csv(source)
+
+
+def _alias_ref(value: str) -> Optional[str]:
+    if value.startswith("{") and value.endswith("}"):
+        return value[1:-1]
+    return None
+
+
+def _alias_sccs(graph: Dict[str, Set[str]]) -> List[List[str]]:
+    """
+    Tarjan (không đệ quy) trên đồ thị alias key -> ref.
+    Trả về các thành phần liên thông mạnh theo thứ tự phụ thuộc trước
+    (ref luôn được xử lý trước key trỏ tới nó).
+    """
+    index: Dict[str, int] = {}
+    lowlink: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    sccs: List[List[str]] = []
+
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph[root]))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+
+        while work:
+            node, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in graph:
+                    continue
+                if child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph[child])))
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                scc = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    scc.append(member)
+                    if member == node:
+                        break
+                sccs.append(scc)
+
+    return sccs
+
+
+@metrics.timed(records=lambda maps: sum(len(m) for m in maps.values()))
+def resolve_language_maps(
+    source: LanguageSource, languages: Optional[List[str]] = None
+) -> Dict[str, Dict[str, str]]:
     """
-    Load CSV và resolve các alias như {boss18} -> boss18 -> final string.
+    Resolve alias ({boss18} -> boss18 -> final string) cho nhiều ngôn ngữ cùng lúc.
+    Đồ thị alias được build một lần cho mọi ngôn ngữ rồi resolve theo thứ tự topo,
+    không đệ quy. Alias vòng được log warning và thay bằng "[Cyclic alias: key]".
+    Ref tới key không tồn tại resolve thành "" (và được thêm vào map như trước đây).
     """
-    raw_map: Dict[str, str] = {}
-    resolved_map: Dict[str, str] = {}
-
-    if not csv_path.exists():
-        raise FileNotFoundError(f"CSV path not found: {csv_path}")
-
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            rid = row["id"].strip()
-            # Fallback nếu ngôn ngữ không tồn tại trong row
-            eng = row.get(language, "").strip()
-            raw_map[rid] = eng
-
-    def resolve(key: str, visited: Optional[Set[str]] = None) -> str:
-        if key in resolved_map:
-            return resolved_map[key]
-        if visited is None:
-            visited = set()
-        if key in visited:
-            return f"[Cyclic alias: {key}]"
-        visited.add(key)
-
-        val = raw_map.get(key, "")
-        if val.startswith("{") and val.endswith("}"):
-            ref = val[1:-1]
-            resolved = resolve(ref, visited)
-            resolved_map[key] = resolved
-            return resolved
-        else:
-            resolved_map[key] = val
-            return val
-
-    # Resolve everything
-    for k in raw_map:
-        resolve(k)
-
-    return resolved_map
-
-
-def build_dictionaries(csv_path: Path) -> Dict[str, Any]:
+    table = _as_table(source)
+    if languages is None:
+        languages = table.languages
+
+    # Fallback "" nếu ngôn ngữ không tồn tại trong bảng
+    resolved = {lang: table.raw_map(lang) for lang in languages}
+
+    # Cạnh alias theo từng ngôn ngữ và đồ thị hợp (key -> các ref)
+    edges: Dict[str, Dict[str, str]] = {lang: {} for lang in languages}
+    graph: Dict[str, Set[str]] = {}
+    for lang, raw in resolved.items():
+        lang_edges = edges[lang]
+        for key, value in raw.items():
+            ref = _alias_ref(value)
+            if ref is not None:
+                lang_edges[key] = ref
+                graph.setdefault(key, set()).add(ref)
+
+    for scc in _alias_sccs(graph):
+        cyclic = len(scc) > 1 or scc[0] in graph[scc[0]]
+        for lang in languages:
+            lang_map = resolved[lang]
+            lang_edges = edges[lang]
+            if not cyclic:
+                key = scc[0]
+                ref = lang_edges.get(key)
+                if ref is not None:
+                    lang_map[key] = lang_map.setdefault(ref, "")
+                continue
+
+            # Trong SCC: đi theo chuỗi alias của ngôn ngữ này cho tới khi gặp
+            # giá trị đã resolve (ngoài SCC) hoặc quay lại một key trên chuỗi.
+            members = set(scc)
+            done: Set[str] = set()
+            for start in sorted(scc):
+                if start in done or start not in lang_edges:
+                    continue
+                chain = [start]
+                node = lang_edges[start]
+                while True:
+                    if node in chain:
+                        value = f"[Cyclic alias: {node}]"
+                        logging.warning(
+                            f"Cyclic alias in {lang}: {' -> '.join(chain + [node])}"
+                        )
+                        break
+                    if node not in members or node in done or node not in lang_edges:
+                        value = lang_map.setdefault(node, "")
+                        break
+                    chain.append(node)
+                    node = lang_edges[node]
+                for k in chain:
+                    lang_map[k] = value
+                    done.add(k)
+
+    return resolved
+
+
+@metrics.timed(records=len)
+def load_language_map(
+    source: LanguageSource, language: str = "English"
+) -> Dict[str, str]:
+    """
+    Lấy map của một ngôn ngữ từ LanguageTable (hoặc CSV) và resolve các alias
+    như {boss18} -> boss18 -> final string.
+    """
+    return resolve_language_maps(source, [language])[language]
+
+
+@metrics.timed()
+def build_key_index(*lang_maps: Dict[str, str]) -> KeyIndex:
+    """
+    Phân loại key của một hoặc nhiều language map (theo mọi view trong
+    categories.KEY_VIEWS) trong một lần quét. Kết quả dùng chung cho
+    build_dictionaries và các exporter, cho mọi ngôn ngữ.
+    """
+    index = KeyIndex(KEY_VIEWS)
+    for lang_map in lang_maps:
+        index.add_keys(lang_map)
+    return index
+
+
+@metrics.timed(
+    records=lambda maps: sum(len(m) for m in maps.values() if isinstance(m, dict))
+)
+def build_dictionaries(
+    source: LanguageSource,
+    lang_map: Optional[Dict[str, str]] = None,
+    index: Optional[KeyIndex] = None,
+) -> Dict[str, Any]:
     """
     Đọc resolved language map và build các từ điển lookup (weapons, pets...).
+    Truyền `lang_map` (English đã resolve) để tránh resolve lại, và `index`
+    (build_key_index) để dùng chung kết quả phân loại key.
     """
-    logging.info("Building data dictionaries from CSV...")
-    lang_map = load_language_map(csv_path)
-
-    weapons_map = {}
-    buff_names = {}
-    buff_infos = {}
-    challenge_names = {}
-    challenge_titles = {}
-    challenge_descs = {}
-    materials = {}
-    plant_ids = {}
-    pets = {}
-    characters: Dict[str, Dict[str, str]] = {}
-
-    for rid, eng in lang_map.items():
-        if rid.startswith("weapon/"):
-            weapons_map[rid.replace("weapon/", "")] = eng
-
-        elif rid.startswith("Buff_name_"):
-            buff_names[rid] = eng
-        elif rid.startswith("Buff_info_"):
-            buff_infos[rid] = eng
-
-        elif rid.startswith("task/"):
-            m = re.match(r"task/([^_]+)(_title|_desc)?", rid)
-            if not m:
+    logging.info("Building data dictionaries...")
+    if lang_map is None:
+        lang_map = load_language_map(source)
+    if index is None:
+        index = build_key_index(lang_map)
+
+    result: Dict[str, Any] = {}
+    for category, entries in index.view("dictionaries").items():
+        target: Dict[str, Any] = {}
+        for rid, groups in entries:
+            if rid not in lang_map:
                 continue
-            cid, suffix = m.groups()
-            if suffix == "_title":
-                challenge_titles[cid] = eng
-            elif suffix == "_desc":
-                challenge_descs[cid] = eng
+            eng = lang_map[rid]
+            if not groups:
+                target[rid] = eng
+            elif len(groups) == 1:
+                target[groups[0]] = eng
             else:
-                challenge_names[cid] = eng
-
-        elif rid.startswith("material_"):
-            materials[rid] = eng
-
-        elif rid.startswith("plant_") and "/" not in rid:
-            plant_ids[rid] = eng
-
-        elif (
-            rid.startswith("Pet_name_")
-            and not rid.endswith("_des")
-            and not rid.endswith("_lock")
-        ):
-            pets[rid] = eng
-
-        else:
-            m = re.match(r"Character(\d+)_name_skin(\d+)", rid)
-            if m:
-                char_index, skin_index = m.groups()
-                characters.setdefault(char_index, {})[skin_index] = eng
-
-    return {
-        "weapons": weapons_map,
-        "buff_names": buff_names,
-        "buff_infos": buff_infos,
-        "challenge_names": challenge_names,
-        "challenge_titles": challenge_titles,
-        "challenge_descs": challenge_descs,
-        "materials": materials,
-        "plants": plant_ids,
-        "pets": pets,
-        "characters": characters,
-    }
+                target.setdefault(groups[0], {})[groups[1]] = eng
+        result[category] = target
+
+    return result
@@ -0,0 +1,393 @@
+"""
+Diff hai version output (output/<old> và output/<new>) thành changelog có cấu trúc:
+mỗi Change là một entry được thêm/xóa/sửa trong một category (bảng I2 hoặc một file
+JSON), kèm giá trị cũ/mới của từng ngôn ngữ (I2) hoặc từng field (JSON).
+
+Cả hai phía được duyệt theo key đã sort rồi merge-join, nên thời gian tuyến tính
+theo số entry. I2language.csv do pipeline ghi đã sort theo key (LanguageTable) nên
+được stream thẳng, không load cả bảng vào RAM; thứ tự được kiểm tra khi đọc. CSV
+chưa sort thì dùng presorted=False (--unsorted): sort ngoài bằng
+parser.sort_records_external, RAM giới hạn theo I2_SORT_RUN_SIZE.
+
+    python -m src.differ 7.7.0 7.7.1 -o changelog.jsonl
+    python -m src.differ --history data/changelogs
+"""
+
+import argparse
+import csv
+import json
+import logging
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+from .config import OUTPUT_DIR
+from .parser import Record, sort_records_external
+
+I2_CSV_NAME = "I2language.csv"
+
+Entries = Iterable[Tuple[str, Dict[str, Any]]]
+
+
+class Change(NamedTuple):
+    category: str
+    key: str
+    op: str  # "added" | "removed" | "changed"
+    # ngôn ngữ (I2) hoặc đường dẫn field (JSON) -> [giá trị cũ, giá trị mới]
+    fields: Dict[str, List[Any]]
+
+    def to_json(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+def _last_per_key(entries: Iterable[Tuple[str, Any]]) -> Iterator[Tuple[str, Any]]:
+    """Luồng đã sort theo key: key trùng nhau chỉ giữ entry cuối (như dict)."""
+    it = iter(entries)
+    prev = next(it, None)
+    for entry in it:
+        if entry[0] != prev[0]:
+            yield prev
+        prev = entry
+    if prev is not None:
+        yield prev
+
+
+def merge_join(
+    old: Iterable[Tuple[str, Any]], new: Iterable[Tuple[str, Any]]
+) -> Iterator[Tuple[str, Optional[Any], Optional[Any]]]:
+    """
+    Ghép hai luồng (key, value) đã sort theo key: yield (key, old value, new value),
+    None ở phía không có key đó. Key trùng trong một luồng được gộp, giữ giá trị cuối
+    (giống bảng I2 và các file JSON khi load thành dict).
+    """
+    old_it, new_it = _last_per_key(old), _last_per_key(new)
+    o, n = next(old_it, None), next(new_it, None)
+    while o is not None or n is not None:
+        if n is None or (o is not None and o[0] < n[0]):
+            yield o[0], o[1], None
+            o = next(old_it, None)
+        elif o is None or n[0] < o[0]:
+            yield n[0], None, n[1]
+            n = next(new_it, None)
+        else:
+            yield o[0], o[1], n[1]
+            o, n = next(old_it, None), next(new_it, None)
+
+
+def _diff_entry(
+    category: str,
+    key: str,
+    old: Optional[Dict[str, Any]],
+    new: Optional[Dict[str, Any]],
+) -> Optional[Change]:
+    if old is None:
+        return Change(category, key, "added", {f: [None, v] for f, v in new.items()})
+    if new is None:
+        return Change(category, key, "removed", {f: [v, None] for f, v in old.items()})
+    fields = {
+        f: [old.get(f), new.get(f)]
+        for f in sorted(old.keys() | new.keys())
+        if old.get(f) != new.get(f)
+    }
+    return Change(category, key, "changed", fields) if fields else None
+
+
+# --- Bảng I2 ---
+
+
+def _check_sorted(records: Iterable[Record], source: Path) -> Iterator[Record]:
+    last = None
+    for record in records:
+        # Key trùng là hợp lệ (merge_join giữ record cuối), chỉ key giảm là lỗi
+        if last is not None and record[0] < last:
+            raise ValueError(
+                f"{source} is not sorted by key ({last!r} before {record[0]!r}); "
+                "diff with presorted=False (--unsorted)"
+            )
+        last = record[0]
+        yield record
+
+
+def read_csv_header(csv_path: Path) -> List[str]:
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        return next(csv.reader(f), ["id"])[1:]
+
+
+def iter_csv_records(csv_path: Path, presorted: bool = True) -> Iterator[Record]:
+    """Record (key, [fields...]) của I2language.csv theo key đã sort."""
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        records: Iterable[Record] = ((row[0], row[1:]) for row in reader if row)
+        if presorted:
+            yield from _check_sorted(records, csv_path)
+        else:
+            yield from sort_records_external(records)
+
+
+def _language_texts(
+    fields: Optional[List[str]], columns: List[Tuple[int, str]]
+) -> Optional[Dict[str, str]]:
+    """{ngôn ngữ: text} của các cột được chọn, bỏ ô rỗng."""
+    if fields is None:
+        return None
+    return {lang: fields[i] for i, lang in columns if i < len(fields) and fields[i]}
+
+
+def diff_i2(
+    old_csv: Path,
+    new_csv: Path,
+    languages: Optional[List[str]] = None,
+    presorted: bool = True,
+) -> Iterator[Change]:
+    """Thay đổi của bảng I2 giữa hai CSV, theo từng ngôn ngữ."""
+    old_header, new_header = read_csv_header(old_csv), read_csv_header(new_csv)
+    old_columns, new_columns = (
+        [(i, lang) for i, lang in enumerate(h) if not languages or lang in languages]
+        for h in (old_header, new_header)
+    )
+    same_layout = old_header == new_header
+    for key, old, new in merge_join(
+        iter_csv_records(old_csv, presorted), iter_csv_records(new_csv, presorted)
+    ):
+        # Phần lớn record không đổi giữa hai version: so sánh nguyên dòng trước
+        if same_layout and old == new:
+            continue
+        change = _diff_entry(
+            "i2",
+            key,
+            _language_texts(old, old_columns),
+            _language_texts(new, new_columns),
+        )
+        if change is not None:
+            yield change
+
+
+# --- Các file JSON ---
+
+
+def _flatten(value: Any, prefix: str = "") -> Dict[str, Any]:
+    """Dict lồng nhau -> {"a.b": giá trị}; list và giá trị đơn giữ nguyên."""
+    if not isinstance(value, dict):
+        return {prefix or "value": value}
+    out: Dict[str, Any] = {}
+    for k, v in value.items():
+        path = f"{prefix}.{k}" if prefix else str(k)
+        if isinstance(v, dict) and v:
+            out.update(_flatten(v, path))
+        else:
+            out[path] = v
+    return out
+
+
+def _by_key(data: Dict[str, Any]) -> Entries:
+    return ((str(k), _flatten(v)) for k, v in data.items())
+
+
+def _by_field(field: str) -> Callable[[List[Dict[str, Any]]], Entries]:
+    def entries(data: List[Dict[str, Any]]) -> Entries:
+        for item in data:
+            rest = {k: v for k, v in item.items() if k != field}
+            yield str(item.get(field)), _flatten(rest)
+
+    return entries
+
+
+def _by_section(data: Dict[str, Dict[str, Any]]) -> Entries:
+    return (
+        (f"{section}/{k}", _flatten(v))
+        for section, items in data.items()
+        for k, v in items.items()
+    )
+
+
+# file JSON trong output/<version> -> (category, hàm tách entry (key, fields))
+JSON_CATEGORIES: Dict[str, Tuple[str, Callable[[Any], Entries]]] = {
+    "all_weapons_info.json": ("weapons_info", _by_field("id")),
+    "weapons.json": ("weapons", _by_key),
+    "weapon_skins.json": ("weapon_skins", lambda d: _by_key(d.get("weapons", {}))),
+    "weapon_items.json": (
+        "weapon_items",
+        lambda d: _by_field("name")(d.get("weaponItemInfos", [])),
+    ),
+    "characters_info.json": ("characters", _by_key),
+    "highest_skin_ids.json": ("highest_skin_ids", _by_key),
+    "pets_info.json": ("pets", _by_field("id")),
+    "buffs_info.json": ("buffs", _by_field("id")),
+    "challenges_info.json": ("challenges", _by_field("id")),
+    "materials_info.json": ("materials", _by_field("id")),
+    "plants_info.json": ("plants", _by_field("id")),
+    "needed_data.json": ("needed_data", _by_section),
+    "needed_data_cn.json": ("needed_data_cn", _by_section),
+}
+
+
+def _json_entries(
+    path: Path, split: Callable[[Any], Entries]
+) -> List[Tuple[str, Dict[str, Any]]]:
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # Các file đều đã sort theo key (hoặc gần như vậy) nên sort ở đây gần tuyến tính
+    return sorted(split(data), key=lambda entry: entry[0])
+
+
+def diff_json(old_path: Path, new_path: Path) -> Iterator[Change]:
+    """Thay đổi giữa hai phiên bản của một file JSON trong JSON_CATEGORIES."""
+    category, split = JSON_CATEGORIES[new_path.name]
+    for key, old, new in merge_join(
+        _json_entries(old_path, split), _json_entries(new_path, split)
+    ):
+        change = _diff_entry(category, key, old, new)
+        if change is not None:
+            yield change
+
+
+def diff_versions(
+    old_dir: Path,
+    new_dir: Path,
+    languages: Optional[List[str]] = None,
+    categories: Optional[List[str]] = None,
+    presorted: bool = True,
+) -> Iterator[Change]:
+    """
+    Mọi thay đổi giữa hai thư mục output, theo thứ tự category rồi key. File không
+    có ở cả hai phía được bỏ qua; có ở một phía thì mọi entry là added/removed.
+    """
+    if not categories or "i2" in categories:
+        old_csv, new_csv = old_dir / I2_CSV_NAME, new_dir / I2_CSV_NAME
+        if old_csv.exists() and new_csv.exists():
+            yield from diff_i2(old_csv, new_csv, languages, presorted)
+        elif old_csv.exists() or new_csv.exists():
+            logging.warning(f"{I2_CSV_NAME} only in one version, skipping I2 diff")
+
+    for file_name, (category, _) in JSON_CATEGORIES.items():
+        if categories and category not in categories:
+            continue
+        old_path, new_path = old_dir / file_name, new_dir / file_name
+        if old_path.exists() or new_path.exists():
+            yield from diff_json(old_path, new_path)
+
+
+def write_changelog(changes: Iterable[Change], path: Path) -> Dict[str, Dict[str, int]]:
+    """
+    Ghi changelog dạng JSON Lines (một Change mỗi dòng, ghi dần khi nhận được).
+    Trả về summary(): số added/removed/changed theo category.
+    """
+    counts: Dict[str, Counter] = {}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for change in changes:
+            f.write(json.dumps(change.to_json(), ensure_ascii=False) + "\n")
+            _count(counts, change)
+    return _summary(counts)
+
+
+def _count(counts: Dict[str, Counter], change: Change) -> None:
+    c = counts.setdefault(change.category, Counter())
+    c[change.op] += 1
+    if change.category == "i2":
+        # Số text thay đổi theo từng ngôn ngữ
+        for lang in change.fields:
+            c[f"{change.op}:{lang}"] += 1
+
+
+def _summary(counts: Dict[str, Counter]) -> Dict[str, Dict[str, int]]:
+    return {category: dict(sorted(c.items())) for category, c in sorted(counts.items())}
+
+
+def version_key(version: str) -> Tuple:
+    return tuple(int(p) if p.isdigit() else p for p in re.split(r"[.\-_]", version))
+
+
+def list_versions(output_root: Path = OUTPUT_DIR) -> List[str]:
+    """Các version có trong output/, sort theo số version."""
+    if not output_root.exists():
+        return []
+    versions = [p.name for p in output_root.iterdir() if p.is_dir()]
+    return sorted(versions, key=version_key)
+
+
+def _version_dir(value: str) -> Path:
+    path = Path(value)
+    return path if path.is_dir() else OUTPUT_DIR / value
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Diff two exported versions")
+    ap.add_argument("old", nargs="?", help="Version (trong output/) hoặc thư mục")
+    ap.add_argument("new", nargs="?", help="Version (trong output/) hoặc thư mục")
+    ap.add_argument("-o", "--output", type=Path, help="Ghi changelog JSON Lines")
+    ap.add_argument("--languages", nargs="*", help="Chỉ so sánh các ngôn ngữ này (I2)")
+    ap.add_argument(
+        "--categories",
+        nargs="*",
+        choices=["i2"] + [c for c, _ in JSON_CATEGORIES.values()],
+        help="Chỉ so sánh các category này",
+    )
+    ap.add_argument(
+        "--unsorted",
+        action="store_true",
+        help="I2language.csv không sort theo key (sort ngoài trước khi so sánh)",
+    )
+    ap.add_argument(
+        "--history",
+        type=Path,
+        metavar="DIR",
+        help="Diff mọi cặp version liên tiếp trong output/, ghi DIR/<old>..<new>.jsonl",
+    )
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.history:
+        versions = list_versions()
+        for old, new in zip(versions, versions[1:]):
+            path = args.history / f"{old}..{new}.jsonl"
+            summary = write_changelog(
+                diff_versions(
+                    OUTPUT_DIR / old,
+                    OUTPUT_DIR / new,
+                    args.languages,
+                    args.categories,
+                    not args.unsorted,
+                ),
+                path,
+            )
+            print(f"{old} -> {new}: {json.dumps(summary, ensure_ascii=False)}")
+        return
+
+    if not args.old or not args.new:
+        ap.error("old and new are required unless --history is given")
+    old_dir, new_dir = _version_dir(args.old), _version_dir(args.new)
+    for d in (old_dir, new_dir):
+        if not d.is_dir():
+            ap.error(f"Output directory not found: {d}")
+
+    changes = diff_versions(
+        old_dir, new_dir, args.languages, args.categories, not args.unsorted
+    )
+    if args.output:
+        summary = write_changelog(changes, args.output)
+    else:
+        counts: Dict[str, Counter] = {}
+        for change in changes:
+            print(json.dumps(change.to_json(), ensure_ascii=False))
+            _count(counts, change)
+        summary = _summary(counts)
+    print(json.dumps(summary, indent=2, ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
+import json
 import logging
 import zipfile
-import requests
 import os
 import shutil
 import stat
-from pathlib import Path
-from typing import Tuple
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
 from src.config import (
+    APK_MEMBER_INDEX_NAME,
+    APK_REQUIRED_MEMBERS,
     APK_REGEX,
     BASE_URL,
     DATA_DIR,
@@ -15,53 +17,55 @@ from src.config import (
     ASSET_STUDIO_DIR,
     ASSET_STUDIO_ZIP,
 )
+from src import http_cache, http_download, metrics
+
+
+def _parse_asset_studio_release(resp) -> str:
+    data = resp.json()
+
+    assets = data.get("assets", [])
+    for asset in assets:
+        name = asset.get("name", "")
+        browser_download_url = asset.get("browser_download_url", "")
+
+        # Kiểm tra xem tên file có khớp với pattern linux net9 không
+        if ASSET_STUDIO_ARTIFACT_REGEX.search(name):
+            logging.info(f"Found latest AssetStudio: {name} ({data.get('tag_name')})")
+            return browser_download_url
+
+    # Nếu không tìm thấy file mong muốn
+    raise RuntimeError(
+        "Could not find AssetStudioModCLI_net9_linux64.zip in the latest release assets."
+    )
 
 
 def get_latest_asset_studio_url() -> str:
     """
     Gọi GitHub API để lấy link download AssetStudioModCLI mới nhất cho Linux.
+    Kết quả được cache (ETag + TTL) qua http_cache để giảm request tới API.
     """
     logging.info(f"Checking for latest AssetStudio release at: {ASSET_STUDIO_REPO_API}")
     try:
-        resp = requests.get(
-            ASSET_STUDIO_REPO_API, timeout=15, headers={"Accept-Encoding": "zstd"}
+        return http_cache.cached_fetch(
+            ASSET_STUDIO_REPO_API,
+            _parse_asset_studio_release,
+            headers={"Accept-Encoding": "zstd"},
         )
-        resp.raise_for_status()
-        data = resp.json()
-
-        assets = data.get("assets", [])
-        for asset in assets:
-            name = asset.get("name", "")
-            browser_download_url = asset.get("browser_download_url", "")
-
-            # Kiểm tra xem tên file có khớp với pattern linux net9 không
-            if ASSET_STUDIO_ARTIFACT_REGEX.search(name):
-                logging.info(
-                    f"Found latest AssetStudio: {name} ({data.get('tag_name')})"
-                )
-                return browser_download_url
-
-        # Nếu không tìm thấy file mong muốn
-        raise RuntimeError(
-            "Could not find AssetStudioModCLI_net9_linux64.zip in the latest release assets."
-        )
-
     except Exception as e:
         raise RuntimeError(
             f"Failed to fetch latest AssetStudio release info: {e}"
         ) from e
 
 
-def download_file(url: str, dest: Path, chunk_size: int = 8192) -> None:
-    dest.parent.mkdir(parents=True, exist_ok=True)
+@metrics.timed()
+def download_file(url: str, dest: Path, chunk_size: int = 1 << 16) -> None:
+    """
+    Tải file qua http_download: session dùng chung, tải song song theo Range
+    và resume từ file .part khi bị ngắt.
+    """
     logging.info(f"Downloading: {url}")
     try:
-        with requests.get(url, verify=False, stream=True, timeout=120) as resp:
-            resp.raise_for_status()
-            with open(dest, "wb") as f:
-                for chunk in resp.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        f.write(chunk)
+        http_download.download(url, dest, chunk_size=chunk_size, verify=False)
     except Exception as e:
         raise RuntimeError(f"Failed to download {url}: {e}") from e
 
@@ -114,38 +118,127 @@ def flatten_directory(root_dir: Path, target_file_name: str) -> None:
             pass
 
 
+def _parse_apk_page(resp) -> List[str]:
+    match = APK_REGEX.search(resp.text)
+    if not match:
+        raise RuntimeError("Could not find Soul Knight APK link on page.")
+    return [match.group(1), match.group(0)]
+
+
 def get_latest_apk_info() -> Tuple[str, str]:
     logging.info(f"Fetching website: {BASE_URL}")
     try:
-        resp = requests.get(BASE_URL, timeout=15)
-        resp.raise_for_status()
+        version, link = http_cache.cached_fetch(BASE_URL, _parse_apk_page)
     except Exception as e:
         raise RuntimeError(f"Failed to fetch {BASE_URL}: {e}") from e
 
-    match = APK_REGEX.search(resp.text)
-    if not match:
-        raise RuntimeError("Could not find Soul Knight APK link on page.")
-    version = match.group(1)
-    link = match.group(0)
     logging.info(f"Found version: {version}")
     return version, link
 
 
+def versioned_apk_path(version: str) -> Path:
+    return DATA_DIR / f"sk-{version}.apk"
+
+
+def build_zip_name_index(zf: zipfile.ZipFile) -> Dict[str, List[zipfile.ZipInfo]]:
+    """Index tên file (basename) -> các entry trong central directory của zip."""
+    index: Dict[str, List[zipfile.ZipInfo]] = {}
+    for info in zf.infolist():
+        if not info.is_dir():
+            index.setdefault(PurePosixPath(info.filename).name, []).append(info)
+    return index
+
+
+def select_apk_members(
+    zf: zipfile.ZipFile, members: List[str]
+) -> List[zipfile.ZipInfo]:
+    """
+    Chọn các entry cần giải nén theo danh sách member (file hoặc thư mục "xxx/").
+    File không nằm đúng đường dẫn sẽ được tìm theo tên qua name index.
+    """
+    infos = [i for i in zf.infolist() if not i.is_dir()]
+    selected: Dict[str, zipfile.ZipInfo] = {}
+    name_index: Optional[Dict[str, List[zipfile.ZipInfo]]] = None
+
+    for member in members:
+        if member.endswith("/"):
+            for info in infos:
+                if info.filename.startswith(member):
+                    selected[info.filename] = info
+            continue
+
+        try:
+            info = zf.getinfo(member)
+        except KeyError:
+            if name_index is None:
+                name_index = build_zip_name_index(zf)
+            candidates = name_index.get(PurePosixPath(member).name, [])
+            if not candidates:
+                raise FileNotFoundError(f"{member} not found in APK")
+            info = candidates[0]
+            logging.info(f"Found {member} at {info.filename}")
+        selected[info.filename] = info
+
+    return list(selected.values())
+
+
+def extract_apk_members(
+    apk_path: Path, target_dir: Path, members: List[str] = APK_REQUIRED_MEMBERS
+) -> Dict[str, List[str]]:
+    """
+    Chỉ giải nén các member cần thiết của APK vào target_dir và ghi index
+    tên file -> đường dẫn tương đối (APK_MEMBER_INDEX_NAME).
+    """
+    target_dir.mkdir(parents=True, exist_ok=True)
+    name_index: Dict[str, List[str]] = {}
+    with zipfile.ZipFile(apk_path, "r") as zf:
+        selected = select_apk_members(zf, members)
+        total = sum(info.file_size for info in selected)
+        logging.info(
+            f"Extracting {len(selected)} APK members "
+            f"({total / 1_048_576:.1f} MB) to {target_dir}"
+        )
+        for info in selected:
+            zf.extract(info, target_dir)
+            name_index.setdefault(PurePosixPath(info.filename).name, []).append(
+                info.filename
+            )
+
+    with open(target_dir / APK_MEMBER_INDEX_NAME, "w", encoding="utf-8") as f:
+        json.dump(name_index, f, indent=2, sort_keys=True)
+    return name_index
+
+
+def find_extracted_member(sk_extracted_path: Path, name: str) -> Optional[Path]:
+    """Tìm file đã giải nén theo tên qua index của extract_apk_members (không rglob)."""
+    index_path = sk_extracted_path / APK_MEMBER_INDEX_NAME
+    if not index_path.exists():
+        return None
+    with open(index_path, "r", encoding="utf-8") as f:
+        name_index: Dict[str, List[str]] = json.load(f)
+    for rel in name_index.get(name, []):
+        path = sk_extracted_path / rel
+        if path.exists():
+            return path
+    return None
+
+
 def ensure_apk_extracted(version: str, link: str) -> Path:
-    versioned_apk_file = DATA_DIR / f"sk-{version}.apk"
+    versioned_apk_file = versioned_apk_path(version)
     sk_extracted_path = DATA_DIR / f"sk-{version}"
 
+    # Index chỉ được ghi khi giải nén xong, nên dùng làm marker hoàn tất
+    if (sk_extracted_path / APK_MEMBER_INDEX_NAME).exists():
+        return sk_extracted_path
+
     if not versioned_apk_file.exists():
         download_file(link, versioned_apk_file)
 
-    if not sk_extracted_path.exists():
-        logging.info(f"Extracting APK to {sk_extracted_path}...")
-        try:
-            sk_extracted_path.mkdir(parents=True, exist_ok=False)
-            with zipfile.ZipFile(versioned_apk_file, "r") as zf:
-                zf.extractall(sk_extracted_path)
-        except Exception as e:
-            raise RuntimeError(f"Failed extracting APK: {e}") from e
+    logging.info(f"Extracting APK to {sk_extracted_path}...")
+    try:
+        extract_apk_members(versioned_apk_file, sk_extracted_path)
+    except Exception as e:
+        raise RuntimeError(f"Failed extracting APK: {e}") from e
 
     return sk_extracted_path
 
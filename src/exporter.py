@@ -1,33 +1,56 @@
 import json
 import csv
 import logging
+import os
 import re
 from collections import defaultdict
 from pathlib import Path
-from typing import List, Tuple, Dict, Any, Union
-from .config import LANGUAGES
-
-
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, List, NamedTuple, Tuple, Dict, Any, Optional, Union
+from . import metrics, output_writer
+from .classifier import KeyIndex
+from .config import EXPORT_MAX_WORKERS, LANGUAGES
+from .data_manager import build_key_index
+
+# Các file do export_master_data_to_json ghi ra trong output_dir
+MASTER_DATA_FILES = [
+    "all_weapons_info.json",
+    "characters_info.json",
+    "highest_skin_ids.json",
+    "pets_info.json",
+    "buffs_info.json",
+    "challenges_info.json",
+    "materials_info.json",
+    "plants_info.json",
+]
+
+
+@metrics.timed()
 def write_i2_csv(
-    version: str, records: List[Tuple[str, List[str]]], output_dir: Path
+    version: str, records: Iterable[Tuple[str, List[str]]], output_dir: Path
 ) -> Path:
     """
     Given (key, [fields...]) records, write them into I2language_{version}.csv
     under the script folder. Returns the CSV path.
+    `records` có thể là generator (vd. parser.iter_i2_records): ghi từng dòng khi nhận được.
     """
     csv_path = output_dir / f"I2language.csv"
     logging.info(f"Writing CSV: {csv_path}")
     try:
-        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        with output_writer.open_atomic(csv_path, newline="") as f:
             writer = csv.writer(f)
             writer.writerow(["id"] + LANGUAGES)
+            n = 0
             for key, fields in records:
                 writer.writerow([key] + fields)
+                n += 1
+        metrics.add_records(n)
     except Exception as e:
         raise RuntimeError(f"Failed writing CSV {csv_path}: {e}") from e
     return csv_path
 
 
+@metrics.timed()
 def write_master_txt(
     version: str,
     weapon_json_path: Path,
@@ -66,7 +89,7 @@ def write_master_txt(
     characters = lang_maps["characters"]
     max_skin_ids = {}
     try:
-        with open(txt_path, "w", encoding="utf-8") as out:
+        with output_writer.open_atomic(txt_path) as out:
 
             out.write(
                 "██     ██ ███████  █████  ██████   ██████  ███    ██\n"
@@ -178,8 +201,7 @@ def write_master_txt(
                 out.write(f"{pid}\n")
                 out.write(f"    Display name : {pname}\n\n")
             skin_id_json_path = output_dir / "highest_skin_ids.json"
-            with open(skin_id_json_path, "w", encoding="utf-8") as f:
-                json.dump(max_skin_ids, f, indent=2, sort_keys=True)
+            output_writer.write_json(skin_id_json_path, max_skin_ids, sort_keys=True)
             logging.info(f"Exported max skin IDs to {skin_id_json_path}")
     except Exception as e:
         raise RuntimeError(f"Failed writing master TXT {txt_path}: {e}") from e
@@ -187,43 +209,10 @@ def write_master_txt(
     return txt_path
 
 
-def export_master_data_to_json(
-    version: str,
-    weapon_json_path: Path,
-    lang_maps: Dict[str, Dict[str, Any]],
-    output_dir: Path,
-) -> None:
-    """
-    Đọc WeaponInfo.txt (JSON), kết hợp với lang_maps và xuất ra các file JSON riêng biệt
-    cho: Vũ khí, Nhân vật, Thú cưng, Buff, Thử thách, Nguyên liệu, Cây trồng.
-    """
-    logging.info(f"Starting export to JSON files in: {output_dir}")
-
-    if not weapon_json_path.exists():
-        raise FileNotFoundError(f"WeaponInfo JSON not found: {weapon_json_path}")
-
-    try:
-        with open(weapon_json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        raise RuntimeError(f"Failed reading {weapon_json_path}: {e}") from e
-
-    # Lấy dữ liệu từ lang_maps
-    weapons_map = lang_maps["weapons"]
-    buff_names = lang_maps["buff_names"]
-    buff_infos = lang_maps["buff_infos"]
-    challenge_names = lang_maps["challenge_names"]
-    challenge_titles = lang_maps["challenge_titles"]
-    challenge_descs = lang_maps["challenge_descs"]
-    materials = lang_maps["materials"]
-    plants = lang_maps["plants"]
-    pets = lang_maps["pets"]
-    characters = lang_maps["characters"]
-
-    # 1. Export Weapons (Kết hợp thông số gốc + tên tiếng Anh)
-    weapons_raw = data.get("weapons", [])
+def _build_weapons(data: Dict[str, Any], weapons_map: Dict[str, str]) -> List[Dict]:
+    """Kết hợp thông số gốc trong WeaponInfo + tên tiếng Anh."""
     weapons_export = []
-    for w in weapons_raw:
+    for w in data.get("weapons", []):
         name_key = w.get("name", "")
         english_name = weapons_map.get(name_key, None)
 
@@ -240,10 +229,16 @@ def export_master_data_to_json(
 
     # Sắp xếp theo ID
     weapons_export.sort(key=lambda x: x["id"])
-    _save_json(output_dir / "all_weapons_info.json", weapons_export)
+    return weapons_export
 
-    # 2. Export Characters & Skins
-    # Cấu trúc: { "c1": { "default_name": "...", "skins": { "skin_id": "name" } } }
+
+def _build_characters(
+    characters: Dict[str, Dict[str, str]]
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Trả về (characters_info, highest_skin_ids).
+    Cấu trúc: { "c1": { "default_name": "...", "skins": { "skin_id": "name" } } }
+    """
     chars_export = {}
     max_skin_ids = {}
 
@@ -262,11 +257,10 @@ def export_master_data_to_json(
         key = f"c{char_index}"
         max_skin_ids[key] = max_skin_id
         chars_export[key] = {"default_name": default_name, "skins": skin_list}
+    return chars_export, max_skin_ids
 
-    _save_json(output_dir / "characters_info.json", chars_export)
-    _save_json(output_dir / "highest_skin_ids.json", max_skin_ids)
 
-    # 3. Export Pets
+def _build_pets(pets: Dict[str, str]) -> List[Dict]:
     pets_export = []
     for pet_id, pet_name in sorted(pets.items(), key=lambda kv: kv[0]):
         pets_export.append(
@@ -276,9 +270,10 @@ def export_master_data_to_json(
                 "name": pet_name,
             }
         )
-    _save_json(output_dir / "pets_info.json", pets_export)
+    return pets_export
+
 
-    # 4. Export Buffs
+def _build_buffs(buff_names: Dict[str, str], buff_infos: Dict[str, str]) -> List[Dict]:
     buffs_export = []
     buff_ids: set[str] = set()
     buff_ids.update(k.replace("Buff_name_", "") for k in buff_names.keys())
@@ -294,9 +289,14 @@ def export_master_data_to_json(
                 "description": buff_infos.get(info_key, "[Description Not Found]"),
             }
         )
-    _save_json(output_dir / "buffs_info.json", buffs_export)
+    return buffs_export
+
 
-    # 5. Export Challenges
+def _build_challenges(
+    challenge_names: Dict[str, str],
+    challenge_titles: Dict[str, str],
+    challenge_descs: Dict[str, str],
+) -> List[Dict]:
     challenges_export = []
     challenge_ids: set[str] = set()
     challenge_ids.update(challenge_names.keys())
@@ -316,32 +316,153 @@ def export_master_data_to_json(
                 "description": challenge_descs.get(cid, None),
             }
         )
-    _save_json(output_dir / "challenges_info.json", challenges_export)
+    return challenges_export
 
-    # 6. Export Materials
-    materials_export = []
-    for mid, mname in sorted(materials.items(), key=lambda kv: kv[0]):
-        materials_export.append({"id": mid, "name": mname})
-    _save_json(output_dir / "materials_info.json", materials_export)
 
-    # 7. Export Plants
-    plants_export = []
-    for pid, pname in sorted(plants.items(), key=lambda kv: kv[0]):
-        plants_export.append({"id": pid, "name": pname})
-    _save_json(output_dir / "plants_info.json", plants_export)
+def _build_id_names(items: Dict[str, str]) -> List[Dict]:
+    """[{"id", "name"}] sắp theo id (materials, plants)."""
+    return [{"id": k, "name": v} for k, v in sorted(items.items(), key=lambda kv: kv[0])]
+
+
+class ExportTask(NamedTuple):
+    """
+    Một output độc lập: build(*args) rồi ghi kết quả ra paths (build trả về tuple
+    nếu có nhiều path).
+    """
+
+    name: str
+    build: Callable[..., Any]
+    args: Tuple[Any, ...]
+    paths: Tuple[Path, ...]
+
+
+def _run_export_task(task: ExportTask) -> int:
+    result = task.build(*task.args)
+    outputs = result if len(task.paths) > 1 else (result,)
+    records = 0
+    for path, data in zip(task.paths, outputs):
+        _save_json(path, data)
+        records += len(data)
+    return records
+
+
+def run_export_tasks(
+    tasks: List[ExportTask], max_workers: int = EXPORT_MAX_WORKERS
+) -> None:
+    """
+    Chạy các task export độc lập trên thread pool (tối đa max_workers cùng lúc).
+    Mỗi task chỉ mất vài chục ms nên không dùng process pool: chi phí khởi động
+    interpreter của process con lớn hơn hẳn thời gian export. Thread vẫn chồng
+    được phần hash/nén/ghi file (nhả GIL) của các task với nhau.
+    Raise RuntimeError liệt kê mọi task lỗi sau khi tất cả đã kết thúc.
+    """
+    errors: List[str] = []
+    max_workers = min(max_workers, len(tasks), os.cpu_count() or 1)
+    if max_workers <= 1:
+        for task in tasks:
+            try:
+                metrics.add_records(_run_export_task(task))
+            except Exception as e:
+                errors.append(f"{task.name}: {e}")
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_run_export_task, task): task.name for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    metrics.add_records(future.result())
+                except Exception as e:
+                    errors.append(f"{futures[future]}: {e}")
+
+    if errors:
+        raise RuntimeError("Export failed:\n" + "\n".join(sorted(errors)))
+
+
+@metrics.timed()
+def export_master_data_to_json(
+    version: str,
+    weapon_json_path: Path,
+    lang_maps: Dict[str, Dict[str, Any]],
+    output_dir: Path,
+    max_workers: int = EXPORT_MAX_WORKERS,
+) -> None:
+    """
+    Đọc WeaponInfo.txt (JSON), kết hợp với lang_maps và xuất ra các file JSON riêng biệt
+    cho: Vũ khí, Nhân vật, Thú cưng, Buff, Thử thách, Nguyên liệu, Cây trồng.
+    Mỗi file là một task độc lập (build + ghi), chạy song song qua run_export_tasks.
+    """
+    logging.info(f"Starting export to JSON files in: {output_dir}")
+
+    if not weapon_json_path.exists():
+        raise FileNotFoundError(f"WeaponInfo JSON not found: {weapon_json_path}")
+
+    try:
+        with open(weapon_json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        raise RuntimeError(f"Failed reading {weapon_json_path}: {e}") from e
+
+    tasks = [
+        ExportTask(
+            "weapons",
+            _build_weapons,
+            (data, lang_maps["weapons"]),
+            (output_dir / "all_weapons_info.json",),
+        ),
+        ExportTask(
+            "characters",
+            _build_characters,
+            (lang_maps["characters"],),
+            (output_dir / "characters_info.json", output_dir / "highest_skin_ids.json"),
+        ),
+        ExportTask(
+            "pets", _build_pets, (lang_maps["pets"],), (output_dir / "pets_info.json",)
+        ),
+        ExportTask(
+            "buffs",
+            _build_buffs,
+            (lang_maps["buff_names"], lang_maps["buff_infos"]),
+            (output_dir / "buffs_info.json",),
+        ),
+        ExportTask(
+            "challenges",
+            _build_challenges,
+            (
+                lang_maps["challenge_names"],
+                lang_maps["challenge_titles"],
+                lang_maps["challenge_descs"],
+            ),
+            (output_dir / "challenges_info.json",),
+        ),
+        ExportTask(
+            "materials",
+            _build_id_names,
+            (lang_maps["materials"],),
+            (output_dir / "materials_info.json",),
+        ),
+        ExportTask(
+            "plants",
+            _build_id_names,
+            (lang_maps["plants"],),
+            (output_dir / "plants_info.json",),
+        ),
+    ]
+    run_export_tasks(tasks, max_workers)
 
     logging.info("Exported all master data to separate JSON files.")
 
 
-def _save_json(path: Path, data: Any) -> None:
-    """Helper để lưu file JSON format đẹp."""
+def _save_json(path: Path, data: Any) -> bool:
+    """
+    Helper để lưu file JSON theo output profile (chỉ ghi khi nội dung thay đổi, trả
+    về True nếu đã ghi). Lỗi ghi file được raise (RuntimeError).
+    """
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        return output_writer.write_json(path, data)
     except Exception as e:
-        logging.error(f"Failed to save JSON {path}: {e}")
+        raise RuntimeError(f"Failed to save JSON {path}: {e}") from e
 
 
+@metrics.timed()
 def export_filtered_weapons_from_info(
     weapon_info_path: Path,
     weapons_map: Dict[str, str],
@@ -371,33 +492,29 @@ def export_filtered_weapons_from_info(
         if english_name:
             filtered[wid] = english_name
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(filtered, f, ensure_ascii=False, indent=2, sort_keys=True)
+    output_writer.write_json(output_path, filtered, sort_keys=True)
+    metrics.add_records(len(filtered))
 
 
-def export_weapon_evo_data(lang_map: Dict[str, str], output_path: Path) -> None:
+@metrics.timed()
+def export_weapon_evo_data(
+    lang_map: Dict[str, str], output_path: Path, index: Optional[KeyIndex] = None
+) -> None:
     logging.info(f"Exporting weapon evo data to {output_path}")
-    skin_pattern = re.compile(r"^(weapon_\w+)_s_\d+$")
-    upgrade_pattern = re.compile(r"^desc_evolution_(weapon_\w+)$")
+    if index is None:
+        index = build_key_index(lang_map)
+    view = index.view("weapon_evo")
 
     weapon_skin_map: defaultdict[str, List[str]] = defaultdict(list)
     upgradable_weapons: set[str] = set()
 
-    for key in lang_map:
-        if "/" in key:
-            continue
-
-        m_skin = skin_pattern.match(key)
-        if m_skin:
-            base_weapon = m_skin.group(1)
+    for key, (base_weapon,) in view["skins"]:
+        if key in lang_map:
             weapon_skin_map[base_weapon].append(key)
-            continue
 
-        m_upgrade = upgrade_pattern.match(key)
-        if m_upgrade:
-            weapon_id = m_upgrade.group(1)
+    for key, (weapon_id,) in view["evolutions"]:
+        if key in lang_map:
             upgradable_weapons.add(weapon_id)
-            continue
 
     for k, v in weapon_skin_map.items():
         weapon_skin_map[k] = sorted(v)
@@ -421,14 +538,19 @@ def export_weapon_evo_data(lang_map: Dict[str, str], output_path: Path) -> None:
         },
     }
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(weapon_evo_data, f, indent=2, ensure_ascii=False, sort_keys=True)
+    output_writer.write_json(output_path, weapon_evo_data, sort_keys=True)
+    metrics.add_records(len(weapon_evo_data))
 
 
+@metrics.timed()
 def export_needed_data_from_langmap(
-    lang_map: Dict[str, str], output_path: Path
+    lang_map: Dict[str, str], output_path: Path, index: Optional[KeyIndex] = None
 ) -> None:
     logging.info(f"Exporting needed data to {output_path}")
+    if index is None:
+        index = build_key_index(lang_map)
+    view = index.view("needed_data")
+
     result: Dict[str, Any] = {
         "skin": defaultdict(dict),
         "pet": {},
@@ -436,24 +558,15 @@ def export_needed_data_from_langmap(
         "character_skill": {},
     }
 
-    skin_pattern = re.compile(r"Character(\d+)_name_skin(\d+)")
-    pet_pattern = re.compile(r"Pet_name_(\d+)")
-    material_pattern = re.compile(
-        r"(^material_(?!.*(?:activity|book|fragment|tape|skill|new|money|multi|box)).*)"
-    )
-    skill_pattern = re.compile(r"(Character\d+_skill_\d+_name)")
-
-    for key, value in lang_map.items():
-        if m := skin_pattern.fullmatch(key):
-            char_idx, skin_idx = m.groups()
-            result["skin"][f"c{char_idx}"][f"c{char_idx}_skin{skin_idx}"] = value
-        elif m := pet_pattern.fullmatch(key):
-            result["pet"][m.group(1)] = value
-        elif m := material_pattern.fullmatch(key):
-            result["material"][m.group(1)] = value
-        elif m := skill_pattern.fullmatch(key):
-            result["character_skill"][m.group(1)] = value
+    for key, (char_idx, skin_idx) in view["skin"]:
+        if key in lang_map:
+            skin_key = f"c{char_idx}_skin{skin_idx}"
+            result["skin"][f"c{char_idx}"][skin_key] = lang_map[key]
+    for category in ("pet", "material", "character_skill"):
+        for key, (item_id,) in view[category]:
+            if key in lang_map:
+                result[category][item_id] = lang_map[key]
 
     result["skin"] = dict(result["skin"])
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False, sort_keys=True)
+    output_writer.write_json(output_path, result, sort_keys=True)
+    metrics.add_records(sum(len(v) for v in result.values()))
@@ -1,24 +1,36 @@
 import logging
+import os
+import shutil
 import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from .config import EXPORT_DIR, ASSET_STUDIO_DIR
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from .config import (
+    EXPORT_DIR,
+    ASSET_STUDIO_DIR,
+    ASSET_STUDIO_MAX_WORKERS,
+    ASSET_STUDIO_TIMEOUT_SECONDS,
+    EXTRACTION_BACKEND,
+)
+from .downloader import ensure_asset_studio, find_extracted_member
+from . import metrics, object_index, unityfs
+from .artifact_store import Artifact, artifact_key, load_artifacts, store_artifacts
+from .utils import file_sha256
 
 
-def run_asset_studio_cli(
-    unity_data_path: Path,
-    output_dir: Path,
-    asset_type: str,
-    mode: str,
-    filter_name: str,
-    assembly_folder: Path | None = None,
-) -> None:
+_executable: Optional[Path] = None
+
+
+def find_asset_studio_executable() -> Path:
     """
-    Hàm gọi AssetStudioModCLI thông qua subprocess.
+    Tìm file thực thi AssetStudioModCLI (chỉ tìm một lần, kết quả được giữ lại).
     """
-    if not unity_data_path.exists():
-        raise FileNotFoundError(f"Unity data file not found: {unity_data_path}")
+    global _executable
+    if _executable is not None and _executable.exists():
+        return _executable
 
-    # Tìm file thực thi
     # 1. Tìm trực tiếp tại root (Trường hợp lý tưởng sau khi flatten)
     executable = ASSET_STUDIO_DIR / "AssetStudioModCLI"
 
@@ -43,6 +55,19 @@ def run_asset_studio_cli(
             f"AssetStudioModCLI binary not found in {ASSET_STUDIO_DIR} or subfolders"
         )
 
+    _executable = executable
+    return executable
+
+
+def build_cli_command(
+    executable: Path,
+    unity_data_path: Path,
+    output_dir: Path,
+    asset_type: str,
+    mode: str,
+    filter_name: str,
+    assembly_folder: Optional[Path] = None,
+) -> List[str]:
     cmd = [
         str(executable),
         str(unity_data_path),
@@ -62,67 +87,460 @@ def run_asset_studio_cli(
             logging.warning(f"Assembly folder not found: {assembly_folder}")
         else:
             cmd.extend(["--assembly-folder", str(assembly_folder)])
+    return cmd
 
-    logging.info(f"Running AssetStudio CLI for {filter_name}...")
 
-    try:
-        # cwd là thư mục chứa file thực thi để nó load được DLL
-        subprocess.run(cmd, check=True, cwd=str(executable.parent))
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(
-            f"AssetStudioModCLI failed with exit code {e.returncode}"
-        ) from e
+class JobResult(NamedTuple):
+    """Kết quả một lần chạy CLI: exit code, thời gian, bộ nhớ đỉnh và output."""
 
-    logging.info(f"Finished extracting {filter_name}.")
+    name: str
+    returncode: int
+    wall_seconds: float
+    peak_rss_kb: Optional[int]
+    stdout: str
+    stderr: str
 
 
-def run_asset_extractions(sk_extracted_path: Path) -> None:
+def _wait_with_usage(
+    proc: subprocess.Popen, timeout: Optional[float]
+) -> Tuple[int, Optional[int]]:
     """
-    Chạy AssetStudio để trích xuất dữ liệu.
+    Chờ process kết thúc, trả về (exit code, peak RSS của process theo KB).
+    Dùng os.wait4 để lấy rusage riêng của từng process (Linux/macOS).
     """
-    unity_data = sk_extracted_path / "assets/bin/Data/data.unity3d"
-    managed_folder = sk_extracted_path / "assets/bin/Data/Managed"
+    if not hasattr(os, "wait4"):
+        try:
+            return proc.wait(timeout=timeout), None
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            raise
 
-    if not unity_data.exists():
-        found = list(sk_extracted_path.rglob("data.unity3d"))
-        if found:
-            unity_data = found[0]
-        else:
-            raise FileNotFoundError(f"Unity data file missing in: {sk_extracted_path}")
+    deadline = time.monotonic() + timeout if timeout else None
+    delay = 0.01
+    while True:
+        pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            return proc.returncode, usage.ru_maxrss
+        if deadline is not None and time.monotonic() > deadline:
+            proc.kill()
+            _, status, _ = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            raise subprocess.TimeoutExpired(proc.args, timeout)
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
 
-    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
 
-    # 1. Extract I2Languages
-    run_asset_studio_cli(
-        unity_data_path=unity_data,
-        output_dir=EXPORT_DIR,
-        asset_type="monobehaviour",
-        mode="raw",
-        filter_name="i2language",
-        assembly_folder=managed_folder,
+def run_cli_job(
+    name: str, cmd: List[str], cwd: Path, timeout: Optional[float] = None
+) -> JobResult:
+    """Chạy một lệnh CLI, capture stdout/stderr và đo thời gian, bộ nhớ đỉnh."""
+    logging.info(f"Running AssetStudio CLI for {name}...")
+    start = time.perf_counter()
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, cwd=str(cwd), stdout=out, stderr=err)
+        try:
+            returncode, peak_kb = _wait_with_usage(proc, timeout)
+        except subprocess.TimeoutExpired as e:
+            raise RuntimeError(
+                f"AssetStudioModCLI timed out after {timeout}s ({name})"
+            ) from e
+        out.seek(0)
+        err.seek(0)
+        stdout = out.read().decode("utf-8", errors="replace")
+        stderr = err.read().decode("utf-8", errors="replace")
+
+    result = JobResult(
+        name, returncode, time.perf_counter() - start, peak_kb, stdout, stderr
+    )
+    metrics.record(
+        f"assetstudio.{name}",
+        wall_seconds=round(result.wall_seconds, 6),
+        peak_rss_kb=peak_kb,
+        returncode=returncode,
     )
+    peak = f"{peak_kb / 1024:.0f} MB" if peak_kb is not None else "n/a"
+    logging.info(
+        f"Finished {name}: exit {returncode}, {result.wall_seconds:.1f}s, "
+        f"peak RSS {peak}"
+    )
+    return result
+
+
+def run_cli_jobs(
+    jobs: List[Tuple[str, List[str]]],
+    max_workers: int = ASSET_STUDIO_MAX_WORKERS,
+    timeout: Optional[float] = ASSET_STUDIO_TIMEOUT_SECONDS,
+) -> List[JobResult]:
+    """
+    Chạy song song các job CLI độc lập (tối đa max_workers cùng lúc).
+    Raise RuntimeError liệt kê mọi job lỗi sau khi tất cả đã kết thúc.
+    """
+    cwd = find_asset_studio_executable().parent
+    results: List[JobResult] = []
+    errors: List[str] = []
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {
+            pool.submit(run_cli_job, name, cmd, cwd, timeout): name
+            for name, cmd in jobs
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+                continue
+            results.append(result)
+            if result.returncode != 0:
+                tail = result.stderr.strip()[-2000:] or result.stdout.strip()[-2000:]
+                errors.append(f"{name}: exit code {result.returncode}\n{tail}")
+
+    if errors:
+        raise RuntimeError("AssetStudioModCLI failed:\n" + "\n".join(errors))
+    return results
+
+
+def run_asset_studio_cli(
+    unity_data_path: Path,
+    output_dir: Path,
+    asset_type: str,
+    mode: str,
+    filter_name: str,
+    assembly_folder: Path | None = None,
+) -> None:
+    """
+    Hàm gọi AssetStudioModCLI thông qua subprocess.
+    """
+    if not unity_data_path.exists():
+        raise FileNotFoundError(f"Unity data file not found: {unity_data_path}")
+
+    cmd = build_cli_command(
+        find_asset_studio_executable(),
+        unity_data_path,
+        output_dir,
+        asset_type,
+        mode,
+        filter_name,
+        assembly_folder,
+    )
+    run_cli_jobs([(filter_name, cmd)], max_workers=1)
+
+
+class ExtractionTarget(NamedTuple):
+    """Một asset cần trích xuất. Output được gom vào EXPORT_DIR/<name>."""
+
+    name: str
+    asset_type: str
+    mode: str
+    filter_name: str
+    needs_assembly: bool = False
+
+
+class ExtractionJob(NamedTuple):
+    """Một lần gọi AssetStudioModCLI, gộp nhiều target cùng mode và asset type."""
 
-    # Xóa file rác
-    for dat_file in EXPORT_DIR.rglob("I2Languages*.dat"):
-        if dat_file.stat().st_size < 2_000_000:
+    mode: str
+    asset_type: str
+    filters: List[str]
+    needs_assembly: bool
+    targets: List[ExtractionTarget]
+
+
+EXTRACTION_TARGETS: List[ExtractionTarget] = [
+    ExtractionTarget("i2language", "monobehaviour", "raw", "i2language", True),
+    ExtractionTarget("WeaponInfo", "textasset", "export", "WeaponInfo"),
+    ExtractionTarget("WeaponItem", "textasset", "export", "WeaponItem"),
+]
+
+# Các file I2Languages nhỏ hơn ngưỡng này là file rác (không phải bảng ngôn ngữ)
+I2_MIN_SIZE = 2_000_000
+
+
+def plan_extractions(targets: List[ExtractionTarget]) -> List[ExtractionJob]:
+    """
+    Gộp các target thành ít lần gọi CLI nhất có thể: mỗi (mode, asset type) một
+    job, với các filter tên được nối lại (CLI nhận nhiều giá trị cách nhau bởi dấu
+    phẩy). Không gộp nhiều asset type vào một job vì CLI xuất mọi type cho mọi
+    filter, và route_outputs chỉ chia output theo filter tên.
+    """
+    groups: Dict[Tuple[str, str], List[ExtractionTarget]] = {}
+    for t in targets:
+        groups.setdefault((t.mode, t.asset_type.lower()), []).append(t)
+
+    return [
+        ExtractionJob(
+            mode=mode,
+            asset_type=asset_type,
+            filters=list(dict.fromkeys(t.filter_name for t in group)),
+            needs_assembly=any(t.needs_assembly for t in group),
+            targets=group,
+        )
+        for (mode, asset_type), group in groups.items()
+    ]
+
+
+def route_outputs(
+    batch_dir: Path, targets: List[ExtractionTarget], export_dir: Path
+) -> Dict[str, List[Path]]:
+    """
+    Chuyển file trong thư mục output của một job vào EXPORT_DIR/<target.name>,
+    theo filter tên của target (không phân biệt hoa thường, giống AssetStudio).
+    Các target của một job cùng asset type (plan_extractions) nên chỉ cần lọc tên.
+    """
+    routed: Dict[str, List[Path]] = {t.name: [] for t in targets}
+    for t in targets:
+        target_dir = export_dir / t.name
+        if target_dir.exists():
+            shutil.rmtree(target_dir)
+        target_dir.mkdir(parents=True)
+
+    for f in sorted(batch_dir.rglob("*")):
+        if not f.is_file():
+            continue
+        matches = [t for t in targets if t.filter_name.lower() in f.name.lower()]
+        source = f
+        for t in matches:
+            dest = export_dir / t.name / f.name
+            if dest.exists():
+                dest = dest.with_name(f"{f.parent.name}_{f.name}")
+            if source is f:
+                shutil.move(str(f), str(dest))
+                source = dest
+            else:
+                shutil.copy2(source, dest)
+            routed[t.name].append(dest)
+
+    shutil.rmtree(batch_dir, ignore_errors=True)
+    return routed
+
+
+def _drop_small_i2_files(files: List[Path]) -> List[Path]:
+    """Xóa file rác I2Languages*.dat (< I2_MIN_SIZE), trả về các file còn lại."""
+    kept = []
+    for f in files:
+        if f.suffix == ".dat" and f.stat().st_size < I2_MIN_SIZE:
             try:
-                dat_file.unlink()
+                f.unlink()
             except Exception:
                 pass
+            continue
+        kept.append(f)
+    return kept
 
-    # 2. Extract WeaponInfo
-    run_asset_studio_cli(
-        unity_data_path=unity_data,
-        output_dir=EXPORT_DIR,
-        asset_type="textasset",
-        mode="export",
-        filter_name="WeaponInfo",
-    )
 
-    run_asset_studio_cli(
-        unity_data_path=unity_data,
-        output_dir=EXPORT_DIR,
-        asset_type="TextAsset",
-        mode="export",
-        filter_name="WeaponItem",
+def _run_cli_extractions(
+    unity_data: Path, managed_folder: Path, targets: List[ExtractionTarget]
+) -> Dict[str, List[Path]]:
+    """
+    Trích xuất bằng AssetStudioModCLI (tải CLI nếu chưa có).
+    Các target được gộp thành ít lần gọi CLI nhất (plan_extractions), mỗi lần chỉ
+    load data.unity3d một lần.
+    """
+    ensure_asset_studio()
+    executable = find_asset_studio_executable()
+    planned = plan_extractions(targets)
+    batch_dirs: List[Path] = []
+    cli_jobs: List[Tuple[str, List[str]]] = []
+    for i, job in enumerate(planned):
+        batch_dir = EXPORT_DIR / f"_batch_{i}"
+        if batch_dir.exists():
+            shutil.rmtree(batch_dir)
+        batch_dirs.append(batch_dir)
+        cmd = build_cli_command(
+            executable,
+            unity_data,
+            batch_dir,
+            job.asset_type,
+            job.mode,
+            ",".join(job.filters),
+            managed_folder if job.needs_assembly else None,
+        )
+        cli_jobs.append((",".join(job.filters), cmd))
+
+    # Các job độc lập (output riêng) nên chạy song song được
+    run_cli_jobs(cli_jobs)
+
+    outputs: Dict[str, List[Path]] = {}
+    for job, batch_dir in zip(planned, batch_dirs):
+        outputs.update(route_outputs(batch_dir, job.targets, EXPORT_DIR))
+    return outputs
+
+
+# Đuôi file output theo (asset type, mode), giống tên file AssetStudio xuất ra
+_NATIVE_OUTPUTS: Dict[Tuple[str, str], str] = {
+    ("textasset", "export"): ".txt",
+    ("textasset", "raw"): ".dat",
+    ("monobehaviour", "raw"): ".dat",
+}
+
+
+@metrics.timed(
+    "extractor.native", records=lambda outputs: sum(map(len, outputs.values()))
+)
+def _run_native_extractions(
+    unity_data: Path, targets: List[ExtractionTarget], bundle_hash: Optional[str] = None
+) -> Dict[str, List[Path]]:
+    """
+    Trích xuất trực tiếp từ bundle UnityFS (src/unityfs), không cần AssetStudio/.NET.
+    Object được tìm qua index (object_index) nên chỉ giải nén các block chứa chúng.
+    Raise UnityFSError nếu có target không khớp object nào (để "auto" fallback CLI).
+    """
+    for t in targets:
+        if (t.asset_type.lower(), t.mode) not in _NATIVE_OUTPUTS:
+            raise unityfs.UnityFSError(
+                f"Native backend does not support {t.asset_type}/{t.mode} ({t.name})"
+            )
+
+    outputs: Dict[str, List[Path]] = {}
+    start = time.perf_counter()
+    with unityfs.UnityFSBundle(unity_data) as bundle:
+        index = object_index.load_or_build_index(unity_data, bundle, bundle_hash)
+        matches = {t.name: index.find(t.asset_type, t.filter_name) for t in targets}
+        unmatched = [t.name for t in targets if not matches[t.name]]
+        if unmatched:
+            raise unityfs.UnityFSError(
+                f"No objects found in bundle for: {', '.join(unmatched)}"
+            )
+
+        for t in targets:
+            target_dir = EXPORT_DIR / t.name
+            if target_dir.exists():
+                shutil.rmtree(target_dir)
+            target_dir.mkdir(parents=True)
+            outputs[t.name] = []
+
+            asset_type = t.asset_type.lower()
+            ext = _NATIVE_OUTPUTS[(asset_type, t.mode)]
+            for entry in matches[t.name]:
+                obj = object_index.object_info(bundle, entry)
+                if asset_type == "textasset" and t.mode == "export":
+                    data = unityfs.read_text_asset(bundle, obj)
+                else:
+                    data = unityfs.read_object(bundle, obj)
+
+                dest = target_dir / f"{obj.name}{ext}"
+                if dest.exists():
+                    dest = dest.with_name(f"{obj.name}_{obj.path_id}{ext}")
+                dest.write_bytes(data)
+                outputs[t.name].append(dest)
+
+    logging.info(
+        f"Native extraction finished in {time.perf_counter() - start:.1f}s: "
+        + ", ".join(f"{name}={len(files)}" for name, files in outputs.items())
     )
+    return outputs
+
+
+def find_unity_data(sk_extracted_path: Path) -> Path:
+    """Đường dẫn data.unity3d trong thư mục APK đã giải nén."""
+    unity_data = sk_extracted_path / "assets/bin/Data/data.unity3d"
+    if unity_data.exists():
+        return unity_data
+    found = find_extracted_member(sk_extracted_path, "data.unity3d")
+    if found:
+        return found
+    raise FileNotFoundError(f"Unity data file missing in: {sk_extracted_path}")
+
+
+def list_objects(
+    sk_extracted_path: Path,
+    asset_type: Optional[str] = None,
+    name_filter: Optional[str] = None,
+) -> List[object_index.IndexedObject]:
+    """
+    Liệt kê object trong data.unity3d (vd. list_objects(path, "textasset")) từ
+    index của bundle, không cần chạy trích xuất.
+    """
+    index = object_index.load_or_build_index(find_unity_data(sk_extracted_path))
+    return index.find(asset_type, name_filter)
+
+
+def _extract(
+    unity_data: Path,
+    managed_folder: Path,
+    targets: List[ExtractionTarget],
+    backend: str,
+    bundle_hash: str,
+) -> Dict[str, List[Path]]:
+    """Chạy backend đã chọn cho các target, output nằm trong EXPORT_DIR/<target>."""
+    if backend in ("auto", "native"):
+        try:
+            return _run_native_extractions(unity_data, targets, bundle_hash)
+        except Exception as e:
+            if backend == "native":
+                raise
+            logging.warning(
+                f"Native extraction failed ({e}); falling back to AssetStudioModCLI"
+            )
+    return _run_cli_extractions(unity_data, managed_folder, targets)
+
+
+def run_asset_extractions(
+    sk_extracted_path: Path,
+    targets: Optional[List[ExtractionTarget]] = None,
+    backend: str = EXTRACTION_BACKEND,
+) -> Dict[str, List[Artifact]]:
+    """
+    Trích xuất dữ liệu từ data.unity3d. Trả về map tên target -> các artifact
+    (đường dẫn, kích thước, sha256) trong artifact store.
+    Artifact được lưu theo (hash bundle, asset type, mode, filter) nên target đã
+    trích xuất từ cùng bundle được dùng lại, không chạy lại backend. Target không
+    có file nào trả về [] và không được lưu (lần sau trích xuất lại).
+    backend: "native" (đọc UnityFS bằng Python), "assetstudio" (CLI) hoặc "auto"
+    (thử native trước, lỗi thì fallback sang AssetStudioModCLI).
+    """
+    if targets is None:
+        targets = EXTRACTION_TARGETS
+    if backend not in ("auto", "native", "assetstudio"):
+        raise ValueError(f"Unknown extraction backend: {backend}")
+
+    unity_data = find_unity_data(sk_extracted_path)
+    managed_folder = sk_extracted_path / "assets/bin/Data/Managed"
+    bundle_hash = file_sha256(unity_data)
+
+    results: Dict[str, List[Artifact]] = {}
+    keys: Dict[str, str] = {}
+    missing: List[ExtractionTarget] = []
+    for t in targets:
+        key = artifact_key(bundle_hash, t.asset_type, t.mode, t.filter_name)
+        keys[t.name] = key
+        cached = load_artifacts(key)
+        if cached is None:
+            missing.append(t)
+        else:
+            results[t.name] = cached
+
+    if results:
+        logging.info(f"Reusing extracted artifacts for: {', '.join(results)}")
+    if not missing:
+        return results
+
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    outputs = _extract(unity_data, managed_folder, missing, backend, bundle_hash)
+
+    if "i2language" in outputs:
+        outputs["i2language"] = _drop_small_i2_files(outputs["i2language"])
+
+    for t in missing:
+        files = outputs.get(t.name, [])
+        if files:
+            results[t.name] = store_artifacts(
+                keys[t.name],
+                files,
+                {
+                    "bundle_hash": bundle_hash,
+                    "target": t.name,
+                    "asset_type": t.asset_type,
+                    "mode": t.mode,
+                    "filter": t.filter_name,
+                },
+            )
+        else:
+            logging.warning(f"Extraction produced no files for {t.name}; not cached")
+            results[t.name] = []
+        shutil.rmtree(EXPORT_DIR / t.name, ignore_errors=True)
+
+    return results
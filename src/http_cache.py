@@ -0,0 +1,82 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+import requests
+from .config import HTTP_CACHE_FILE, HTTP_CACHE_TTL_SECONDS
+from .http_download import get_session
+
+
+def _load() -> Dict[str, Dict[str, Any]]:
+    if not HTTP_CACHE_FILE.exists():
+        return {}
+    try:
+        with open(HTTP_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable HTTP cache {HTTP_CACHE_FILE}: {e}")
+        return {}
+
+
+def _save(cache: Dict[str, Dict[str, Any]]) -> None:
+    HTTP_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = HTTP_CACHE_FILE.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, HTTP_CACHE_FILE)
+
+
+def cached_fetch(
+    url: str,
+    parse: Callable[[requests.Response], Any],
+    ttl: float = HTTP_CACHE_TTL_SECONDS,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 15,
+) -> Any:
+    """
+    GET `url` và trả về parse(resp), có cache trên đĩa:
+    - Trong TTL: trả kết quả đã cache, không gọi mạng.
+    - Hết TTL: gửi request có điều kiện (If-None-Match / If-Modified-Since);
+      304 thì dùng lại kết quả cũ.
+    - Lỗi mạng: fallback về kết quả tốt gần nhất (nếu có).
+    `parse` phải trả về giá trị serialize được bằng JSON.
+    """
+    cache = _load()
+    entry = cache.get(url)
+    now = time.time()
+
+    if entry and now - entry.get("fetched_at", 0) < ttl:
+        logging.info(f"Using cached response for {url}")
+        return entry["result"]
+
+    req_headers = dict(headers or {})
+    if entry:
+        if entry.get("etag"):
+            req_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            req_headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        resp = get_session().get(url, headers=req_headers, timeout=timeout)
+        if resp.status_code == 304 and entry:
+            logging.info(f"Not modified: {url}")
+            entry["fetched_at"] = now
+            _save(cache)
+            return entry["result"]
+        resp.raise_for_status()
+    except requests.RequestException as e:
+        if entry:
+            logging.warning(f"Request to {url} failed ({e}), using last known result")
+            return entry["result"]
+        raise
+
+    result = parse(resp)
+    cache[url] = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "fetched_at": now,
+        "result": result,
+    }
+    _save(cache)
+    return result
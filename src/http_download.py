@@ -0,0 +1,314 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from .config import (
+    DOWNLOAD_BACKOFF_SECONDS,
+    DOWNLOAD_PARALLEL_MIN_SIZE,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_SEGMENT_SIZE,
+    DOWNLOAD_WORKERS,
+)
+
+_CONTENT_RANGE = re.compile(r"bytes\s+\d+-\d+/(\d+)")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Session dùng chung (connection pool) cho mọi request HTTP của pipeline."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def probe(
+    session: requests.Session, url: str, verify: bool = True
+) -> Tuple[Optional[int], bool]:
+    """
+    Trả về (kích thước file, server có hỗ trợ Range hay không).
+    Thử HEAD trước, nếu thiếu thông tin thì GET "bytes=0-0".
+    """
+    size: Optional[int] = None
+    try:
+        resp = session.head(url, allow_redirects=True, timeout=30, verify=verify)
+        if resp.ok:
+            if resp.headers.get("Content-Length"):
+                size = int(resp.headers["Content-Length"])
+            if resp.headers.get("Accept-Ranges", "").lower() == "bytes" and size:
+                return size, True
+    except requests.RequestException as e:
+        logging.debug(f"HEAD {url} failed: {e}")
+
+    try:
+        with session.get(
+            url,
+            headers={"Range": "bytes=0-0"},
+            stream=True,
+            timeout=30,
+            verify=verify,
+        ) as resp:
+            resp.raise_for_status()
+            if resp.status_code == 206:
+                m = _CONTENT_RANGE.match(resp.headers.get("Content-Range", ""))
+                if m:
+                    return int(m.group(1)), True
+            elif resp.headers.get("Content-Length"):
+                size = int(resp.headers["Content-Length"])
+    except requests.RequestException as e:
+        logging.debug(f"Range probe {url} failed: {e}")
+    return size, False
+
+
+def _with_retries(action: str, fn, retries: int, backoff: float) -> Any:
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except (requests.RequestException, OSError) as e:
+            if attempt >= retries:
+                raise
+            delay = backoff * (2**attempt)
+            logging.warning(
+                f"{action} failed ({e}); retry {attempt + 1}/{retries} in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+
+class _SegmentState:
+    """
+    Tiến độ tải song song, lưu vào file <dest>.part.json để resume:
+    danh sách segment [start, end] (end inclusive) và số byte đã ghi của mỗi segment.
+    """
+
+    def __init__(self, path: Path, url: str, size: int, segments: List[List[int]]):
+        self.path = path
+        self.url = url
+        self.size = size
+        self.segments = segments
+        self.done = [0] * len(segments)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load_or_create(
+        cls, path: Path, part: Path, url: str, size: int, segment_size: int
+    ) -> "_SegmentState":
+        if path.exists() and part.exists() and part.stat().st_size == size:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("url") == url and data.get("size") == size:
+                    state = cls(path, url, size, data["segments"])
+                    state.done = data["done"]
+                    logging.info(
+                        f"Resuming download: {sum(state.done)}/{size} bytes present"
+                    )
+                    return state
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable download state {path}: {e}")
+
+        segments = [
+            [start, min(start + segment_size, size) - 1]
+            for start in range(0, size, segment_size)
+        ]
+        # Cấp phát trước file .part với đúng kích thước
+        with open(part, "wb") as f:
+            f.truncate(size)
+        state = cls(path, url, size, segments)
+        state.save()
+        return state
+
+    def advance(self, index: int, n: int) -> None:
+        with self._lock:
+            self.done[index] += n
+
+    def save(self) -> None:
+        with self._lock:
+            data = {
+                "url": self.url,
+                "size": self.size,
+                "segments": self.segments,
+                "done": self.done,
+            }
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+
+
+def _download_segment(
+    session: requests.Session,
+    url: str,
+    part: Path,
+    state: _SegmentState,
+    index: int,
+    chunk_size: int,
+    verify: bool,
+) -> None:
+    start, end = state.segments[index]
+    pos = start + state.done[index]
+    if pos > end:
+        return
+
+    with session.get(
+        url,
+        headers={"Range": f"bytes={pos}-{end}"},
+        stream=True,
+        timeout=120,
+        verify=verify,
+    ) as resp:
+        resp.raise_for_status()
+        if resp.status_code != 206:
+            raise RuntimeError(
+                f"Server ignored Range request (HTTP {resp.status_code})"
+            )
+        with open(part, "r+b") as f:
+            f.seek(pos)
+            for chunk in resp.iter_content(chunk_size=chunk_size):
+                if not chunk:
+                    continue
+                chunk = chunk[: end + 1 - pos]
+                f.write(chunk)
+                pos += len(chunk)
+                state.advance(index, len(chunk))
+                if pos > end:
+                    break
+
+    if pos <= end:
+        raise requests.ConnectionError(
+            f"Segment {start}-{end} ended early at byte {pos}"
+        )
+
+
+def _download_parallel(
+    session: requests.Session,
+    url: str,
+    part: Path,
+    size: int,
+    workers: int,
+    segment_size: int,
+    chunk_size: int,
+    retries: int,
+    backoff: float,
+    verify: bool,
+) -> None:
+    state_path = part.with_name(part.name + ".json")
+    state = _SegmentState.load_or_create(state_path, part, url, size, segment_size)
+    pending = [
+        i
+        for i, (start, end) in enumerate(state.segments)
+        if start + state.done[i] <= end
+    ]
+    logging.info(f"Parallel download: {len(pending)} segments, {workers} connections")
+
+    def run(index: int) -> None:
+        _with_retries(
+            f"Segment {index}",
+            lambda: _download_segment(
+                session, url, part, state, index, chunk_size, verify
+            ),
+            retries,
+            backoff,
+        )
+        state.save()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(run, i) for i in pending]:
+                future.result()
+    finally:
+        state.save()
+
+    state_path.unlink(missing_ok=True)
+
+
+def _download_stream(
+    session: requests.Session,
+    url: str,
+    part: Path,
+    resumable: bool,
+    chunk_size: int,
+    verify: bool,
+) -> None:
+    """Tải tuần tự; nếu server hỗ trợ Range thì tiếp tục từ cuối file .part."""
+    offset = part.stat().st_size if resumable and part.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    with session.get(
+        url, headers=headers, stream=True, timeout=120, verify=verify
+    ) as resp:
+        if resp.status_code == 416 and offset:
+            # .part đã đủ dữ liệu
+            return
+        resp.raise_for_status()
+        if offset and resp.status_code != 206:
+            offset = 0
+        with open(part, "ab" if offset else "wb") as f:
+            for chunk in resp.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+
+
+def download(
+    url: str,
+    dest: Path,
+    session: Optional[requests.Session] = None,
+    workers: int = DOWNLOAD_WORKERS,
+    segment_size: int = DOWNLOAD_SEGMENT_SIZE,
+    chunk_size: int = 1 << 16,
+    retries: int = DOWNLOAD_RETRIES,
+    backoff: float = DOWNLOAD_BACKOFF_SECONDS,
+    verify: bool = True,
+) -> Path:
+    """
+    Tải `url` về `dest` qua file tạm <dest>.part (có thể resume).
+    File lớn trên server hỗ trợ Range được tải song song theo segment vào file
+    cấp phát trước; ngược lại tải tuần tự, resume từ cuối .part nếu được.
+    """
+    session = session or get_session()
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + ".part")
+
+    size, ranges = probe(session, url, verify)
+    if ranges and size and size >= DOWNLOAD_PARALLEL_MIN_SIZE and workers > 1:
+        _download_parallel(
+            session,
+            url,
+            part,
+            size,
+            workers,
+            segment_size,
+            chunk_size,
+            retries,
+            backoff,
+            verify,
+        )
+    else:
+        _with_retries(
+            f"Download {url}",
+            lambda: _download_stream(session, url, part, ranges, chunk_size, verify),
+            retries,
+            backoff,
+        )
+
+    if size is not None and part.stat().st_size != size:
+        raise RuntimeError(
+            f"Size mismatch for {url}: expected {size}, got {part.stat().st_size}"
+        )
+    os.replace(part, dest)
+    return dest
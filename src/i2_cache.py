@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import os
+import re
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import List, Optional, Tuple
+from . import metrics
+from .config import I2_CACHE_DIR, I2_CACHE_MAX_BYTES
+from .language_table import LanguageTable
+from .parser import PARSER_VERSION, iter_i2_records
+from .utils import file_sha256
+
+# Định dạng file cache:
+#   header: magic, format version, số record, số cột
+#   sau đó là các section [u64 độ dài][payload]:
+#     - tên ngôn ngữ (UTF-8, phân tách bằng "\n")
+#     - field counts (array u32, 1 phần tử / record)
+#     - key offsets (array u32, n + 1) + key blob (UTF-8)
+#     - với mỗi cột ngôn ngữ: offsets (n + 1) + blob
+# Offset tính theo ký tự của blob đã decode, nên chỉ cần decode mỗi blob một lần.
+CACHE_MAGIC = b"SKI2"
+CACHE_FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<4sIII")
+_SECTION_LEN = struct.Struct("<Q")
+
+
+def cache_key(
+    dat_hash: str, filter_patterns: Optional[List[re.Pattern[str]]] = None
+) -> str:
+    """Key cache = hash(.dat) + version parser + version định dạng + filter."""
+    h = hashlib.sha256()
+    h.update(f"{CACHE_FORMAT_VERSION}:{PARSER_VERSION}:{dat_hash}".encode())
+    for p in filter_patterns or []:
+        h.update(b"\0" + p.pattern.encode())
+    return h.hexdigest()
+
+
+def _cache_path(key: str) -> Path:
+    return I2_CACHE_DIR / f"{key}.bin"
+
+
+def _u32_array(values: List[int]) -> bytes:
+    arr = array("I", values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _read_u32_array(payload: bytes) -> array:
+    arr = array("I")
+    arr.frombytes(payload)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+def _encode_column(values: List[str]) -> Tuple[bytes, bytes]:
+    offsets = [0]
+    total = 0
+    for v in values:
+        total += len(v)
+        offsets.append(total)
+    return _u32_array(offsets), "".join(values).encode("utf-8")
+
+
+def _decode_column(offsets_payload: bytes, blob_payload: bytes) -> List[str]:
+    offsets = _read_u32_array(offsets_payload)
+    blob = blob_payload.decode("utf-8")
+    return [blob[offsets[i] : offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def serialize_table(table: LanguageTable) -> bytes:
+    """Đóng gói LanguageTable thành bytes theo định dạng cache."""
+    n = len(table)
+    n_cols = len(table.columns)
+
+    sections = [
+        "\n".join(table.languages).encode("utf-8"),
+        _u32_array(table.field_counts),
+    ]
+    sections.extend(_encode_column(table.keys))
+    for column in table.columns:
+        sections.extend(_encode_column(column))
+
+    parts = [_HEADER.pack(CACHE_MAGIC, CACHE_FORMAT_VERSION, n, n_cols)]
+    for payload in sections:
+        parts.append(_SECTION_LEN.pack(len(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def deserialize_table(data: bytes) -> LanguageTable:
+    magic, fmt, n, n_cols = _HEADER.unpack_from(data, 0)
+    if magic != CACHE_MAGIC or fmt != CACHE_FORMAT_VERSION:
+        raise ValueError("Unsupported I2 cache format")
+
+    pos = _HEADER.size
+    sections: List[bytes] = []
+    for _ in range(2 + 2 * (n_cols + 1)):
+        (length,) = _SECTION_LEN.unpack_from(data, pos)
+        pos += _SECTION_LEN.size
+        sections.append(data[pos : pos + length])
+        pos += length
+
+    languages = sections[0].decode("utf-8").split("\n") if sections[0] else []
+    counts = _read_u32_array(sections[1])
+    keys = _decode_column(sections[2], sections[3])
+    columns = [
+        _decode_column(sections[4 + 2 * j], sections[5 + 2 * j])
+        for j in range(n_cols)
+    ]
+    if len(counts) != n or len(keys) != n or any(len(c) != n for c in columns):
+        raise ValueError("Corrupted I2 cache file")
+
+    return LanguageTable(keys, columns, counts.tolist(), languages)
+
+
+def load_table(key: str) -> Optional[LanguageTable]:
+    path = _cache_path(key)
+    if not path.exists():
+        return None
+    try:
+        table = deserialize_table(path.read_bytes())
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable I2 cache {path.name}: {e}")
+        return None
+    # Cập nhật mtime để eviction giữ lại các entry vừa dùng
+    os.utime(path)
+    return table
+
+
+def store_table(key: str, table: LanguageTable) -> Path:
+    I2_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _cache_path(key)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(serialize_table(table))
+    os.replace(tmp, path)
+    evict(I2_CACHE_MAX_BYTES)
+    return path
+
+
+def evict(max_bytes: int = I2_CACHE_MAX_BYTES) -> None:
+    """Xóa các entry cũ nhất (theo mtime) cho đến khi tổng dung lượng <= max_bytes."""
+    if not I2_CACHE_DIR.exists():
+        return
+    entries = []
+    for p in I2_CACHE_DIR.glob("*.bin"):
+        st = p.stat()
+        entries.append((st.st_mtime, st.st_size, p))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in entries:
+        if total <= max_bytes:
+            break
+        try:
+            p.unlink()
+            total -= size
+            logging.info(f"Evicted I2 cache entry: {p.name}")
+        except OSError:
+            pass
+
+
+def clear() -> None:
+    """Xóa toàn bộ cache I2 (vd. khi sửa parser mà chưa tăng PARSER_VERSION)."""
+    evict(0)
+
+
+@metrics.timed(records=len)
+def cached_language_table(
+    file_path: Path,
+    filter_patterns: Optional[List[re.Pattern[str]]] = None,
+    dat_hash: Optional[str] = None,
+) -> LanguageTable:
+    """
+    Trả về LanguageTable của file .dat, dùng cache nhị phân theo hash nội dung.
+    Cache miss: build bảng từ stream đã sort của parser rồi lưu cache.
+    dat_hash: sha256 của file nếu đã biết (vd. từ artifact store), tránh hash lại.
+    """
+    if not file_path.exists():
+        raise FileNotFoundError(f"I2 .dat file not found: {file_path}")
+
+    key = cache_key(dat_hash or file_sha256(file_path), filter_patterns)
+    table = load_table(key)
+    if table is not None:
+        logging.info(f"I2 cache hit for {file_path.name} ({len(table)} records)")
+        return table
+
+    logging.info(f"I2 cache miss for {file_path.name}, parsing...")
+    table = LanguageTable.from_records(
+        iter_i2_records(file_path, filter_patterns, sort=True)
+    )
+    store_table(key, table)
+    return table
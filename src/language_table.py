@@ -0,0 +1,79 @@
+import csv
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+from .config import LANGUAGES
+from .parser import Record
+
+
+class LanguageTable:
+    """
+    Bảng I2 trong RAM: danh sách key (đã sort) và một cột giá trị cho mỗi ngôn ngữ.
+    Được truyền thẳng từ parser sang data_manager/exporter; CSV chỉ là một cách serialize.
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        columns: List[List[str]],
+        field_counts: List[int],
+        languages: Optional[List[str]] = None,
+    ) -> None:
+        self.keys = keys
+        self.columns = columns
+        self.field_counts = field_counts
+        self.languages = list(languages if languages is not None else LANGUAGES)
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[Record], languages: Optional[List[str]] = None
+    ) -> "LanguageTable":
+        keys: List[str] = []
+        columns: List[List[str]] = []
+        field_counts: List[int] = []
+        for key, fields in records:
+            n = len(fields)
+            # Thêm cột mới (điền "" cho các record trước đó) nếu record có nhiều field hơn
+            while len(columns) < n:
+                columns.append([""] * len(keys))
+            for j, column in enumerate(columns):
+                column.append(fields[j] if j < n else "")
+            keys.append(key)
+            field_counts.append(n)
+        return cls(keys, columns, field_counts, languages)
+
+    @classmethod
+    def from_csv(cls, csv_path: Path) -> "LanguageTable":
+        """Đọc lại bảng từ I2language.csv (do exporter.write_i2_csv ghi ra)."""
+        if not csv_path.exists():
+            raise FileNotFoundError(f"CSV path not found: {csv_path}")
+
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, ["id"])
+            records = (
+                (row[0].strip(), [v.strip() for v in row[1:]]) for row in reader if row
+            )
+            return cls.from_records(records, header[1:])
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def records(self) -> Iterator[Record]:
+        """Yield (key, [fields...]) giống output của parser."""
+        columns = self.columns
+        for i, key in enumerate(self.keys):
+            yield key, [columns[j][i] for j in range(self.field_counts[i])]
+
+    def column(self, language: str) -> List[str]:
+        """Cột giá trị thô của một ngôn ngữ ("" nếu ngôn ngữ không có trong bảng)."""
+        try:
+            j = self.languages.index(language)
+        except ValueError:
+            return [""] * len(self.keys)
+        if j >= len(self.columns):
+            return [""] * len(self.keys)
+        return self.columns[j]
+
+    def raw_map(self, language: str = "English") -> Dict[str, str]:
+        """Map key -> giá trị thô (chưa resolve alias) của một ngôn ngữ."""
+        return dict(zip(self.keys, self.column(language)))
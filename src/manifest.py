@@ -0,0 +1,106 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+from .config import (
+    ASSET_STUDIO_ZIP,
+    MANIFEST_FILE_NAME,
+    METRICS_FILE_NAME,
+    PIPELINE_VERSION,
+    PROFILE_DIR_NAME,
+)
+from .output_writer import get_profile, write_text
+from .utils import file_sha256
+
+
+def manifest_path(output_dir: Path) -> Path:
+    return output_dir / MANIFEST_FILE_NAME
+
+
+def _hash_outputs(output_dir: Path) -> Dict[str, str]:
+    # metrics.json và profile/ (output/ của các bản cũ) không phải dữ liệu export
+    skipped = {MANIFEST_FILE_NAME, METRICS_FILE_NAME, PROFILE_DIR_NAME}
+    return {
+        p.relative_to(output_dir).as_posix(): file_sha256(p)
+        for p in sorted(output_dir.rglob("*"))
+        if p.is_file() and p.relative_to(output_dir).parts[0] not in skipped
+    }
+
+
+def tool_versions() -> Dict[str, str]:
+    tools = {"pipeline": PIPELINE_VERSION}
+    if ASSET_STUDIO_ZIP.exists():
+        tools["asset_studio_zip"] = file_sha256(ASSET_STUDIO_ZIP)
+    return tools
+
+
+def write_manifest(
+    version: str, output_dir: Path, inputs: Dict[str, Optional[Path]]
+) -> Path:
+    """
+    Ghi manifest hoàn tất cho output/<version>: hash input, hash từng file output
+    và version của tool. Chỉ gọi sau khi mọi export đã thành công.
+
+    Manifest được commit cùng output nên chỉ chứa dữ liệu xác định (không thời
+    điểm chạy, không version Python) và chỉ được ghi lại khi nội dung đổi: build
+    lại ra cùng output thì không tạo diff.
+    """
+    manifest: Dict[str, Any] = {
+        "version": version,
+        "tools": tool_versions(),
+        "output_profile": get_profile().to_json(),
+        "inputs": {
+            name: file_sha256(path)
+            for name, path in inputs.items()
+            if path is not None and path.exists()
+        },
+        "outputs": _hash_outputs(output_dir),
+    }
+    path = manifest_path(output_dir)
+    text = json.dumps(manifest, indent=2, ensure_ascii=False, sort_keys=True)
+    if write_text(path, text):
+        logging.info(f"Wrote completion manifest: {path}")
+    else:
+        logging.info(f"Completion manifest unchanged: {path}")
+    return path
+
+
+def load_manifest(output_dir: Path) -> Optional[Dict[str, Any]]:
+    path = manifest_path(output_dir)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logging.warning(f"Unreadable manifest {path}: {e}")
+        return None
+
+
+def is_version_complete(version: str, output_dir: Path) -> bool:
+    """
+    Kiểm tra nhanh (không cần tải APK): manifest tồn tại, cùng PIPELINE_VERSION,
+    và mọi file output trong manifest còn nguyên (hash khớp).
+    """
+    manifest = load_manifest(output_dir)
+    if manifest is None:
+        return False
+    if manifest.get("version") != version:
+        logging.info("Manifest version mismatch, rebuilding.")
+        return False
+    if manifest.get("tools", {}).get("pipeline") != PIPELINE_VERSION:
+        logging.info("Pipeline version changed since last export, rebuilding.")
+        return False
+    if manifest.get("output_profile") != get_profile().to_json():
+        logging.info("Output profile changed since last export, rebuilding.")
+        return False
+
+    outputs = manifest.get("outputs") or {}
+    if not outputs:
+        return False
+    for name, digest in outputs.items():
+        path = output_dir / name
+        if not path.is_file() or file_sha256(path) != digest:
+            logging.info(f"Output {name} missing or modified, rebuilding.")
+            return False
+    return True
@@ -0,0 +1,232 @@
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+# Đo đạc cho pipeline: mỗi lần gọi measure() ghi một entry gồm wall time, CPU time
+# của thread, RSS lúc bắt đầu/kết thúc, mức peak RSS của process tăng thêm trong
+# stage (ru_maxrss là peak cả đời process nên chỉ phần tăng mới thuộc về stage; 0
+# nghĩa là stage không vượt peak trước đó), số byte đọc/ghi (process, theo
+# /proc/self/io) và số record. Khi nhiều stage chạy song song, RSS và I/O là số
+# liệu của cả process trong khoảng thời gian đó, không tách riêng được theo stage.
+
+_lock = threading.Lock()
+_entries: List[Dict[str, Any]] = []
+_local = threading.local()
+_started = time.perf_counter()
+_started_at = datetime.now(timezone.utc)
+
+_profile_stages: Optional[Set[str]] = None
+_profile_all = False
+_profile_dir: Optional[Path] = None
+
+
+def reset() -> None:
+    """Xóa mọi entry và tắt profiling (gọi đầu mỗi lần chạy)."""
+    global _started, _started_at, _profile_stages, _profile_all, _profile_dir
+    with _lock:
+        _entries.clear()
+        _started = time.perf_counter()
+        _started_at = datetime.now(timezone.utc)
+        _profile_stages = None
+        _profile_all = False
+        _profile_dir = None
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak RSS của process hiện tại (KB), None nếu hệ điều hành không hỗ trợ."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def current_rss_kb() -> Optional[int]:
+    """RSS hiện tại của process (KB, theo /proc/self/statm), None nếu không đọc được."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def _io_counters() -> Optional[Dict[str, int]]:
+    try:
+        with open("/proc/self/io", "r") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return {"read": int(fields["rchar"]), "write": int(fields["wchar"])}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def record(name: str, **fields: Any) -> None:
+    """Thêm một entry có sẵn số liệu (vd. process AssetStudioModCLI)."""
+    entry = {"name": name, "thread": threading.current_thread().name}
+    entry.update(fields)
+    with _lock:
+        _entries.append(entry)
+
+
+def add_records(n: int) -> None:
+    """Cộng số record đã xử lý vào measure() đang chạy trong thread hiện tại."""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1]["records"] = stack[-1].get("records", 0) + n
+
+
+@contextmanager
+def measure(name: str) -> Iterator[Dict[str, Any]]:
+    """
+    Đo khối code. Entry được yield ra để code bên trong có thể gán thêm thông tin
+    (vd. entry["records"] = n); add_records() cũng cộng vào entry này.
+    """
+    entry: Dict[str, Any] = {"name": name, "thread": threading.current_thread().name}
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(entry)
+
+    io_before = _io_counters()
+    peak_before = peak_rss_kb()
+    entry["rss_start_kb"] = current_rss_kb()
+    start_cpu = time.thread_time()
+    start = time.perf_counter()
+    entry["start_seconds"] = round(start - _started, 6)
+    try:
+        yield entry
+    except BaseException:
+        entry["failed"] = True
+        raise
+    finally:
+        entry["wall_seconds"] = round(time.perf_counter() - start, 6)
+        entry["cpu_seconds"] = round(time.thread_time() - start_cpu, 6)
+        entry["rss_end_kb"] = current_rss_kb()
+        peak_after = peak_rss_kb()
+        if peak_before is not None and peak_after is not None:
+            entry["peak_rss_growth_kb"] = peak_after - peak_before
+        io_after = _io_counters()
+        if io_before and io_after:
+            entry["read_bytes"] = io_after["read"] - io_before["read"]
+            entry["write_bytes"] = io_after["write"] - io_before["write"]
+        stack.pop()
+        with _lock:
+            _entries.append(entry)
+
+
+def timed(
+    name: Optional[str] = None, records: Optional[Callable[[Any], int]] = None
+) -> Callable:
+    """
+    Decorator: đo mỗi lần gọi hàm bằng measure(). records(kết quả) -> số record,
+    ghi vào entry nếu có.
+    """
+
+    def decorate(fn: Callable) -> Callable:
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with measure(label) as entry:
+                result = fn(*args, **kwargs)
+                if records is not None:
+                    entry["records"] = entry.get("records", 0) + records(result)
+                return result
+
+        return wrapper
+
+    return decorate
+
+
+def enable_profiling(stages: Optional[List[str]], out_dir: Path) -> None:
+    """Bật cProfile cho các stage (danh sách rỗng/None = mọi stage)."""
+    global _profile_stages, _profile_all, _profile_dir
+    _profile_all = not stages
+    _profile_stages = set(stages or [])
+    _profile_dir = out_dir
+
+
+def profiling_enabled() -> bool:
+    return _profile_dir is not None
+
+
+@contextmanager
+def profiled(stage: str) -> Iterator[None]:
+    """
+    Chạy khối code dưới cProfile nếu stage được bật profiling, ghi
+    <profile dir>/<stage>.prof (pstats) và <stage>.txt (top hàm theo cumulative).
+    """
+    if _profile_dir is None or not (_profile_all or stage in _profile_stages):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Chỉ một profiler được active tại một thời điểm
+        logging.warning(f"Cannot profile {stage}: {e}")
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _profile_dir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(_profile_dir / f"{stage}.prof"))
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(40)
+        (_profile_dir / f"{stage}.txt").write_text(text.getvalue(), encoding="utf-8")
+        logging.info(f"Profile for {stage} written to {_profile_dir}")
+
+
+def summary() -> Dict[str, Dict[str, Any]]:
+    """Tổng hợp theo tên: số lần gọi, tổng wall/CPU time, tổng record."""
+    out: Dict[str, Dict[str, Any]] = {}
+    with _lock:
+        entries = list(_entries)
+    for e in entries:
+        s = out.setdefault(
+            e["name"], {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0}
+        )
+        s["calls"] += 1
+        s["wall_seconds"] = round(s["wall_seconds"] + e.get("wall_seconds", 0.0), 6)
+        s["cpu_seconds"] = round(s["cpu_seconds"] + e.get("cpu_seconds", 0.0), 6)
+        if "records" in e:
+            s["records"] = s.get("records", 0) + e["records"]
+    return out
+
+
+def write_report(path: Path, version: str) -> Path:
+    """Ghi metrics.json: thông tin lần chạy, từng entry theo thứ tự kết thúc, tổng hợp."""
+    with _lock:
+        entries = list(_entries)
+    report = {
+        "version": version,
+        "started_at": _started_at.isoformat(timespec="seconds"),
+        "total_wall_seconds": round(time.perf_counter() - _started, 6),
+        "process_peak_rss_kb": peak_rss_kb(),
+        "pid": os.getpid(),
+        "entries": entries,
+        "summary": summary(),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    logging.info(f"Metrics written to {path}")
+    return path
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from . import unityfs
+from .config import OBJECT_INDEX_DIR
+from .utils import file_sha256
+
+# Tăng khi đổi định dạng file index hoặc cách unityfs đọc object
+INDEX_FORMAT_VERSION = 1
+
+_CLASS_NAMES = {class_id: name for name, class_id in unityfs.CLASS_IDS.items()}
+
+
+class IndexedObject(NamedTuple):
+    """Vị trí của một object trong bundle: block chứa nó và offset trong block."""
+
+    name: str
+    asset_type: str
+    path_id: int
+    node_path: str
+    block: int
+    block_offset: int
+    size: int
+    big_endian: bool
+
+
+class ObjectIndex:
+    """
+    Index object (TextAsset, MonoBehaviour) của một data.unity3d, theo hash bundle.
+    Dùng để đọc thẳng object mà không phải quét lại metadata của bundle.
+    """
+
+    def __init__(self, bundle_hash: str, objects: List[IndexedObject]) -> None:
+        self.bundle_hash = bundle_hash
+        self.objects = objects
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def find(
+        self, asset_type: Optional[str] = None, name_filter: Optional[str] = None
+    ) -> List[IndexedObject]:
+        """Lọc theo asset type và tên (chứa, không phân biệt hoa thường, giống AssetStudio)."""
+        asset_type = asset_type.lower() if asset_type else None
+        needle = name_filter.lower() if name_filter else None
+        return [
+            o
+            for o in self.objects
+            if (asset_type is None or o.asset_type == asset_type)
+            and (needle is None or needle in o.name.lower())
+        ]
+
+    def to_json(self) -> Dict:
+        return {
+            "format": INDEX_FORMAT_VERSION,
+            "bundle_hash": self.bundle_hash,
+            "fields": list(IndexedObject._fields),
+            "objects": [list(o) for o in self.objects],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "ObjectIndex":
+        if data.get("format") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported object index format {data.get('format')}")
+        if data.get("fields") != list(IndexedObject._fields):
+            raise ValueError("Object index fields mismatch")
+        return cls(data["bundle_hash"], [IndexedObject(*o) for o in data["objects"]])
+
+
+def build_index(bundle: unityfs.UnityFSBundle, bundle_hash: str) -> ObjectIndex:
+    """Quét metadata của mọi SerializedFile trong bundle (một lần)."""
+    objects: List[IndexedObject] = []
+    for obj in bundle.iter_objects(list(_CLASS_NAMES)):
+        block = bundle.block_index(obj.offset)
+        objects.append(
+            IndexedObject(
+                obj.name,
+                _CLASS_NAMES[obj.class_id],
+                obj.path_id,
+                obj.node_path,
+                block,
+                obj.offset - bundle.block_data_offsets[block],
+                obj.size,
+                obj.big_endian,
+            )
+        )
+    return ObjectIndex(bundle_hash, objects)
+
+
+def object_info(bundle: unityfs.UnityFSBundle, obj: IndexedObject) -> unityfs.ObjectInfo:
+    """Chuyển entry của index về ObjectInfo để đọc bằng unityfs.read_*."""
+    return unityfs.ObjectInfo(
+        obj.node_path,
+        obj.path_id,
+        unityfs.CLASS_IDS[obj.asset_type],
+        bundle.block_data_offsets[obj.block] + obj.block_offset,
+        obj.size,
+        obj.name,
+        obj.big_endian,
+    )
+
+
+def _index_path(bundle_hash: str) -> Path:
+    return OBJECT_INDEX_DIR / f"{bundle_hash}.json"
+
+
+def load_index(bundle_hash: str) -> Optional[ObjectIndex]:
+    path = _index_path(bundle_hash)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return ObjectIndex.from_json(json.load(f))
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable object index {path.name}: {e}")
+        return None
+
+
+def store_index(index: ObjectIndex) -> Path:
+    OBJECT_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    path = _index_path(index.bundle_hash)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index.to_json(), f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+def load_or_build_index(
+    bundle_path: Path,
+    bundle: Optional[unityfs.UnityFSBundle] = None,
+    bundle_hash: Optional[str] = None,
+) -> ObjectIndex:
+    """
+    Index của bundle: đọc từ cache nếu đã có (theo hash nội dung), nếu không thì
+    quét bundle và lưu lại cho các lần trích xuất sau.
+    """
+    bundle_hash = bundle_hash or file_sha256(bundle_path)
+    index = load_index(bundle_hash)
+    if index is not None:
+        logging.info(f"Object index hit for {bundle_path.name} ({len(index)} objects)")
+        return index
+
+    logging.info(f"Building object index for {bundle_path.name}...")
+    if bundle is not None:
+        index = build_index(bundle, bundle_hash)
+    else:
+        with unityfs.UnityFSBundle(bundle_path) as opened:
+            index = build_index(opened, bundle_hash)
+    store_index(index)
+    return index
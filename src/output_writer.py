@@ -0,0 +1,327 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+from .config import OUTPUT_COMPRESSION, OUTPUT_PROFILE
+from .utils import file_sha256
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Ghi file output chỉ khi nội dung thay đổi: so sánh kích thước + SHA-256 với file
+# hiện có, bỏ qua nếu giống hệt (mtime giữ nguyên, git không phải hash lại), nếu
+# khác thì ghi ra file tạm cùng thư mục rồi os.replace (không bao giờ để lại file
+# ghi dở). Kết quả từng file được ghi nhận để tổng hợp cuối mỗi lần chạy.
+
+_lock = threading.Lock()
+_results: Dict[str, bool] = {}
+
+PROFILES = ("pretty", "minified")
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+class OutputProfile(NamedTuple):
+    """
+    Cách serialize output: name là "pretty" (indent 2, như trước đây) hoặc
+    "minified"; compression là các bản nén (.gz/.br) được ghi cạnh mỗi output, tạo
+    trong cùng lần serialize. Bản nén là deterministic (gzip mtime=0) nên cũng chỉ
+    được ghi lại khi nội dung đổi.
+    """
+
+    name: str = "pretty"
+    compression: Tuple[str, ...] = ()
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"name": self.name, "compression": list(self.compression)}
+
+
+def _check_profile(profile: OutputProfile) -> OutputProfile:
+    if profile.name not in PROFILES:
+        raise ValueError(f"Unknown output profile: {profile.name}")
+    for method in profile.compression:
+        if method not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown output compression: {method}")
+        if method == "br" and brotli is None:
+            raise RuntimeError("Brotli output requires the brotli package")
+    return profile
+
+
+_profile = OutputProfile(OUTPUT_PROFILE, tuple(OUTPUT_COMPRESSION))
+
+
+def set_profile(profile: OutputProfile) -> None:
+    """Đổi profile cho các lần ghi tiếp theo (process hiện tại)."""
+    global _profile
+    _profile = _check_profile(profile)
+
+
+def get_profile() -> OutputProfile:
+    return _profile
+
+
+def sibling_paths(path: Path) -> List[Path]:
+    """Các bản nén của path theo profile hiện tại."""
+    return [
+        path.with_name(path.name + COMPRESSION_SUFFIXES[m]) for m in _profile.compression
+    ]
+
+
+def with_siblings(paths: Iterable[Path]) -> Tuple[Path, ...]:
+    """paths kèm các bản nén của chúng (dùng làm outputs của stage pipeline)."""
+    return tuple(p for path in paths for p in [path, *sibling_paths(path)])
+
+
+class _Compressor:
+    """Nén dần từng chunk; finish() trả về toàn bộ dữ liệu nén."""
+
+    def __init__(self, method: str) -> None:
+        self._chunks: List[bytes] = []
+        if method == "gzip":
+            # wbits=31: định dạng gzip, header của zlib có mtime=0 (deterministic)
+            obj = zlib.compressobj(9, zlib.DEFLATED, 31)
+            self._update, self._flush = obj.compress, obj.flush
+        else:
+            obj = brotli.Compressor(quality=11)
+            self._update, self._flush = obj.process, obj.finish
+
+    def update(self, data: bytes) -> None:
+        self._chunks.append(self._update(data))
+
+    def finish(self) -> bytes:
+        self._chunks.append(self._flush())
+        return b"".join(self._chunks)
+
+
+def _compressors() -> List[Tuple[str, _Compressor]]:
+    return [
+        (COMPRESSION_SUFFIXES[m], _Compressor(m)) for m in _profile.compression
+    ]
+
+
+def reset() -> None:
+    """Xóa kết quả đã ghi nhận (gọi đầu mỗi lần chạy)."""
+    with _lock:
+        _results.clear()
+
+
+def record(path: Path, changed: bool) -> None:
+    """Ghi nhận kết quả ghi một file."""
+    with _lock:
+        _results[str(path)] = changed
+
+
+def results() -> Dict[str, bool]:
+    """{path: đã thay đổi} đã ghi nhận trong process hiện tại."""
+    with _lock:
+        return dict(_results)
+
+
+def summary() -> Dict[str, List[str]]:
+    """{"changed": [...], "unchanged": [...]} cho các file đã ghi từ lần reset() cuối."""
+    current = results()
+    return {
+        "changed": sorted(p for p, changed in current.items() if changed),
+        "unchanged": sorted(p for p, changed in current.items() if not changed),
+    }
+
+
+def _temp_path(path: Path) -> Path:
+    # Mỗi process/thread một file tạm riêng, cùng thư mục để os.replace là atomic
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _same_content(path: Path, size: int, digest: str) -> bool:
+    try:
+        if path.stat().st_size != size:
+            return False
+    except FileNotFoundError:
+        return False
+    return file_sha256(path) == digest
+
+
+def _commit(tmp: Path, path: Path) -> bool:
+    """Thay path bằng tmp nếu nội dung khác; trả về True nếu path đã thay đổi."""
+    if _same_content(path, tmp.stat().st_size, file_sha256(tmp)):
+        tmp.unlink()
+        changed = False
+    else:
+        os.replace(tmp, path)
+        changed = True
+    record(path, changed)
+    return changed
+
+
+def write_bytes(path: Path, data: bytes) -> bool:
+    """Ghi data vào path nếu khác nội dung hiện tại. Trả về True nếu đã ghi."""
+    if _same_content(path, len(data), hashlib.sha256(data).hexdigest()):
+        record(path, False)
+        return False
+    tmp = _temp_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    record(path, True)
+    return True
+
+
+def write_text(path: Path, text: str) -> bool:
+    return write_bytes(path, text.encode("utf-8"))
+
+
+def _remove_stale_siblings(path: Path) -> None:
+    """Xóa các bản nén của path không thuộc profile hiện tại (từ profile cũ)."""
+    for method, suffix in COMPRESSION_SUFFIXES.items():
+        if method in _profile.compression:
+            continue
+        sibling = path.with_name(path.name + suffix)
+        try:
+            sibling.unlink()
+        except FileNotFoundError:
+            continue
+        logging.info(f"Removed stale {method} output: {sibling}")
+        record(sibling, True)
+
+
+def _write_siblings(path: Path, changed: bool, data: Optional[bytes] = None) -> None:
+    """
+    Ghi các bản nén của path (từ data, hoặc đọc lại path). Nếu path không đổi và
+    bản nén đã có thì bỏ qua, không nén lại. Bản nén ngoài profile bị xóa.
+    """
+    _remove_stale_siblings(path)
+    for method in _profile.compression:
+        sibling = path.with_name(path.name + COMPRESSION_SUFFIXES[method])
+        if not changed and sibling.exists():
+            record(sibling, False)
+            continue
+        if data is None:
+            data = path.read_bytes()
+        compressor = _Compressor(method)
+        compressor.update(data)
+        write_bytes(sibling, compressor.finish())
+
+
+def write_output(path: Path, data: bytes) -> bool:
+    """write_bytes cho một output, kèm các bản nén theo profile."""
+    changed = write_bytes(path, data)
+    _write_siblings(path, changed, data)
+    return changed
+
+
+def dumps_json(data: Any, sort_keys: bool = False) -> bytes:
+    """
+    Serialize JSON (UTF-8, không escape ký tự non-ASCII) theo profile hiện tại. Dùng
+    orjson nếu đã cài (nhanh hơn nhiều lần; output giống json.dumps trừ cách viết
+    một số số thực), fallback về json nếu orjson không serialize được.
+    """
+    pretty = _profile.name == "pretty"
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(data, option=option)
+        except TypeError:
+            pass
+    text = json.dumps(
+        data,
+        ensure_ascii=False,
+        sort_keys=sort_keys,
+        indent=2 if pretty else None,
+        separators=None if pretty else (",", ":"),
+    )
+    return text.encode("utf-8")
+
+
+def write_json(path: Path, data: Any, sort_keys: bool = False) -> bool:
+    """Serialize data vào buffer (dumps_json) rồi write_output."""
+    return write_output(path, dumps_json(data, sort_keys))
+
+
+class _TeeWriter(io.RawIOBase):
+    """Ghi vào file và đồng thời đưa cùng các byte đó cho các compressor."""
+
+    def __init__(self, f: io.BufferedWriter, compressors: List[_Compressor]) -> None:
+        self._f = f
+        self._compressors = compressors
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._f.write(b)
+        for compressor in self._compressors:
+            compressor.update(bytes(b))
+        return len(b)
+
+
+@contextmanager
+def open_atomic(path: Path, newline: Optional[str] = None) -> Iterator[TextIO]:
+    """
+    File text (utf-8) để ghi dần các output lớn (CSV, TXT) mà không giữ cả nội dung
+    trong RAM: ghi vào file tạm (và nén song song theo profile), khi thoát khối mới
+    so sánh và thay path nếu khác. Lỗi trong khối thì xóa file tạm, path giữ nguyên.
+    """
+    tmp = _temp_path(path)
+    compressors = _compressors()
+    try:
+        with open(tmp, "wb") as raw:
+            tee = io.BufferedWriter(_TeeWriter(raw, [c for _, c in compressors]))
+            with io.TextIOWrapper(tee, encoding="utf-8", newline=newline) as f:
+                yield f
+        _commit(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    _remove_stale_siblings(path)
+    for suffix, compressor in compressors:
+        write_bytes(path.with_name(path.name + suffix), compressor.finish())
+
+
+def copy_file(src: Path, dest: Path) -> bool:
+    """shutil.copy2 src -> dest nếu nội dung khác (kèm bản nén). True nếu đã copy."""
+    if _same_content(dest, src.stat().st_size, file_sha256(src)):
+        record(dest, False)
+        _write_siblings(dest, False)
+        return False
+    tmp = _temp_path(dest)
+    try:
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    record(dest, True)
+    _write_siblings(dest, True)
+    return True
+
+
+def log_summary() -> Dict[str, List[str]]:
+    """Log số file thay đổi/không đổi của lần chạy, trả về summary()."""
+    result = summary()
+    logging.info(
+        f"Outputs: {len(result['changed'])} changed, "
+        f"{len(result['unchanged'])} unchanged"
+    )
+    for path in result["changed"]:
+        logging.info(f"  changed: {path}")
+    return result
@@ -1,98 +1,202 @@
+import heapq
+import mmap
+import pickle
 import re
+import struct
+import tempfile
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import IO, Iterable, Iterator, List, Tuple, Optional
+from . import metrics
 from .utils import sanitize_text
-from .config import LANGUAGES
+from .config import LANGUAGES, I2_SORT_RUN_SIZE
 
+Record = Tuple[str, List[str]]
 
-def parse_i2_asset_file(
-    file_path: Path, filter_patterns: Optional[List[re.Pattern[str]]] = None
-) -> Tuple[List[Tuple[str, List[str]]], List[str]]:
+# Tăng số này mỗi khi logic parse thay đổi để vô hiệu hóa cache I2 cũ (xem i2_cache)
+PARSER_VERSION = 1
+
+# Header của I2Languages.dat (bỏ qua)
+I2_HEADER_SIZE = 60
+
+# Unpack u32 little-endian trực tiếp trên buffer, không tạo bytes trung gian
+_U32 = struct.Struct("<I")
+
+# Tìm byte khác 0 đầu tiên (dùng để nhảy qua vùng zero-padding)
+_NON_ZERO = re.compile(rb"[^\x00]")
+
+
+def _skip_zero_words(buf: mmap.mmap, pos: int, end: int) -> int:
     """
-    Parse a single I2 Languages .dat file.
-    Returns:
-      - sorted list of (key, [fields...])
-      - list of language names
+    Nhảy qua các word u32 bằng 0 bắt đầu từ `pos` (đã align 4).
+    Trả về vị trí word khác 0 đầu tiên, hoặc `end` nếu toàn bộ phần còn lại là 0.
     """
-    if not file_path.exists():
-        raise FileNotFoundError(f"I2 .dat file not found: {file_path}")
+    m = _NON_ZERO.search(buf, pos)
+    if not m:
+        return end
+    return pos + ((m.start() - pos) & ~3)
 
-    data = file_path.read_bytes()
-    records: List[Tuple[str, List[str]]] = []
-    pos = 60
 
-    while pos < len(data):
+def _iter_raw_records(buf: mmap.mmap) -> Iterator[Record]:
+    """
+    Duyệt buffer I2Languages và yield (key, [fields...]) theo thứ tự trong file.
+    Chỉ decode bytes của key/field, các length header được đọc thẳng từ buffer.
+    """
+    end = len(buf)
+    unpack_u32 = _U32.unpack_from
+    pos = I2_HEADER_SIZE
 
-        if pos % 4:
-            pos += 4 - (pos % 4)
-        if pos + 4 > len(data):
+    while pos < end:
+        pos += -pos & 3
+        if pos + 4 > end:
             break
 
-        key_len = int.from_bytes(data[pos : pos + 4], "little")
+        (key_len,) = unpack_u32(buf, pos)
         pos += 4
 
         if key_len == 0:
-
-            while (
-                pos < len(data) and int.from_bytes(data[pos : pos + 4], "little") == 0
-            ):
-                pos += 4
-            if pos >= len(data) - 4:
+            pos = _skip_zero_words(buf, pos, end)
+            if pos >= end - 4:
                 break
-            key_len = int.from_bytes(data[pos : pos + 4], "little")
+            (key_len,) = unpack_u32(buf, pos)
             pos += 4
-            if key_len == 0:
-                break
 
-        key_bytes = data[pos : pos + key_len]
-        try:
-            key = key_bytes.decode("utf-8", errors="ignore").strip()
-        except UnicodeDecodeError:
-            key = key_bytes.decode("latin-1", errors="ignore").strip()
+        key = buf[pos : pos + key_len].decode("utf-8", "ignore").strip()
         pos += key_len
+        pos += -pos & 3
 
-        if pos % 4:
-            pos += 4 - (pos % 4)
-
-        if pos + 4 > len(data):
+        if pos + 4 > end:
             break
-        start_count = int.from_bytes(data[pos : pos + 4], "little")
+        (fields_count,) = unpack_u32(buf, pos)
         pos += 4
 
-        if start_count == 0:
-            if pos + 4 > len(data):
+        if fields_count == 0:
+            if pos + 4 > end:
                 break
-            fields_count = int.from_bytes(data[pos : pos + 4], "little")
+            (fields_count,) = unpack_u32(buf, pos)
             pos += 4
-        else:
-            fields_count = start_count
 
         fields: List[str] = []
         for _ in range(fields_count):
-            if pos + 4 > len(data):
+            if pos + 4 > end:
                 break
-            field_len = int.from_bytes(data[pos : pos + 4], "little")
+            (field_len,) = unpack_u32(buf, pos)
             pos += 4
 
             if field_len > 0:
-                raw = data[pos : pos + field_len]
+                raw = buf[pos : pos + field_len]
                 try:
                     text = raw.decode("utf-8")
                 except UnicodeDecodeError:
-                    text = raw.decode("latin-1", errors="ignore")
+                    text = raw.decode("latin-1", "ignore")
             else:
                 text = ""
             fields.append(sanitize_text(text))
             pos += field_len
+            pos += -pos & 3
 
-            if pos % 4:
-                pos += 4 - (pos % 4)
-
-        if pos + 4 <= len(data):
+        if pos + 4 <= end:
             pos += 4
 
-        if not filter_patterns or not any(p.match(key) for p in filter_patterns):
-            records.append((key, fields))
+        yield key, fields
+
+
+def _record_key(record: Record) -> str:
+    return record[0]
+
+
+def _spill_run(run: List[Record]) -> IO[bytes]:
+    """Ghi một run đã sort ra file tạm (pickle theo từng lô nhỏ)."""
+    tmp = tempfile.TemporaryFile()
+    for i in range(0, len(run), 1024):
+        pickle.dump(run[i : i + 1024], tmp, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.seek(0)
+    return tmp
+
 
-    records.sort(key=lambda r: r[0])
+def _read_run(tmp: IO[bytes]) -> Iterator[Record]:
+    while True:
+        try:
+            batch = pickle.load(tmp)
+        except EOFError:
+            return
+        yield from batch
+
+
+def sort_records_external(
+    records: Iterable[Record], run_size: int = I2_SORT_RUN_SIZE
+) -> Iterator[Record]:
+    """
+    Sort records theo key với bộ nhớ giới hạn: chia thành các run tối đa `run_size`
+    record, sort từng run, ghi ra file tạm rồi merge lại bằng heapq.merge.
+    Nếu toàn bộ dữ liệu vừa một run thì sort trong RAM, không ghi file tạm.
+    Thứ tự giữa các key trùng nhau được giữ nguyên như list.sort.
+    """
+    it = iter(records)
+    runs: List[IO[bytes]] = []
+    try:
+        while True:
+            run = list(islice(it, run_size))
+            if not run:
+                break
+            run.sort(key=_record_key)
+            if not runs and len(run) < run_size:
+                yield from run
+                return
+            runs.append(_spill_run(run))
+            del run
+
+        yield from heapq.merge(*(_read_run(t) for t in runs), key=_record_key)
+    finally:
+        for t in runs:
+            t.close()
+
+
+def iter_i2_records(
+    file_path: Path,
+    filter_patterns: Optional[List[re.Pattern[str]]] = None,
+    sort: bool = False,
+    run_size: int = I2_SORT_RUN_SIZE,
+) -> Iterator[Record]:
+    """
+    Stream (key, [fields...]) từ file I2 Languages .dat mà không giữ toàn bộ bảng.
+    - sort=False: yield theo thứ tự trong file.
+    - sort=True: yield theo key, dùng external merge sort (xem sort_records_external).
+    """
+    if not file_path.exists():
+        raise FileNotFoundError(f"I2 .dat file not found: {file_path}")
+
+    records = _iter_file_records(file_path, filter_patterns)
+    if sort:
+        records = sort_records_external(records, run_size)
+    return records
+
+
+def _iter_file_records(
+    file_path: Path, filter_patterns: Optional[List[re.Pattern[str]]]
+) -> Iterator[Record]:
+    if file_path.stat().st_size == 0:
+        return
+
+    with open(file_path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        for key, fields in _iter_raw_records(mm):
+            if not filter_patterns or not any(p.match(key) for p in filter_patterns):
+                yield key, fields
+
+
+@metrics.timed(records=lambda result: len(result[0]))
+def parse_i2_asset_file(
+    file_path: Path, filter_patterns: Optional[List[re.Pattern[str]]] = None
+) -> Tuple[List[Record], List[str]]:
+    """
+    Parse a single I2 Languages .dat file.
+    File được memory-map và đọc header trực tiếp trên mmap, không copy toàn bộ file vào RAM.
+    Returns:
+      - sorted list of (key, [fields...])
+      - list of language names
+    """
+    records = list(iter_i2_records(file_path, filter_patterns))
+    records.sort(key=_record_key)
     return records, LANGUAGES
@@ -0,0 +1,216 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from . import metrics
+from .config import PIPELINE_MAX_WORKERS, PIPELINE_STATE_DIR, PIPELINE_VERSION
+from .utils import file_sha256
+
+
+class Stage(NamedTuple):
+    """
+    Một bước của pipeline.
+    - Stage không có outputs là bước tính toán: chỉ chạy khi stage khác cần giá trị
+      của nó (PipelineRun.get), kết quả dùng chung trong một lần chạy.
+    - Stage có outputs là target: được fingerprint theo inputs + version code và
+      chỉ chạy lại khi fingerprint đổi hoặc output bị xóa/sửa (giống make).
+    inputs trả về dữ liệu dùng để fingerprint (Path được hash theo nội dung);
+    modules là các module chứa code của stage, source của chúng là một phần
+    của fingerprint.
+    """
+
+    name: str
+    run: Callable[["PipelineRun"], Any]
+    deps: Tuple[str, ...] = ()
+    inputs: Optional[Callable[["PipelineRun"], Dict[str, Any]]] = None
+    outputs: Tuple[Path, ...] = ()
+    modules: Tuple[ModuleType, ...] = ()
+
+
+_source_hashes: Dict[str, str] = {}
+
+
+def _module_hash(module: ModuleType) -> str:
+    path = inspect.getsourcefile(module) or module.__name__
+    if path not in _source_hashes:
+        _source_hashes[path] = file_sha256(Path(path))
+    return _source_hashes[path]
+
+
+def _fingerprint_value(value: Any) -> Any:
+    if isinstance(value, Path):
+        return file_sha256(value) if value.exists() else None
+    if isinstance(value, dict):
+        return {str(k): _fingerprint_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint_value(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _check_graph(stages: Dict[str, Stage]) -> None:
+    """Kiểm tra deps tồn tại và không có chu trình."""
+    state: Dict[str, int] = {}
+    for root in stages:
+        stack = [(root, iter(stages[root].deps))]
+        if state.get(root) == 2:
+            continue
+        state[root] = 1
+        while stack:
+            name, deps = stack[-1]
+            dep = next(deps, None)
+            if dep is None:
+                state[name] = 2
+                stack.pop()
+                continue
+            if dep not in stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+            if state.get(dep) == 1:
+                raise ValueError(f"Dependency cycle through stage {dep}")
+            if state.get(dep) is None:
+                state[dep] = 1
+                stack.append((dep, iter(stages[dep].deps)))
+
+
+class PipelineRun:
+    """Trạng thái của một lần chạy: giá trị các stage đã tính (lazy, thread-safe)."""
+
+    def __init__(self, stages: Dict[str, Stage]) -> None:
+        self._stages = stages
+        self._values: Dict[str, Any] = {}
+        self._errors: Dict[str, BaseException] = {}
+        self._locks = {name: threading.Lock() for name in stages}
+        self.executed: List[str] = []
+
+    def get(self, name: str) -> Any:
+        """Giá trị của stage `name`, chạy stage (và deps của nó) nếu chưa chạy."""
+        with self._locks[name]:
+            if name in self._errors:
+                raise RuntimeError(f"Stage {name} failed") from self._errors[name]
+            if name not in self._values:
+                stage = self._stages[name]
+                for dep in stage.deps:
+                    self.get(dep)
+                logging.info(f"[pipeline] Running {name}")
+                try:
+                    with metrics.measure(f"stage.{name}"), metrics.profiled(name):
+                        self._values[name] = stage.run(self)
+                except BaseException as e:
+                    self._errors[name] = e
+                    raise
+                self.executed.append(name)
+            return self._values[name]
+
+
+class Pipeline:
+    """
+    DAG các stage với state lưu tại PIPELINE_STATE_DIR/<key>.json
+    (fingerprint + hash output của mỗi target đã chạy thành công).
+    """
+
+    def __init__(self, key: str, stages: List[Stage]) -> None:
+        self.key = key
+        self.stages = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate stage names")
+        _check_graph(self.stages)
+        self.state_path = PIPELINE_STATE_DIR / f"{key}.json"
+        self._state_lock = threading.Lock()
+
+    def _load_state(self) -> Dict[str, Dict]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable pipeline state {self.state_path}: {e}")
+            return {}
+
+    def _save_state(self, state: Dict[str, Dict]) -> None:
+        PIPELINE_STATE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    def fingerprint(self, stage: Stage, run: PipelineRun) -> str:
+        h = hashlib.sha256()
+        h.update(f"{PIPELINE_VERSION}:{stage.name}".encode())
+        for module in stage.modules:
+            h.update(f"\0{module.__name__}:{_module_hash(module)}".encode())
+        inputs = stage.inputs(run) if stage.inputs else {}
+        h.update(json.dumps(_fingerprint_value(inputs), sort_keys=True).encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def _is_fresh(record: Optional[Dict], fingerprint: str) -> bool:
+        if not record or record.get("fingerprint") != fingerprint:
+            return False
+        for path, digest in record.get("outputs", {}).items():
+            p = Path(path)
+            if not p.exists() or file_sha256(p) != digest:
+                return False
+        return True
+
+    def _run_target(
+        self, stage: Stage, run: PipelineRun, state: Dict[str, Dict], force: bool
+    ) -> bool:
+        """Chạy target nếu stale; trả về True nếu đã chạy."""
+        fingerprint = self.fingerprint(stage, run)
+        with self._state_lock:
+            record = state.get(stage.name)
+        if not force and self._is_fresh(record, fingerprint):
+            logging.info(f"[pipeline] {stage.name} is up to date")
+            return False
+
+        run.get(stage.name)
+        outputs = {str(p): file_sha256(p) for p in stage.outputs if p.exists()}
+        with self._state_lock:
+            state[stage.name] = {"fingerprint": fingerprint, "outputs": outputs}
+            self._save_state(state)
+        return True
+
+    def run(
+        self,
+        targets: Optional[List[str]] = None,
+        force: bool = False,
+        max_workers: int = PIPELINE_MAX_WORKERS,
+    ) -> PipelineRun:
+        """
+        Chạy các target stale (mặc định: mọi stage có outputs) song song.
+        Target lỗi không chặn các target khác; lỗi được gom lại và raise
+        RuntimeError sau khi mọi target đã kết thúc. State được lưu sau mỗi target
+        nên lần chạy lại chỉ làm lại các target hỏng.
+        """
+        if targets is None:
+            targets = [name for name, s in self.stages.items() if s.outputs]
+        state = self._load_state()
+        run = PipelineRun(self.stages)
+        errors: List[str] = []
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {
+                pool.submit(
+                    self._run_target, self.stages[name], run, state, force
+                ): name
+                for name in targets
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f"[pipeline] Stage {name} failed: {e}")
+                    errors.append(f"{name}: {e}")
+
+        if errors:
+            raise RuntimeError("Pipeline stages failed:\n" + "\n".join(sorted(errors)))
+        return run
@@ -0,0 +1,409 @@
+"""
+SQLite chứa dữ liệu của mọi version để truy vấn chéo version/ngôn ngữ mà không phải
+mở từng file CSV/JSON.
+
+Mỗi giá trị là một fact (source, key, ngôn ngữ, text) kèm khoảng version
+[from_version, to_version] mà nó còn đúng:
+- source "i2": text đã resolve alias của bảng I2, theo từng ngôn ngữ
+- source <category>: các từ điển của data_manager.build_dictionaries (weapons,
+  buff_infos, ...) build cho từng ngôn ngữ; entry lồng nhau có key "<nhóm>/<id>"
+- source "weapon_info"/"weapon_items": entry của all_weapons_info.json (theo "id")
+  và weapon_items.json (theo "name") trong output/<version>, mỗi entry là một JSON,
+  ngôn ngữ "". Nạp từ main hay từ output/ đều ra cùng fact
+Text được intern (bảng texts), nên giá trị không đổi giữa các version không tốn thêm
+chỗ. Version được nạp theo thứ tự tăng dần, mỗi version trong một transaction. Fact
+còn đúng ở version mới nhất có to_version = _OPEN, nên fact không đổi không phải
+ghi lại; chỉ fact bị đổi/xóa được đóng lại và fact mới/đổi được thêm dòng mới.
+
+    python -m src.sqlite_store load --all
+    python -m src.sqlite_store history weapon/weapon_025 --language English
+    python -m src.sqlite_store category buff_infos --language Vietnamese
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from . import data_manager, metrics
+from .config import OUTPUT_DIR, SQLITE_DB_PATH
+from .differ import list_versions, version_key
+from .language_table import LanguageTable
+
+Fact = Tuple[str, str, str, str]  # (source, key, language, text)
+
+# to_version của fact vẫn còn đúng ở version mới nhất
+_OPEN = 1 << 62
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    source_hash TEXT,
+    loaded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sources (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS languages (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS keys (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS texts (id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS facts (
+    source_id INTEGER NOT NULL REFERENCES sources(id),
+    key_id INTEGER NOT NULL REFERENCES keys(id),
+    language_id INTEGER NOT NULL REFERENCES languages(id),
+    text_id INTEGER NOT NULL REFERENCES texts(id),
+    from_version INTEGER NOT NULL REFERENCES versions(id),
+    to_version INTEGER NOT NULL,
+    PRIMARY KEY (source_id, key_id, language_id, from_version)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS facts_by_key ON facts(key_id, language_id);
+CREATE INDEX IF NOT EXISTS facts_by_source ON facts(source_id, language_id, to_version);
+CREATE INDEX IF NOT EXISTS facts_by_version ON facts(to_version);
+"""
+
+# Fact có hiệu lực ở version :v, kèm tên source/key/ngôn ngữ/text
+_FACTS_AT_VERSION = """
+SELECT s.name, k.key, l.name, t.text
+FROM facts f
+JOIN sources s ON s.id = f.source_id
+JOIN keys k ON k.id = f.key_id
+JOIN languages l ON l.id = f.language_id
+JOIN texts t ON t.id = f.text_id
+WHERE f.from_version <= :v AND f.to_version >= :v
+"""
+
+
+def _entry_json(entry: Any) -> str:
+    return json.dumps(entry, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def table_facts(table: LanguageTable) -> Iterator[Fact]:
+    """Fact của bảng I2 (đã resolve alias) và các từ điển category, mọi ngôn ngữ."""
+    resolved = data_manager.resolve_language_maps(table, table.languages)
+    index = data_manager.build_key_index(*resolved.values())
+    for language, lang_map in resolved.items():
+        for key, text in lang_map.items():
+            if text:
+                yield "i2", key, language, text
+        dictionaries = data_manager.build_dictionaries(table, lang_map, index)
+        for category, entries in dictionaries.items():
+            for key, value in entries.items():
+                if isinstance(value, dict):
+                    for sub_key, text in value.items():
+                        if text:
+                            yield category, f"{key}/{sub_key}", language, text
+                elif value:
+                    yield category, key, language, value
+
+
+def record_facts(source: str, entries: Iterable[Tuple[str, Any]]) -> Iterator[Fact]:
+    """Fact cho dữ liệu không theo ngôn ngữ (vũ khí, WeaponItem): key -> JSON."""
+    for key, entry in entries:
+        yield source, str(key), "", _entry_json(entry)
+
+
+def weapon_output_facts(version_dir: Path) -> Iterator[Fact]:
+    """Fact từ all_weapons_info.json (theo "id") và weapon_items.json (theo "name")."""
+    weapons_path = version_dir / "all_weapons_info.json"
+    if weapons_path.exists():
+        with open(weapons_path, "r", encoding="utf-8") as f:
+            weapons = json.load(f)
+        yield from record_facts("weapon_info", ((w.get("id"), w) for w in weapons))
+    items_path = version_dir / "weapon_items.json"
+    if items_path.exists():
+        with open(items_path, "r", encoding="utf-8") as f:
+            items = json.load(f).get("weaponItemInfos", [])
+        yield from record_facts("weapon_items", ((i.get("name"), i) for i in items))
+
+
+class SQLiteStore:
+    def __init__(self, path: Path = SQLITE_DB_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "SQLiteStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- nạp dữ liệu ---
+
+    def versions(self) -> List[Tuple[int, str]]:
+        return self.conn.execute("SELECT id, name FROM versions ORDER BY id").fetchall()
+
+    def _version_id(self, version: str) -> Optional[int]:
+        row = self.conn.execute(
+            "SELECT id FROM versions WHERE name = ?", (version,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _drop_latest(self, version_id: int) -> None:
+        """Gỡ version mới nhất (để nạp lại): xóa fact của nó, mở lại fact nó đã đóng."""
+        c = self.conn
+        c.execute("DELETE FROM facts WHERE from_version = ?", (version_id,))
+        c.execute(
+            "UPDATE facts SET to_version = ? WHERE to_version = ?",
+            (_OPEN, version_id - 1),
+        )
+        c.execute("DELETE FROM versions WHERE id = ?", (version_id,))
+
+    @metrics.timed()
+    def load_version(
+        self, version: str, facts: Iterable[Fact], source_hash: Optional[str] = None
+    ) -> bool:
+        """
+        Nạp một version (mới hơn mọi version đã có) trong một transaction. Version
+        mới nhất được nạp lại thì thay thế, trừ khi source_hash không đổi.
+        Trả về False nếu bỏ qua vì không có gì thay đổi.
+        """
+        c = self.conn
+        loaded = self.versions()
+        existing = self._version_id(version)
+        if existing is not None:
+            if existing != loaded[-1][0]:
+                raise ValueError(
+                    f"Version {version} is already loaded and is not the latest"
+                )
+            row = c.execute(
+                "SELECT source_hash FROM versions WHERE id = ?", (existing,)
+            ).fetchone()
+            if source_hash is not None and row[0] == source_hash:
+                logging.info(f"SQLite store already has version {version}")
+                return False
+        elif loaded and version_key(version) < version_key(loaded[-1][1]):
+            raise ValueError(
+                f"Version {version} is older than the latest loaded "
+                f"({loaded[-1][1]}); rebuild the database to insert it"
+            )
+
+        with c:
+            if existing is not None:
+                self._drop_latest(existing)
+            prev = c.execute("SELECT MAX(id) FROM versions").fetchone()[0] or 0
+            version_id = prev + 1
+            c.execute(
+                "INSERT INTO versions (id, name, source_hash, loaded_at) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    version_id,
+                    version,
+                    source_hash,
+                    datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                ),
+            )
+
+            c.execute("DROP TABLE IF EXISTS temp.staging")
+            c.execute("CREATE TEMP TABLE staging (source, key, language, text)")
+            c.executemany("INSERT INTO staging VALUES (?, ?, ?, ?)", facts)
+            n = c.execute("SELECT COUNT(*) FROM staging").fetchone()[0]
+            metrics.add_records(n)
+
+            # Intern tên/text mới
+            for table, column, src in (
+                ("sources", "name", "source"),
+                ("languages", "name", "language"),
+                ("keys", "key", "key"),
+                ("texts", "text", "text"),
+            ):
+                c.execute(
+                    f"INSERT OR IGNORE INTO {table} ({column}) "
+                    f"SELECT DISTINCT {src} FROM staging"
+                )
+
+            c.execute("DROP TABLE IF EXISTS temp.incoming")
+            c.execute(
+                "CREATE TEMP TABLE incoming (source_id INTEGER, key_id INTEGER, "
+                "language_id INTEGER, text_id INTEGER, "
+                "PRIMARY KEY (source_id, key_id, language_id)) WITHOUT ROWID"
+            )
+            c.execute(
+                "INSERT OR REPLACE INTO incoming "
+                "SELECT s.id, k.id, l.id, t.id FROM staging st "
+                "JOIN sources s ON s.name = st.source "
+                "JOIN keys k ON k.key = st.key "
+                "JOIN languages l ON l.name = st.language "
+                "JOIN texts t ON t.text = st.text"
+            )
+            # Fact đã đổi hoặc bị xóa ở version này: đóng ở version trước
+            c.execute(
+                "UPDATE facts SET to_version = :prev WHERE to_version = :open "
+                "AND NOT EXISTS (SELECT 1 FROM incoming i "
+                "WHERE i.source_id = facts.source_id AND i.key_id = facts.key_id "
+                "AND i.language_id = facts.language_id "
+                "AND i.text_id = facts.text_id)",
+                {"prev": prev, "open": _OPEN},
+            )
+            # Fact mới hoặc đã đổi: thêm dòng mới bắt đầu từ version này
+            c.execute(
+                "INSERT INTO facts "
+                "SELECT i.source_id, i.key_id, i.language_id, i.text_id, :v, :open "
+                "FROM incoming i WHERE NOT EXISTS (SELECT 1 FROM facts f "
+                "WHERE f.source_id = i.source_id AND f.key_id = i.key_id "
+                "AND f.language_id = i.language_id AND f.to_version = :open)",
+                {"v": version_id, "open": _OPEN},
+            )
+            c.execute("DROP TABLE temp.staging")
+            c.execute("DROP TABLE temp.incoming")
+
+        logging.info(f"Loaded version {version} into {self.path} ({n} facts)")
+        return True
+
+    # --- truy vấn ---
+
+    def _resolve_version(self, version: Optional[str]) -> int:
+        if version is None:
+            row = self.conn.execute("SELECT MAX(id) FROM versions").fetchone()
+            if row[0] is None:
+                raise ValueError("The database has no versions loaded")
+            return row[0]
+        version_id = self._version_id(version)
+        if version_id is None:
+            raise ValueError(f"Version {version} is not loaded")
+        return version_id
+
+    def history(
+        self, key: str, language: Optional[str] = None, source: Optional[str] = None
+    ) -> List[Tuple[str, str, str, str, str]]:
+        """
+        (source, ngôn ngữ, text, version đầu, version cuối) của một key; version cuối
+        là None nếu giá trị vẫn còn ở version mới nhất.
+        """
+        sql = (
+            "SELECT s.name, l.name, t.text, vf.name, vt.name FROM facts f "
+            "JOIN keys k ON k.id = f.key_id "
+            "JOIN sources s ON s.id = f.source_id "
+            "JOIN languages l ON l.id = f.language_id "
+            "JOIN texts t ON t.id = f.text_id "
+            "JOIN versions vf ON vf.id = f.from_version "
+            "LEFT JOIN versions vt ON vt.id = f.to_version "
+            "WHERE k.key = ?"
+        )
+        params: List[Any] = [key]
+        if language is not None:
+            sql += " AND l.name = ?"
+            params.append(language)
+        if source is not None:
+            sql += " AND s.name = ?"
+            params.append(source)
+        sql += " ORDER BY s.name, l.name, f.from_version"
+        return self.conn.execute(sql, params).fetchall()
+
+    def facts_at(
+        self,
+        version: Optional[str] = None,
+        source: Optional[str] = None,
+        language: Optional[str] = None,
+        text_like: Optional[str] = None,
+    ) -> List[Fact]:
+        """Các fact có hiệu lực ở version (mặc định: mới nhất), lọc theo điều kiện."""
+        sql = _FACTS_AT_VERSION
+        params: Dict[str, Any] = {"v": self._resolve_version(version)}
+        if source is not None:
+            sql += " AND s.name = :source"
+            params["source"] = source
+        if language is not None:
+            sql += " AND l.name = :language"
+            params["language"] = language
+        if text_like is not None:
+            sql += " AND t.text LIKE :pattern"
+            params["pattern"] = f"%{text_like}%"
+        sql += " ORDER BY s.name, k.key, l.name"
+        return self.conn.execute(sql, params).fetchall()
+
+
+def load_output_version(
+    store: SQLiteStore, version: str, output_root: Path = OUTPUT_DIR
+) -> bool:
+    """Nạp output/<version> (I2language.csv, all_weapons_info.json, weapon_items.json)."""
+    version_dir = output_root / version
+    csv_path = version_dir / "I2language.csv"
+    if not csv_path.exists():
+        raise FileNotFoundError(f"{csv_path} not found (export with EXPORT_I2_CSV)")
+
+    def facts() -> Iterator[Fact]:
+        yield from table_facts(LanguageTable.from_csv(csv_path))
+        yield from weapon_output_facts(version_dir)
+
+    return store.load_version(version, facts())
+
+
+def _print_rows(rows: Iterable[Tuple]) -> None:
+    for row in rows:
+        print("\t".join("" if v is None else str(v) for v in row))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Query all versions in a SQLite database")
+    ap.add_argument("--db", type=Path, default=SQLITE_DB_PATH)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    load = sub.add_parser("load", help="Nạp output/<version> vào database")
+    load.add_argument("versions", nargs="*")
+    load.add_argument("--all", action="store_true", help="Mọi version trong output/")
+    load.add_argument("--output-root", type=Path, default=OUTPUT_DIR)
+
+    sub.add_parser("versions", help="Các version đã nạp")
+
+    history = sub.add_parser("history", help="Giá trị của một key qua các version")
+    history.add_argument("key")
+    history.add_argument("--language")
+    history.add_argument("--source")
+
+    category = sub.add_parser("category", help="Các entry của một source/category")
+    category.add_argument("source")
+    category.add_argument("--language")
+    category.add_argument("--version", help="Mặc định: version mới nhất")
+
+    search = sub.add_parser("search", help="Tìm text (LIKE %%...%%)")
+    search.add_argument("text")
+    search.add_argument("--language")
+    search.add_argument("--source")
+    search.add_argument("--version", help="Mặc định: version mới nhất")
+
+    sql = sub.add_parser("sql", help="Chạy một câu SQL tùy ý")
+    sql.add_argument("query")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    with SQLiteStore(args.db) as store:
+        try:
+            if args.command == "load":
+                root = args.output_root
+                versions = list_versions(root) if args.all else args.versions
+                loaded = {name for _, name in store.versions()}
+                for version in versions:
+                    if args.all and version in loaded:
+                        continue
+                    load_output_version(store, version, root)
+            elif args.command == "versions":
+                _print_rows(store.versions())
+            elif args.command == "history":
+                _print_rows(store.history(args.key, args.language, args.source))
+            elif args.command == "category":
+                _print_rows(
+                    (key, language, text)
+                    for _, key, language, text in store.facts_at(
+                        args.version, args.source, args.language
+                    )
+                )
+            elif args.command == "search":
+                _print_rows(
+                    store.facts_at(args.version, args.source, args.language, args.text)
+                )
+            else:
+                _print_rows(store.conn.execute(args.query))
+        except (ValueError, OSError, sqlite3.Error) as e:
+            logging.error(e)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
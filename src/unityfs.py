@@ -0,0 +1,475 @@
+import lzma
+import struct
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+try:
+    import lz4.block as _lz4_block
+except ImportError:  # pragma: no cover - chỉ chạy khi không cài lz4
+    _lz4_block = None
+
+# Class ID của các loại object Unity mà pipeline cần
+CLASS_IDS: Dict[str, int] = {
+    "textasset": 49,
+    "monobehaviour": 114,
+}
+
+# ArchiveFlags của UnityFS
+_COMPRESSION_MASK = 0x3F
+_BLOCKS_INFO_AT_END = 0x80
+_BLOCK_INFO_NEED_PADDING = 0x200
+
+_COMPRESSION_NONE = 0
+_COMPRESSION_LZMA = 1
+_COMPRESSION_LZ4 = 2
+_COMPRESSION_LZ4HC = 3
+
+# Node flag: node là SerializedFile
+_NODE_SERIALIZED = 0x4
+
+
+class UnityFSError(RuntimeError):
+    """Bundle không đọc được (định dạng/nén không hỗ trợ, dữ liệu hỏng...)."""
+
+
+class BlockInfo(NamedTuple):
+    uncompressed_size: int
+    compressed_size: int
+    flags: int
+
+
+class Node(NamedTuple):
+    offset: int
+    size: int
+    flags: int
+    path: str
+
+
+class ObjectInfo(NamedTuple):
+    """Một object trong SerializedFile; offset tính trong luồng dữ liệu đã giải nén."""
+
+    node_path: str
+    path_id: int
+    class_id: int
+    offset: int
+    size: int
+    name: str
+    big_endian: bool = False
+
+
+class _Reader:
+    def __init__(self, data: bytes, pos: int = 0, big_endian: bool = True) -> None:
+        self.data = data
+        self.pos = pos
+        self.prefix = ">" if big_endian else "<"
+
+    def _unpack(self, fmt: str) -> int:
+        s = struct.Struct(self.prefix + fmt)
+        if self.pos + s.size > len(self.data):
+            raise UnityFSError("Unexpected end of data")
+        (value,) = s.unpack_from(self.data, self.pos)
+        self.pos += s.size
+        return value
+
+    def u8(self) -> int:
+        return self._unpack("B")
+
+    def i16(self) -> int:
+        return self._unpack("h")
+
+    def u16(self) -> int:
+        return self._unpack("H")
+
+    def i32(self) -> int:
+        return self._unpack("i")
+
+    def u32(self) -> int:
+        return self._unpack("I")
+
+    def i64(self) -> int:
+        return self._unpack("q")
+
+    def bytes(self, n: int) -> bytes:
+        if n < 0 or self.pos + n > len(self.data):
+            raise UnityFSError("Unexpected end of data")
+        out = self.data[self.pos : self.pos + n]
+        self.pos += n
+        return out
+
+    def cstr(self) -> str:
+        end = self.data.find(b"\0", self.pos)
+        if end < 0:
+            raise UnityFSError("Unterminated string")
+        s = self.data[self.pos : end].decode("utf-8", errors="replace")
+        self.pos = end + 1
+        return s
+
+    def align(self, n: int) -> None:
+        self.pos += -self.pos % n
+
+    def aligned_string(self) -> str:
+        length = self.i32()
+        s = self.bytes(length).decode("utf-8", errors="replace")
+        self.align(4)
+        return s
+
+
+def lz4_block_decompress(src: bytes, uncompressed_size: int) -> bytes:
+    """Giải nén một block LZ4 (dùng module lz4 nếu có, nếu không thì Python thuần)."""
+    if _lz4_block is not None:
+        return _lz4_block.decompress(src, uncompressed_size=uncompressed_size)
+
+    dst = bytearray()
+    i = 0
+    n = len(src)
+    while i < n:
+        token = src[i]
+        i += 1
+        lit = token >> 4
+        if lit == 15:
+            while True:
+                b = src[i]
+                i += 1
+                lit += b
+                if b != 255:
+                    break
+        dst += src[i : i + lit]
+        i += lit
+        if i >= n:
+            break
+
+        offset = src[i] | (src[i + 1] << 8)
+        i += 2
+        if offset == 0:
+            raise UnityFSError("Invalid LZ4 offset")
+        match_len = token & 15
+        if match_len == 15:
+            while True:
+                b = src[i]
+                i += 1
+                match_len += b
+                if b != 255:
+                    break
+        match_len += 4
+
+        start = len(dst) - offset
+        if start < 0:
+            raise UnityFSError("Invalid LZ4 offset")
+        if offset >= match_len:
+            dst += dst[start : start + match_len]
+        else:
+            # Match chồng lên chính nó: lặp lại pattern `offset` byte
+            pattern = bytes(dst[start:])
+            reps, rem = divmod(match_len, offset)
+            dst += pattern * reps + pattern[:rem]
+
+    if len(dst) != uncompressed_size:
+        raise UnityFSError(
+            f"LZ4 size mismatch: expected {uncompressed_size}, got {len(dst)}"
+        )
+    return bytes(dst)
+
+
+def lzma_decompress(src: bytes, uncompressed_size: int) -> bytes:
+    """Giải nén LZMA kiểu Unity: 5 byte properties + dữ liệu raw (không header size)."""
+    if len(src) < 5:
+        raise UnityFSError("LZMA block too short")
+    props = src[0]
+    lc = props % 9
+    props //= 9
+    lp = props % 5
+    pb = props // 5
+    (dict_size,) = struct.unpack_from("<I", src, 1)
+    decoder = lzma.LZMADecompressor(
+        format=lzma.FORMAT_RAW,
+        filters=[
+            {
+                "id": lzma.FILTER_LZMA1,
+                "dict_size": dict_size,
+                "lc": lc,
+                "lp": lp,
+                "pb": pb,
+            }
+        ],
+    )
+    out = decoder.decompress(src[5:], max_length=uncompressed_size)
+    if len(out) != uncompressed_size:
+        raise UnityFSError(
+            f"LZMA size mismatch: expected {uncompressed_size}, got {len(out)}"
+        )
+    return out
+
+
+def _decompress(data: bytes, flags: int, uncompressed_size: int) -> bytes:
+    compression = flags & _COMPRESSION_MASK
+    if compression == _COMPRESSION_NONE:
+        return data
+    if compression == _COMPRESSION_LZMA:
+        return lzma_decompress(data, uncompressed_size)
+    if compression in (_COMPRESSION_LZ4, _COMPRESSION_LZ4HC):
+        return lz4_block_decompress(data, uncompressed_size)
+    raise UnityFSError(f"Unsupported compression type {compression}")
+
+
+class UnityFSBundle:
+    """
+    Đọc bundle UnityFS (vd. data.unity3d): header, block info, danh sách node.
+    Dữ liệu được giải nén theo block khi cần (read_range), có cache vài block gần nhất.
+    """
+
+    def __init__(self, path: Path, block_cache_size: int = 16) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        self._block_cache: "OrderedDict[int, bytes]" = OrderedDict()
+        self._block_cache_size = block_cache_size
+        try:
+            self._read_header()
+        except Exception:
+            self._file.close()
+            raise
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "UnityFSBundle":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _read_header(self) -> None:
+        f = self._file
+        head = f.read(4096)
+        r = _Reader(head)
+        signature = r.cstr()
+        if signature != "UnityFS":
+            raise UnityFSError(f"Unsupported bundle signature: {signature!r}")
+        self.format_version = r.u32()
+        self.unity_version = r.cstr()
+        self.unity_revision = r.cstr()
+        self.size = r.i64()
+        compressed_info_size = r.u32()
+        uncompressed_info_size = r.u32()
+        self.flags = r.u32()
+
+        pos = r.pos
+        if self.format_version >= 7:
+            pos += -pos % 16
+
+        if self.flags & _BLOCKS_INFO_AT_END:
+            f.seek(0, 2)
+            f.seek(f.tell() - compressed_info_size)
+            info_raw = f.read(compressed_info_size)
+            data_start = pos
+        else:
+            f.seek(pos)
+            info_raw = f.read(compressed_info_size)
+            data_start = pos + compressed_info_size
+
+        info = _decompress(info_raw, self.flags, uncompressed_info_size)
+        ir = _Reader(info)
+        ir.bytes(16)  # uncompressed data hash
+        self.blocks = [
+            BlockInfo(ir.u32(), ir.u32(), ir.u16()) for _ in range(ir.i32())
+        ]
+        self.nodes = [Node(ir.i64(), ir.i64(), ir.u32(), ir.cstr()) for _ in range(ir.i32())]
+
+        if self.flags & _BLOCK_INFO_NEED_PADDING:
+            data_start += -data_start % 16
+
+        # Vị trí (trong file) và offset (trong luồng đã giải nén) của từng block
+        self.block_file_offsets: List[int] = []
+        self.block_data_offsets: List[int] = []
+        file_pos = data_start
+        data_pos = 0
+        for b in self.blocks:
+            self.block_file_offsets.append(file_pos)
+            self.block_data_offsets.append(data_pos)
+            file_pos += b.compressed_size
+            data_pos += b.uncompressed_size
+        self.data_size = data_pos
+
+    def _block(self, index: int) -> bytes:
+        cached = self._block_cache.get(index)
+        if cached is not None:
+            self._block_cache.move_to_end(index)
+            return cached
+        b = self.blocks[index]
+        self._file.seek(self.block_file_offsets[index])
+        raw = self._file.read(b.compressed_size)
+        data = _decompress(raw, b.flags, b.uncompressed_size)
+        self._block_cache[index] = data
+        if len(self._block_cache) > self._block_cache_size:
+            self._block_cache.popitem(last=False)
+        return data
+
+    def block_index(self, offset: int) -> int:
+        """Block chứa byte `offset` của luồng dữ liệu đã giải nén."""
+        lo, hi = 0, len(self.blocks) - 1
+        offsets = self.block_data_offsets
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if offsets[mid] <= offset:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def read_range(self, offset: int, size: int) -> bytes:
+        """Đọc `size` byte từ luồng đã giải nén, chỉ giải nén các block liên quan."""
+        if size <= 0:
+            return b""
+        if offset < 0 or offset + size > self.data_size:
+            raise UnityFSError("Read outside bundle data")
+        parts = []
+        index = self.block_index(offset)
+        end = offset + size
+        while offset < end:
+            block = self._block(index)
+            start = offset - self.block_data_offsets[index]
+            chunk = block[start : start + (end - offset)]
+            parts.append(chunk)
+            offset += len(chunk)
+            index += 1
+        return b"".join(parts)
+
+    def serialized_nodes(self) -> List[Node]:
+        # Chỉ node có cờ SerializedFile (bỏ qua .resS, ScriptingAssemblies.json...)
+        return [n for n in self.nodes if n.flags & _NODE_SERIALIZED]
+
+    def iter_objects(
+        self, class_ids: Optional[List[int]] = None
+    ) -> Iterator[ObjectInfo]:
+        """Duyệt object trong mọi SerializedFile của bundle (lọc theo class ID)."""
+        for node in self.serialized_nodes():
+            yield from SerializedFile(self, node).iter_objects(class_ids)
+
+
+class SerializedFile:
+    """Metadata của một SerializedFile nằm trong bundle (chỉ phần cần để tìm object)."""
+
+    def __init__(self, bundle: UnityFSBundle, node: Node) -> None:
+        self.bundle = bundle
+        self.node = node
+
+        head = _Reader(bundle.read_range(node.offset, min(node.size, 48)))
+        metadata_size = head.u32()
+        head.u32()  # file size
+        self.version = head.u32()
+        data_offset = head.u32()
+        if self.version < 9:
+            raise UnityFSError(f"Unsupported SerializedFile version {self.version}")
+        big_endian = head.u8() != 0
+        head.bytes(3)
+        if self.version >= 22:
+            metadata_size = head.u32()
+            head.i64()  # file size
+            data_offset = head.i64()
+            head.i64()
+
+        self.data_offset = data_offset
+        self.big_endian = big_endian
+        meta = bundle.read_range(node.offset, min(node.size, head.pos + metadata_size))
+        self._meta = _Reader(meta, head.pos, big_endian)
+
+    def _skip_type(self, r: _Reader, enable_type_tree: bool) -> int:
+        v = self.version
+        class_id = r.i32()
+        if v >= 16:
+            r.u8()  # is stripped type
+        if v >= 17:
+            r.i16()  # script type index
+        if v >= 13:
+            if (v < 16 and class_id < 0) or (v >= 16 and class_id == 114):
+                r.bytes(16)  # script ID
+            r.bytes(16)  # old type hash
+        if enable_type_tree:
+            if v < 12 and v != 10:
+                raise UnityFSError("Legacy type tree format is not supported")
+            node_count = r.i32()
+            string_size = r.i32()
+            r.bytes(node_count * (32 if v >= 19 else 24) + string_size)
+            if v >= 21:
+                r.bytes(4 * r.i32())  # type dependencies
+        return class_id
+
+    def iter_objects(
+        self, class_ids: Optional[List[int]] = None
+    ) -> Iterator[ObjectInfo]:
+        r = self._meta
+        v = self.version
+        r.cstr()  # unity version
+        r.i32()  # target platform
+        enable_type_tree = bool(r.u8()) if v >= 13 else True
+        types = [self._skip_type(r, enable_type_tree) for _ in range(r.i32())]
+
+        big_id = v < 14 and r.i32() != 0
+        wanted = set(class_ids) if class_ids is not None else None
+        node = self.node
+
+        for _ in range(r.i32()):
+            if big_id:
+                path_id = r.i64()
+            elif v < 14:
+                path_id = r.i32()
+            else:
+                r.align(4)
+                path_id = r.i64()
+            byte_start = r.i64() if v >= 22 else r.u32()
+            byte_size = r.u32()
+            type_id = r.i32()
+            if v < 16:
+                class_id = r.u16()
+            else:
+                class_id = types[type_id]
+            if v < 11:
+                r.u16()  # is destroyed
+            if 11 <= v < 17:
+                r.i16()  # script type index
+            if v in (15, 16):
+                r.u8()  # stripped
+
+            if wanted is not None and class_id not in wanted:
+                continue
+            offset = node.offset + self.data_offset + byte_start
+            yield ObjectInfo(
+                node.path,
+                path_id,
+                class_id,
+                offset,
+                byte_size,
+                self._object_name(class_id, offset, byte_size),
+                self.big_endian,
+            )
+
+    def _object_name(self, class_id: int, offset: int, size: int) -> str:
+        """Đọc m_Name ở đầu object (TextAsset / MonoBehaviour)."""
+        if class_id == CLASS_IDS["textasset"]:
+            name_pos = 0
+        elif class_id == CLASS_IDS["monobehaviour"]:
+            pptr = 12 if self.version >= 14 else 8
+            # m_GameObject (PPtr), m_Enabled (u8, align 4), m_Script (PPtr)
+            name_pos = pptr + 4 + pptr
+        else:
+            return ""
+        head = self.bundle.read_range(offset, min(size, name_pos + 4))
+        r = _Reader(head, name_pos, self.big_endian)
+        length = r.i32()
+        if length <= 0 or name_pos + 4 + length > size:
+            return ""
+        raw = self.bundle.read_range(offset + name_pos + 4, length)
+        return raw.decode("utf-8", errors="replace")
+
+
+def read_object(bundle: UnityFSBundle, obj: ObjectInfo) -> bytes:
+    """Bytes thô của object (giống chế độ "raw" của AssetStudio)."""
+    return bundle.read_range(obj.offset, obj.size)
+
+
+def read_text_asset(bundle: UnityFSBundle, obj: ObjectInfo) -> bytes:
+    """Nội dung m_Script của TextAsset (giống chế độ "export" của AssetStudio)."""
+    data = read_object(bundle, obj)
+    r = _Reader(data, 0, obj.big_endian)
+    r.aligned_string()  # m_Name
+    return r.bytes(r.i32())
@@ -1,11 +1,21 @@
+import hashlib
 import logging
+from pathlib import Path
 
 def setup_logger():
     logging.basicConfig(
         level=logging.INFO,
-        format="[%(asctime)s] %(levelname)s: %(message)s",
+        format="[%(asctime)s.%(msecs)03d] %(levelname)s: %(message)s",
         datefmt="%H:%M:%S",
     )
 
 def sanitize_text(text: str) -> str:
     return text.replace("\r\n", "\\n").replace("\r", "\\n").replace("\n", "\\n").strip()
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Hash SHA-256 của file, đọc theo từng chunk để không load cả file vào RAM."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,508 @@
+"""
+Kho lưu mọi version output dạng delta thay vì một bản copy đầy đủ cho mỗi version.
+
+Layout của VERSION_STORE_DIR:
+    index.json                 thứ tự version, loại (snapshot/delta), hash từng file
+    blobs/<sha256>.gz          nội dung đầy đủ của một file (dùng chung giữa các version)
+    deltas/<version>.json.gz   delta của version so với version ngay trước nó
+
+Mỗi VERSION_SNAPSHOT_INTERVAL version có một snapshot (mọi file là blob), các version
+còn lại chỉ lưu delta: file không đổi -> "same", I2language.csv -> các dòng bị xóa /
+thêm / sửa theo key (merge-join, xem differ), file text khác -> các đoạn dòng thay
+đổi (difflib), còn lại -> blob. Dựng lại một version bắt đầu từ version gần nhất có
+trong cache (VERSION_CACHE_DIR) hoặc snapshot gần nhất, nên không phải replay cả chuỗi.
+Mọi file dựng lại được kiểm tra SHA-256 với index.
+
+    python -m src.version_store import [--prune]
+    python -m src.version_store checkout 7.7.1 /tmp/7.7.1
+    python -m src.version_store list
+"""
+
+import argparse
+import csv
+import difflib
+import gzip
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from .config import (
+    MANIFEST_FILE_NAME,
+    METRICS_FILE_NAME,
+    OUTPUT_DIR,
+    PROFILE_DIR_NAME,
+    VERSION_CACHE_DIR,
+    VERSION_CACHE_SIZE,
+    VERSION_SNAPSHOT_INTERVAL,
+    VERSION_STORE_DIR,
+)
+from .differ import (
+    iter_csv_records,
+    list_versions,
+    merge_join,
+    read_csv_header,
+    version_key,
+)
+from .output_writer import COMPRESSION_SUFFIXES
+from .utils import file_sha256
+
+STORE_FORMAT = 1
+
+# Không phải dữ liệu export (thay đổi mỗi lần chạy) hoặc tạo lại được từ file gốc
+_SKIPPED_NAMES = {MANIFEST_FILE_NAME, METRICS_FILE_NAME, PROFILE_DIR_NAME}
+_SKIPPED_SUFFIXES = set(COMPRESSION_SUFFIXES.values())
+
+# Delta dạng dòng chỉ đáng lưu khi phần thay đổi nhỏ hơn tỉ lệ này của file mới
+_MAX_LINE_DELTA_RATIO = 0.5
+
+
+def version_files(version_dir: Path) -> Dict[str, Path]:
+    """{đường dẫn tương đối: Path} các file dữ liệu của một thư mục output/<version>."""
+    return {
+        p.relative_to(version_dir).as_posix(): p
+        for p in sorted(version_dir.rglob("*"))
+        if p.is_file()
+        and p.relative_to(version_dir).parts[0] not in _SKIPPED_NAMES
+        and p.suffix not in _SKIPPED_SUFFIXES
+    }
+
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _csv_delta(old: Path, new: Path) -> Optional[Dict[str, Any]]:
+    """Delta theo key giữa hai I2language.csv; None nếu header khác hoặc chưa sort."""
+    header = read_csv_header(new)
+    if read_csv_header(old) != header:
+        return None
+    delete: List[str] = []
+    upsert: List[List[Any]] = []
+    try:
+        for key, o, n in merge_join(iter_csv_records(old), iter_csv_records(new)):
+            if n is None:
+                delete.append(key)
+            elif o != n:
+                upsert.append([key, n])
+    except ValueError:
+        return None
+    return {"op": "csv", "header": header, "delete": delete, "upsert": upsert}
+
+
+def _apply_csv(base: Path, delta: Dict[str, Any], dest: Path) -> None:
+    # Ghi lại giống exporter.write_i2_csv (csv.writer mặc định, header "id" + ngôn ngữ)
+    deleted = set(delta["delete"])
+    upserts = ((key, fields) for key, fields in delta["upsert"])
+    with open(dest, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id"] + delta["header"])
+        for key, old, new in merge_join(iter_csv_records(base), upserts):
+            if new is not None:
+                writer.writerow([key] + new)
+            elif key not in deleted:
+                writer.writerow([key] + old)
+
+
+def _lines_delta(old: bytes, new: bytes) -> Optional[Dict[str, Any]]:
+    """Các đoạn dòng thay đổi (difflib); None nếu không phải text hoặc đổi quá nhiều."""
+    try:
+        a = old.decode("utf-8").splitlines(keepends=True)
+        b = new.decode("utf-8").splitlines(keepends=True)
+    except UnicodeDecodeError:
+        return None
+    ops = []
+    changed = 0
+    matcher = difflib.SequenceMatcher(None, a, b)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            ops.append([i1, i2, b[j1:j2]])
+            changed += sum(len(line) for line in b[j1:j2])
+    if changed > len(new) * _MAX_LINE_DELTA_RATIO:
+        return None
+    return {"op": "lines", "ops": ops}
+
+
+def _apply_lines(base: bytes, delta: Dict[str, Any]) -> bytes:
+    a = base.decode("utf-8").splitlines(keepends=True)
+    out: List[str] = []
+    pos = 0
+    for i1, i2, lines in delta["ops"]:
+        out.extend(a[pos:i1])
+        out.extend(lines)
+        pos = i2
+    out.extend(a[pos:])
+    return "".join(out).encode("utf-8")
+
+
+class VersionStore:
+    """Kho version tại root (index + blobs + deltas) với cache các version đã dựng lại."""
+
+    def __init__(
+        self,
+        root: Path = VERSION_STORE_DIR,
+        cache_dir: Path = VERSION_CACHE_DIR,
+        snapshot_interval: int = VERSION_SNAPSHOT_INTERVAL,
+        cache_size: int = VERSION_CACHE_SIZE,
+    ) -> None:
+        self.root = root
+        self.cache_dir = cache_dir
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.cache_size = max(1, cache_size)
+        self.index_path = root / "index.json"
+        self._index = self._load_index()
+
+    # --- index ---
+
+    def _load_index(self) -> Dict[str, Any]:
+        if not self.index_path.exists():
+            return {"format": STORE_FORMAT, "versions": []}
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("format") != STORE_FORMAT:
+            raise ValueError(f"Unsupported version store format in {self.index_path}")
+        return index
+
+    def _save_index(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.index_path)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Entry của từng version (version, kind, files) theo thứ tự trong kho."""
+        return list(self._index["versions"])
+
+    def versions(self) -> List[str]:
+        return [e["version"] for e in self._index["versions"]]
+
+    def entry(self, version: str) -> Dict[str, Any]:
+        for e in self._index["versions"]:
+            if e["version"] == version:
+                return e
+        raise KeyError(f"Version {version} is not in the store")
+
+    # --- blobs / deltas ---
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.root / "blobs" / f"{sha256}.gz"
+
+    def _put_blob(self, path: Path, sha256: str) -> None:
+        blob = self._blob_path(sha256)
+        if blob.exists():
+            return
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_suffix(".tmp")
+        tmp.write_bytes(_gzip(path.read_bytes()))
+        os.replace(tmp, blob)
+
+    def _delta_path(self, version: str) -> Path:
+        return self.root / "deltas" / f"{version}.json.gz"
+
+    def _load_delta(self, version: str) -> Dict[str, Any]:
+        return json.loads(gzip.decompress(self._delta_path(version).read_bytes()))
+
+    def _file_delta(
+        self, name: str, base_dir: Path, path: Path, sha256: str
+    ) -> Dict[str, Any]:
+        base = base_dir / name
+        if base.exists():
+            if file_sha256(base) == sha256:
+                return {"op": "same"}
+            if name.endswith(".csv"):
+                delta = _csv_delta(base, path)
+            else:
+                delta = _lines_delta(base.read_bytes(), path.read_bytes())
+            # Chỉ giữ delta nếu dựng lại đúng từng byte
+            if delta is not None:
+                with tempfile.TemporaryDirectory() as tmp:
+                    rebuilt = self._apply_file(delta, base, Path(tmp) / "file")
+                    if file_sha256(rebuilt) == sha256:
+                        return delta
+        self._put_blob(path, sha256)
+        return {"op": "blob", "sha256": sha256}
+
+    def _apply_file(self, delta: Dict[str, Any], base: Path, dest: Path) -> Path:
+        op = delta["op"]
+        if op == "blob":
+            blob = self._blob_path(delta["sha256"])
+            dest.write_bytes(gzip.decompress(blob.read_bytes()))
+        elif op == "same":
+            shutil.copyfile(base, dest)
+        elif op == "csv":
+            _apply_csv(base, delta, dest)
+        elif op == "lines":
+            dest.write_bytes(_apply_lines(base.read_bytes(), delta))
+        else:
+            raise ValueError(f"Unknown delta op: {op}")
+        return dest
+
+    # --- thêm version ---
+
+    def add_version(self, version: str, src_dir: Path) -> str:
+        """
+        Thêm output/<version> vào cuối kho (snapshot hoặc delta so với version cuối).
+        Version cuối được thêm lại (vd. export --force) thì thay thế nếu nội dung đổi.
+        Trả về loại entry ("snapshot"/"delta").
+        """
+        files = version_files(src_dir)
+        if not files:
+            raise ValueError(f"No output files in {src_dir}")
+        hashes = {
+            name: {"sha256": file_sha256(p), "size": p.stat().st_size}
+            for name, p in files.items()
+        }
+
+        versions = self.versions()
+        if version in versions:
+            existing = self.entry(version)
+            if existing["files"] == hashes:
+                return existing["kind"]
+            if version != versions[-1]:
+                raise ValueError(f"Version {version} already stored and not the latest")
+            self._index["versions"].pop()
+            self._drop_cache(version)
+            versions.pop()
+
+        prev = versions[-1] if versions else None
+        if prev is None or len(versions) % self.snapshot_interval == 0:
+            kind = "snapshot"
+            for name, p in files.items():
+                self._put_blob(p, hashes[name]["sha256"])
+        else:
+            kind = "delta"
+            base_dir = self.reconstruct(prev)
+            delta = {
+                "base": prev,
+                "files": {
+                    name: self._file_delta(name, base_dir, p, hashes[name]["sha256"])
+                    for name, p in files.items()
+                },
+            }
+            path = self._delta_path(version)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = json.dumps(delta, ensure_ascii=False, sort_keys=True)
+            path.write_bytes(_gzip(data.encode("utf-8")))
+
+        self._index["versions"].append(
+            {"version": version, "kind": kind, "files": hashes}
+        )
+        self._save_index()
+        # Version cuối luôn nằm trong cache: là base của delta tiếp theo
+        self._cache_put(version, files)
+        logging.info(f"Stored version {version} as {kind}")
+        return kind
+
+    # --- dựng lại version ---
+
+    def _cache_path(self, version: str) -> Path:
+        return self.cache_dir / version
+
+    def _cached(self, version: str) -> Optional[Path]:
+        path = self._cache_path(version)
+        return path if path.is_dir() else None
+
+    def _drop_cache(self, version: str) -> None:
+        shutil.rmtree(self._cache_path(version), ignore_errors=True)
+
+    def _cache_put(self, version: str, files: Dict[str, Path]) -> None:
+        with tempfile.TemporaryDirectory(dir=self._work_root()) as work:
+            tmp = Path(work) / version
+            for name, p in files.items():
+                (tmp / name).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(p, tmp / name)
+            self._cache_commit(version, tmp)
+
+    def _work_root(self) -> Path:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return self.cache_dir
+
+    def _cache_commit(self, version: str, built: Path) -> Path:
+        """Đưa thư mục đã dựng xong vào cache (rename atomic) và dọn cache cũ."""
+        path = self._cache_path(version)
+        self._drop_cache(version)
+        os.replace(built, path)
+        self._evict(keep=version)
+        return path
+
+    def _evict(self, keep: str) -> None:
+        """
+        Giữ version cuối và tối đa cache_size - 1 version khác (mới dùng nhất). keep
+        (version vừa đưa vào cache, caller sắp dùng) không bao giờ bị xóa, kể cả khi
+        cache_size=1 làm cache tạm vượt giới hạn một version.
+        """
+        versions = self.versions()
+        head = versions[-1] if versions else None
+        cached = sorted(
+            (p for p in self.cache_dir.iterdir() if p.is_dir() and p.name in versions),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        others = [p for p in cached if p.name not in (head, keep)]
+        limit = max(0, self.cache_size - 1 - (keep != head))
+        for p in others[limit:]:
+            shutil.rmtree(p, ignore_errors=True)
+
+    def _materialize(self, version: str, base: Optional[Path], dest: Path) -> None:
+        """Dựng version vào dest từ base (thư mục version trước; None nếu snapshot)."""
+        e = self.entry(version)
+        if e["kind"] == "snapshot":
+            deltas = {
+                name: {"op": "blob", "sha256": info["sha256"]}
+                for name, info in e["files"].items()
+            }
+        else:
+            deltas = self._load_delta(version)["files"]
+        for name, delta in deltas.items():
+            (dest / name).parent.mkdir(parents=True, exist_ok=True)
+            self._apply_file(delta, base / name if base else None, dest / name)
+
+    def _verify(self, version: str, path: Path) -> None:
+        for name, info in self.entry(version)["files"].items():
+            if file_sha256(path / name) != info["sha256"]:
+                raise RuntimeError(f"Reconstructed {version}/{name} differs from index")
+
+    def reconstruct(self, version: str, dest: Optional[Path] = None) -> Path:
+        """
+        Dựng lại version (thư mục chứa đúng các file đã lưu) và trả về đường dẫn:
+        mặc định là thư mục trong cache (không được sửa), hoặc copy ra dest.
+        """
+        versions = self.versions()
+        if version not in versions:
+            raise KeyError(f"Version {version} is not in the store")
+
+        path = self._cached(version)
+        if path is None:
+            i = versions.index(version)
+            start = i
+            while (
+                self.entry(versions[start])["kind"] != "snapshot"
+                and self._cached(versions[start]) is None
+            ):
+                start -= 1
+            with tempfile.TemporaryDirectory(dir=self._work_root()) as work:
+                current = self._cached(versions[start])
+                first = start + 1 if current is not None else start
+                for j in range(first, i + 1):
+                    built = Path(work) / versions[j]
+                    built.mkdir()
+                    self._materialize(versions[j], current, built)
+                    if current is not None and current.parent == Path(work):
+                        shutil.rmtree(current)
+                    current = built
+                self._verify(version, current)
+                path = self._cache_commit(version, current)
+            logging.info(
+                f"Reconstructed {version} from {versions[start]} "
+                f"({i - start} deltas)"
+            )
+        os.utime(path)
+
+        if dest is None:
+            return path
+        if dest.exists():
+            raise FileExistsError(f"Destination already exists: {dest}")
+        shutil.copytree(path, dest)
+        return dest
+
+    def stats(self) -> Dict[str, int]:
+        """Kích thước kho so với tổng kích thước các version nếu lưu đầy đủ."""
+        stored = sum(p.stat().st_size for p in self.root.rglob("*") if p.is_file())
+        full = sum(
+            info["size"]
+            for e in self._index["versions"]
+            for info in e["files"].values()
+        )
+        return {
+            "versions": len(self._index["versions"]),
+            "stored_bytes": stored,
+            "full_bytes": full,
+        }
+
+
+def import_output_tree(
+    store: VersionStore, output_root: Path = OUTPUT_DIR, prune: bool = False
+) -> List[str]:
+    """
+    Thêm vào kho các version trong output/ mới hơn version cuối của kho (theo thứ tự
+    version). prune=True: xóa output/<version> đã nằm trong kho (trừ version mới
+    nhất) sau khi kiểm tra dựng lại đúng.
+    """
+    added = []
+    for version in list_versions(output_root):
+        stored = store.versions()
+        if version in stored:
+            continue
+        if stored and version_key(version) < version_key(stored[-1]):
+            logging.warning(f"Skipping {version}: older than latest stored version")
+            continue
+        store.add_version(version, output_root / version)
+        added.append(version)
+
+    if prune:
+        stored = store.versions()
+        for version in list_versions(output_root)[:-1]:
+            if version not in stored:
+                continue
+            src = output_root / version
+            hashes = {n: file_sha256(p) for n, p in version_files(src).items()}
+            expected = {
+                n: info["sha256"] for n, info in store.entry(version)["files"].items()
+            }
+            if hashes != expected:
+                logging.warning(f"Not pruning {version}: differs from stored copy")
+                continue
+            store.reconstruct(version)
+            shutil.rmtree(src)
+            logging.info(f"Pruned {src}")
+    return added
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Delta-encoded store of output versions")
+    sub = ap.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Thêm các version mới trong output/ vào kho")
+    imp.add_argument(
+        "--prune",
+        action="store_true",
+        help="Xóa output/<version> đã lưu (trừ version mới nhất)",
+    )
+    add = sub.add_parser("add", help="Thêm một thư mục version vào cuối kho")
+    add.add_argument("version")
+    add.add_argument("src", type=Path, nargs="?", help="Mặc định output/<version>")
+    checkout = sub.add_parser("checkout", help="Dựng lại một version ra thư mục")
+    checkout.add_argument("version")
+    checkout.add_argument("dest", type=Path)
+    sub.add_parser("list", help="Liệt kê các version trong kho")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    store = VersionStore()
+    try:
+        if args.command == "import":
+            added = import_output_tree(store, prune=args.prune)
+            print(f"Added {len(added)} version(s): {', '.join(added) or '-'}")
+        elif args.command == "add":
+            src = args.src or OUTPUT_DIR / args.version
+            print(f"{args.version}: {store.add_version(args.version, src)}")
+        elif args.command == "checkout":
+            print(store.reconstruct(args.version, args.dest))
+        else:
+            for e in store.entries():
+                print(f"{e['version']:<16} {e['kind']:<9} {len(e['files'])} files")
+            s = store.stats()
+            print(
+                f"{s['versions']} versions, {s['stored_bytes'] / 1e6:.1f} MB stored "
+                f"({s['full_bytes'] / 1e6:.1f} MB as full copies)"
+            )
+    except (KeyError, ValueError, OSError) as e:
+        logging.error(e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from src import differ
+
+HEADER = "id,English,Vietnamese\n"
+
+
+def _write_csv(path, rows: str):
+    path.write_text(HEADER + rows, encoding="utf-8")
+    return path
+
+
+def _changes(old_csv, new_csv, presorted=True):
+    return [
+        (c.key, c.op, c.fields)
+        for c in differ.diff_i2(old_csv, new_csv, presorted=presorted)
+    ]
+
+
+def test_merge_join_keeps_last_value_of_duplicate_keys():
+    old = [("a", 1), ("b", 2), ("b", 3), ("c", 4)]
+    new = [("a", 1), ("a", 5), ("b", 3), ("d", 6)]
+    assert list(differ.merge_join(old, new)) == [
+        ("a", 1, 5),
+        ("b", 3, 3),
+        ("c", 4, None),
+        ("d", None, 6),
+    ]
+
+
+@pytest.mark.parametrize("presorted", [True, False])
+def test_diff_i2_accepts_duplicate_keys(tmp_path, presorted):
+    old_csv = _write_csv(
+        tmp_path / "old.csv", "a,Apple,Táo\nb,Bee,Ong\nb,Bee,Con ong\nc,Cat,Mèo\n"
+    )
+    new_csv = _write_csv(
+        tmp_path / "new.csv", "a,Apple,Táo\nb,Bee,Con ong\nc,Cat,Mèo\nc,Cat,Con mèo\n"
+    )
+    assert _changes(old_csv, new_csv, presorted) == [
+        ("c", "changed", {"Vietnamese": ["Mèo", "Con mèo"]}),
+    ]
+
+
+def test_diff_i2_rejects_unsorted_csv(tmp_path):
+    old_csv = _write_csv(tmp_path / "old.csv", "a,Apple,Táo\n")
+    new_csv = _write_csv(tmp_path / "new.csv", "b,Bee,Ong\na,Apple,Táo\n")
+    with pytest.raises(ValueError, match="not sorted"):
+        _changes(old_csv, new_csv)
+    assert _changes(old_csv, new_csv, presorted=False) == [
+        ("b", "added", {"English": [None, "Bee"], "Vietnamese": [None, "Ong"]}),
+    ]
+
+
+def test_diff_json_with_duplicate_ids(tmp_path):
+    old_path = tmp_path / "old" / "pets_info.json"
+    new_path = tmp_path / "new" / "pets_info.json"
+    for path, pets in [
+        (old_path, [{"id": "p1", "hp": 1}, {"id": "p1", "hp": 2}]),
+        (new_path, [{"id": "p1", "hp": 2}, {"id": "p2", "hp": 3}]),
+    ]:
+        path.parent.mkdir()
+        path.write_text(json.dumps(pets))
+
+    changes = list(differ.diff_json(old_path, new_path))
+    assert [(c.key, c.op) for c in changes] == [("p2", "added")]
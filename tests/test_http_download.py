@@ -0,0 +1,249 @@
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Optional, Tuple
+
+import pytest
+import requests
+
+from src import http_download
+
+_RANGE = re.compile(r"bytes=(\d+)-(\d*)\Z")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Server thay thế: trả về server.data, có/không hỗ trợ Range, có thể cắt kết nối."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self._respond(head=True)
+
+    def do_GET(self) -> None:
+        self._respond(head=False)
+
+    def _respond(self, head: bool) -> None:
+        server: "_Server" = self.server
+        data = server.data
+        header = self.headers.get("Range")
+        server.log(self.command, header)
+
+        start, end = 0, len(data) - 1
+        m = _RANGE.match(header or "") if server.ranges else None
+        if m:
+            start = int(m.group(1))
+            end = min(int(m.group(2)) if m.group(2) else end, len(data) - 1)
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        if server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        body = data[start : end + 1]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if head:
+            return
+
+        # Không cắt request probe (bytes=0-0) của http_download.probe
+        if header != "bytes=0-0" and server.take_drop():
+            # Gửi nửa body rồi đóng kết nối (client thấy response bị cắt giữa chừng)
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, data: bytes, ranges: bool, drops: int) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.data = data
+        self.ranges = ranges
+        self.drops = drops
+        self.requests: List[Tuple[str, Optional[str]]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/data.bin"
+
+    def log(self, method: str, range_header: Optional[str]) -> None:
+        with self._lock:
+            self.requests.append((method, range_header))
+
+    def take_drop(self) -> bool:
+        with self._lock:
+            if self.drops <= 0:
+                return False
+            self.drops -= 1
+            return True
+
+    def ranges_requested(self) -> List[str]:
+        return [r for m, r in self.requests if m == "GET" and r and r != "bytes=0-0"]
+
+
+@pytest.fixture
+def serve() -> Iterator:
+    servers: List[_Server] = []
+
+    def start(data: bytes, ranges: bool = True, drops: int = 0) -> _Server:
+        server = _Server(data, ranges, drops)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def parallel_always(monkeypatch) -> None:
+    monkeypatch.setattr(http_download, "DOWNLOAD_PARALLEL_MIN_SIZE", 0)
+
+
+SEGMENT = 64 * 1024
+DATA = os.urandom(5 * SEGMENT + 1234)
+
+
+def _download(server: _Server, dest, **kwargs):
+    with requests.Session() as session:
+        return http_download.download(
+            server.url,
+            dest,
+            session=session,
+            segment_size=SEGMENT,
+            chunk_size=4096,
+            backoff=0,
+            **kwargs,
+        )
+
+
+def _assert_complete(dest) -> None:
+    assert dest.read_bytes() == DATA
+    assert not dest.with_name(dest.name + ".part").exists()
+    assert not dest.with_name(dest.name + ".part.json").exists()
+
+
+def test_probe_reports_size_and_range_support(serve):
+    with requests.Session() as session:
+        assert http_download.probe(session, serve(DATA).url) == (len(DATA), True)
+        assert http_download.probe(session, serve(DATA, ranges=False).url) == (
+            len(DATA),
+            False,
+        )
+
+
+def test_parallel_ranged_download(serve, parallel_always, tmp_path):
+    server = serve(DATA)
+    dest = _download(server, tmp_path / "data.bin", workers=4)
+
+    _assert_complete(dest)
+    expected = [
+        f"bytes={start}-{min(start + SEGMENT, len(DATA)) - 1}"
+        for start in range(0, len(DATA), SEGMENT)
+    ]
+    assert sorted(server.ranges_requested()) == sorted(expected)
+
+
+def test_streams_without_accept_ranges(serve, parallel_always, tmp_path):
+    server = serve(DATA, ranges=False)
+    dest = _download(server, tmp_path / "data.bin", workers=4)
+
+    _assert_complete(dest)
+    # Một GET tải cả file, không có request theo segment
+    assert len([m for m, r in server.requests if m == "GET" and r is None]) == 1
+
+
+def test_resumes_parallel_download_from_state(serve, parallel_always, tmp_path):
+    server = serve(DATA)
+    dest = tmp_path / "data.bin"
+    part = tmp_path / "data.bin.part"
+    segments = [
+        [start, min(start + SEGMENT, len(DATA)) - 1]
+        for start in range(0, len(DATA), SEGMENT)
+    ]
+    done = [0] * len(segments)
+    done[0] = SEGMENT  # segment 0 đã xong
+    done[1] = SEGMENT // 2  # segment 1 mới tải một nửa
+
+    content = bytearray(len(DATA))
+    content[:SEGMENT] = DATA[:SEGMENT]
+    content[SEGMENT : SEGMENT + SEGMENT // 2] = DATA[SEGMENT : SEGMENT + SEGMENT // 2]
+    part.write_bytes(bytes(content))
+    (tmp_path / "data.bin.part.json").write_text(
+        json.dumps(
+            {"url": server.url, "size": len(DATA), "segments": segments, "done": done}
+        )
+    )
+
+    _download(server, dest, workers=4)
+
+    _assert_complete(dest)
+    requested = server.ranges_requested()
+    assert f"bytes=0-{SEGMENT - 1}" not in requested
+    assert f"bytes={SEGMENT + SEGMENT // 2}-{2 * SEGMENT - 1}" in requested
+    assert len(requested) == len(segments) - 1
+
+
+def test_resumes_streaming_download_from_part(serve, tmp_path):
+    # Nhỏ hơn DOWNLOAD_PARALLEL_MIN_SIZE nên tải tuần tự, tiếp tục từ cuối .part
+    server = serve(DATA)
+    dest = tmp_path / "data.bin"
+    (tmp_path / "data.bin.part").write_bytes(DATA[:1000])
+
+    _download(server, dest)
+
+    _assert_complete(dest)
+    assert server.ranges_requested() == ["bytes=1000-"]
+
+
+def test_retries_dropped_segment(serve, parallel_always, tmp_path):
+    server = serve(DATA, drops=2)
+    dest = _download(server, tmp_path / "data.bin", workers=2)
+
+    _assert_complete(dest)
+    assert server.drops == 0
+    # Segment bị cắt được tải tiếp từ byte đã nhận, không tải lại từ đầu segment
+    segment_starts = set(range(0, len(DATA), SEGMENT))
+    resumed = [
+        r
+        for r in server.ranges_requested()
+        if int(_RANGE.match(r).group(1)) not in segment_starts
+    ]
+    assert len(resumed) == 2
+
+
+@pytest.mark.parametrize("ranges", [True, False])
+def test_retries_dropped_stream(serve, tmp_path, ranges):
+    server = serve(DATA, ranges=ranges, drops=1)
+    dest = _download(server, tmp_path / "data.bin")
+
+    _assert_complete(dest)
+    assert server.drops == 0
+    if ranges:
+        # Lần thử lại tiếp tục từ cuối .part (phần đã nhận trước khi bị cắt)
+        (resumed,) = server.ranges_requested()
+        assert 0 < int(_RANGE.match(resumed).group(1)) <= len(DATA) // 2
+
+
+def test_gives_up_after_retries(serve, tmp_path):
+    server = serve(DATA, ranges=False, drops=10)
+    with pytest.raises(requests.RequestException):
+        _download(server, tmp_path / "data.bin", retries=2)
+    assert server.drops == 7
@@ -0,0 +1,30 @@
+from src import manifest, output_writer
+
+
+def test_rebuild_with_same_outputs_keeps_manifest(tmp_path):
+    output_dir = tmp_path / "1.0.0"
+    output_dir.mkdir()
+    (output_dir / "weapons.json").write_text("[]")
+    i2 = tmp_path / "I2Languages.dat"
+    i2.write_bytes(b"i2")
+
+    path = manifest.write_manifest("1.0.0", output_dir, {"i2languages": i2})
+    first = path.read_bytes()
+    mtime = path.stat().st_mtime_ns
+
+    output_writer.reset()
+    manifest.write_manifest("1.0.0", output_dir, {"i2languages": i2})
+
+    assert path.read_bytes() == first
+    assert path.stat().st_mtime_ns == mtime
+    assert output_writer.results() == {str(path): False}
+    assert manifest.is_version_complete("1.0.0", output_dir)
+
+
+def test_manifest_detects_modified_output(tmp_path):
+    (tmp_path / "weapons.json").write_text("[]")
+    manifest.write_manifest("1.0.0", tmp_path, {})
+    assert manifest.is_version_complete("1.0.0", tmp_path)
+
+    (tmp_path / "weapons.json").write_text("[1]")
+    assert not manifest.is_version_complete("1.0.0", tmp_path)
@@ -0,0 +1,56 @@
+import gzip
+
+import pytest
+
+from src import output_writer
+from src.output_writer import OutputProfile
+
+
+@pytest.fixture(autouse=True)
+def restore_profile():
+    profile = output_writer.get_profile()
+    output_writer.reset()
+    yield
+    output_writer.set_profile(profile)
+    output_writer.reset()
+
+
+def _write_all(tmp_path) -> None:
+    output_writer.write_json(tmp_path / "data.json", {"a": 1})
+    with output_writer.open_atomic(tmp_path / "data.csv") as f:
+        f.write("key,value\n")
+    src = tmp_path / "src.json"
+    src.write_bytes(b"{}")
+    output_writer.copy_file(src, tmp_path / "copy.json")
+
+
+OUTPUTS = ("data.json", "data.csv", "copy.json")
+
+
+def test_switching_profile_removes_stale_siblings(tmp_path):
+    output_writer.set_profile(OutputProfile("pretty", ("gzip",)))
+    _write_all(tmp_path)
+    for name in OUTPUTS:
+        sibling = tmp_path / (name + ".gz")
+        assert gzip.decompress(sibling.read_bytes()) == (tmp_path / name).read_bytes()
+
+    output_writer.reset()
+    output_writer.set_profile(OutputProfile("pretty", ()))
+    _write_all(tmp_path)
+
+    assert not list(tmp_path.glob("*.gz"))
+    # Xóa bản nén cũ cũng là một thay đổi trong output
+    changed = output_writer.summary()["changed"]
+    assert sorted(changed) == sorted(str(tmp_path / (n + ".gz")) for n in OUTPUTS)
+
+
+def test_unchanged_profile_keeps_siblings(tmp_path):
+    output_writer.set_profile(OutputProfile("pretty", ("gzip",)))
+    _write_all(tmp_path)
+    output_writer.reset()
+    _write_all(tmp_path)
+
+    assert sorted(p.name for p in tmp_path.glob("*.gz")) == sorted(
+        n + ".gz" for n in OUTPUTS
+    )
+    assert output_writer.summary()["changed"] == []
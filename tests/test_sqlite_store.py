@@ -0,0 +1,47 @@
+import itertools
+import json
+
+from src import sqlite_store
+from src.language_table import LanguageTable
+
+CSV = "id,English,Vietnamese\nweapon/weapon_001,Bad Pistol,Súng lục\n"
+
+
+def _write_output(root, version: str, rarity: int):
+    version_dir = root / version
+    version_dir.mkdir(parents=True)
+    (version_dir / "I2language.csv").write_text(CSV, encoding="utf-8")
+    weapons = [{"id": "weapon_001", "english_name": "Bad Pistol", "rarity": rarity}]
+    (version_dir / "all_weapons_info.json").write_text(json.dumps(weapons))
+    items = {"weaponItemInfos": [{"name": "weapon_001", "price": 10}]}
+    (version_dir / "weapon_items.json").write_text(json.dumps(items))
+    return version_dir
+
+
+def test_main_and_output_loads_record_the_same_weapon_facts(tmp_path):
+    output_root = tmp_path / "output"
+    first = _write_output(output_root, "1.0.0", rarity=0)
+    _write_output(output_root, "1.1.0", rarity=0)
+    _write_output(output_root, "1.2.0", rarity=1)
+
+    with sqlite_store.SQLiteStore(tmp_path / "db.sqlite3") as store:
+        # 1.0.0 nạp như main (bảng trong RAM + output/<version>)
+        table = LanguageTable.from_csv(first / "I2language.csv")
+        facts = itertools.chain(
+            sqlite_store.table_facts(table), sqlite_store.weapon_output_facts(first)
+        )
+        assert store.load_version("1.0.0", facts, "hash")
+        # Các version sau nạp từ output/
+        assert sqlite_store.load_output_version(store, "1.1.0", output_root)
+        assert sqlite_store.load_output_version(store, "1.2.0", output_root)
+
+        weapon = store.history("weapon_001", language="")
+        assert [(s, f, t) for s, _, _, f, t in weapon] == [
+            ("weapon_info", "1.0.0", "1.1.0"),
+            ("weapon_info", "1.2.0", None),
+            ("weapon_items", "1.0.0", None),
+        ]
+        i2 = store.history("weapon/weapon_001", language="English", source="i2")
+        assert [(text, f, t) for _, _, text, f, t in i2] == [
+            ("Bad Pistol", "1.0.0", None)
+        ]
@@ -0,0 +1,348 @@
+import io
+import lzma
+import random
+import struct
+from typing import List, Tuple
+
+import pytest
+
+from src import object_index, unityfs
+
+# lz4 là dependency tùy chọn của unityfs; test cần nó để nén và làm mốc so sánh
+lz4 = pytest.importorskip("lz4")
+import lz4.block  # noqa: E402
+
+# --- Dựng bundle UnityFS tổng hợp trong bộ nhớ ---
+
+_LZ4 = 2
+_LZMA = 1
+_NONE = 0
+
+
+def _lzma_compress(data: bytes) -> bytes:
+    # Định dạng Unity: 5 byte properties (lc=3, lp=0, pb=2, dict 64KB) + dữ liệu raw
+    dict_size = 1 << 16
+    filters = [
+        {"id": lzma.FILTER_LZMA1, "dict_size": dict_size, "lc": 3, "lp": 0, "pb": 2}
+    ]
+    raw = lzma.compress(data, format=lzma.FORMAT_RAW, filters=filters)
+    return bytes([(2 * 5 + 0) * 9 + 3]) + struct.pack("<I", dict_size) + raw
+
+
+def _compress(data: bytes, compression: int) -> bytes:
+    if compression == _LZ4:
+        return lz4.block.compress(data, store_size=False)
+    if compression == _LZMA:
+        return _lzma_compress(data)
+    return data
+
+
+def _aligned_string(s: str, e: str) -> bytes:
+    b = s.encode()
+    return struct.pack(e + "i", len(b)) + b + b"\0" * (-len(b) % 4)
+
+
+def text_asset(name: str, content: bytes, e: str = "<") -> bytes:
+    return (
+        _aligned_string(name, e)
+        + struct.pack(e + "i", len(content))
+        + content
+        + b"\0" * (-len(content) % 4)
+    )
+
+
+def mono_behaviour(name: str, payload: bytes, e: str = "<") -> bytes:
+    # m_GameObject (PPtr), m_Enabled (align 4), m_Script (PPtr), m_Name, dữ liệu
+    return (
+        struct.pack(e + "iq", 0, 1)
+        + b"\x01\0\0\0"
+        + struct.pack(e + "iq", 0, 2)
+        + _aligned_string(name, e)
+        + payload
+    )
+
+
+def serialized_file(
+    objects: List[Tuple[int, int, bytes]],
+    version: int = 22,
+    e: str = "<",
+    type_tree: bool = False,
+) -> bytes:
+    """SerializedFile với các object (path_id, class_id, bytes)."""
+    classes = sorted({class_id for _, class_id, _ in objects})
+    meta = io.BytesIO()
+    meta.write(b"2021.3.5f1\0" + struct.pack(e + "i", 13) + bytes([type_tree]))
+    meta.write(struct.pack(e + "i", len(classes)))
+    for class_id in classes:
+        meta.write(struct.pack(e + "i", class_id))
+        if version >= 16:
+            meta.write(b"\0")
+        if version >= 17:
+            meta.write(struct.pack(e + "h", -1))
+        if class_id == 114 and version >= 16:
+            meta.write(b"S" * 16)
+        meta.write(b"H" * 16)
+        if type_tree:
+            node_count, string_size = 2, 10
+            meta.write(struct.pack(e + "ii", node_count, string_size))
+            meta.write(b"N" * (node_count * (32 if version >= 19 else 24)))
+            meta.write(b"s" * string_size)
+            if version >= 21:
+                meta.write(struct.pack(e + "ii", 1, 0))
+
+    header_size = 48 if version >= 22 else 20
+    meta.write(struct.pack(e + "i", len(objects)))
+    data = io.BytesIO()
+    for path_id, class_id, body in objects:
+        meta.write(b"\0" * (-(header_size + meta.tell()) % 4))
+        meta.write(struct.pack(e + "q", path_id))
+        offset = data.tell()
+        meta.write(struct.pack(e + ("q" if version >= 22 else "I"), offset))
+        meta.write(struct.pack(e + "I", len(body)))
+        if version >= 16:
+            meta.write(struct.pack(e + "i", classes.index(class_id)))
+        else:
+            meta.write(struct.pack(e + "iH", class_id, class_id))
+        if 11 <= version < 17:
+            meta.write(struct.pack(e + "h", -1))
+        if version in (15, 16):
+            meta.write(b"\0")
+        data.write(body + b"\0" * (-len(body) % 8))
+    meta.write(struct.pack(e + "iii", 0, 0, 0))
+
+    metadata = meta.getvalue()
+    data_offset = header_size + len(metadata)
+    data_offset += -data_offset % 16
+    out = io.BytesIO()
+    endian = bytes([e == ">", 0, 0, 0])
+    if version >= 22:
+        out.write(struct.pack(">IIII", 0, 0, version, 0) + endian)
+        out.write(struct.pack(">IqqQ", len(metadata), 0, data_offset, 0))
+    else:
+        out.write(struct.pack(">IIII", len(metadata), 0, version, data_offset) + endian)
+    out.write(metadata)
+    out.write(b"\0" * (data_offset - out.tell()))
+    out.write(data.getvalue())
+    return out.getvalue()
+
+
+def unityfs_bundle(
+    nodes: List[Tuple[str, bytes, int]],
+    compression: int = _LZ4,
+    block_size: int = 1 << 12,
+    info_at_end: bool = False,
+) -> bytes:
+    """Bundle UnityFS (format 8) từ các node (path, dữ liệu, flags)."""
+    stream = b"".join(data for _, data, _ in nodes)
+    blocks = []
+    for i in range(0, len(stream), block_size):
+        chunk = stream[i : i + block_size]
+        blocks.append((chunk, _compress(chunk, compression)))
+
+    info = io.BytesIO()
+    info.write(b"\0" * 16 + struct.pack(">i", len(blocks)))
+    for raw, packed in blocks:
+        info.write(struct.pack(">IIH", len(raw), len(packed), compression))
+    info.write(struct.pack(">i", len(nodes)))
+    offset = 0
+    for path, data, flags in nodes:
+        info.write(struct.pack(">qqI", offset, len(data), flags))
+        info.write(path.encode() + b"\0")
+        offset += len(data)
+    info_raw = info.getvalue()
+    info_packed = _compress(info_raw, compression)
+
+    flags = compression | 0x40 | 0x200 | (0x80 if info_at_end else 0)
+    out = io.BytesIO()
+    out.write(b"UnityFS\0" + struct.pack(">I", 8) + b"5.x.x\0" + b"2021.3.5f1\0")
+    out.write(struct.pack(">qIII", 0, len(info_packed), len(info_raw), flags))
+    out.write(b"\0" * (-out.tell() % 16))
+    if not info_at_end:
+        out.write(info_packed)
+        out.write(b"\0" * (-out.tell() % 16))
+    for _, packed in blocks:
+        out.write(packed)
+    if info_at_end:
+        out.write(info_packed)
+    return out.getvalue()
+
+
+WEAPON_INFO = b'{"weapons": [{"name": "weapon_1"}]}' * 40
+I2_PAYLOAD = bytes(random.Random(1).choice(b"abcdefgh\0") for _ in range(50_000))
+
+
+def _objects(e: str = "<") -> List[Tuple[int, int, bytes]]:
+    return [
+        (1, 49, text_asset("WeaponInfo", WEAPON_INFO, e)),
+        (2, 49, text_asset("WeaponItem", b"item" * 10, e)),
+        (3, 114, mono_behaviour("I2Languages", I2_PAYLOAD, e)),
+        (4, 49, text_asset("Other", b"zz", e)),
+        (5, 1, b"\0" * 40),  # GameObject: không được index
+    ]
+
+
+def _write_bundle(tmp_path, **kwargs):
+    path = tmp_path / "data.unity3d"
+    nodes = [
+        ("CAB-abc", serialized_file(_objects()), 4),
+        ("CAB-abc.resS", b"R" * 5000, 0),
+    ]
+    path.write_bytes(unityfs_bundle(nodes, **kwargs))
+    return path, b"".join(data for _, data, _ in nodes)
+
+
+# --- Tests ---
+
+
+@pytest.mark.parametrize("compression", [_NONE, _LZ4, _LZMA])
+@pytest.mark.parametrize("info_at_end", [False, True])
+def test_reads_header_blocks_and_nodes(tmp_path, compression, info_at_end):
+    path, stream = _write_bundle(
+        tmp_path, compression=compression, info_at_end=info_at_end
+    )
+    with unityfs.UnityFSBundle(path) as bundle:
+        assert bundle.format_version == 8
+        assert bundle.unity_revision == "2021.3.5f1"
+        assert [(n.path, n.size) for n in bundle.nodes] == [
+            ("CAB-abc", len(stream) - 5000),
+            ("CAB-abc.resS", 5000),
+        ]
+        assert [n.path for n in bundle.serialized_nodes()] == ["CAB-abc"]
+        assert len(bundle.blocks) == -(-len(stream) // 4096)
+        assert all(b.flags == compression for b in bundle.blocks)
+        assert bundle.data_size == len(stream)
+
+        # Đọc vắt qua ranh giới block
+        assert bundle.read_range(4000, 5000) == stream[4000:9000]
+        assert bundle.read_range(0, len(stream)) == stream
+        assert bundle.block_index(4095) == 0 and bundle.block_index(4096) == 1
+        with pytest.raises(unityfs.UnityFSError):
+            bundle.read_range(len(stream) - 10, 20)
+
+
+def test_rejects_other_signatures(tmp_path):
+    path = tmp_path / "data.unity3d"
+    path.write_bytes(b"UnityWeb\0" + b"\0" * 64)
+    with pytest.raises(unityfs.UnityFSError):
+        unityfs.UnityFSBundle(path)
+
+
+_LZ4_SAMPLES = {
+    "random": random.Random(2).randbytes(70_000),
+    "repetitive": b"abcabcabd" * 5000,
+    "overlapping": b"a" * 10_000 + b"b" + b"ab" * 3000,
+    "long_literals": random.Random(3).randbytes(300) + b"x" * 1000,
+    "text": b" ".join(b"word%d" % (i % 97) for i in range(20_000)),
+    "tiny": b"abc",
+}
+
+
+@pytest.mark.parametrize("name", sorted(_LZ4_SAMPLES))
+@pytest.mark.parametrize("mode", ["default", "high_compression"])
+def test_pure_python_lz4_matches_lz4_package(monkeypatch, name, mode):
+    data = _LZ4_SAMPLES[name]
+    packed = lz4.block.compress(data, mode=mode, store_size=False)
+    expected = lz4.block.decompress(packed, uncompressed_size=len(data))
+
+    monkeypatch.setattr(unityfs, "_lz4_block", None)
+    assert unityfs.lz4_block_decompress(packed, len(data)) == expected == data
+    with pytest.raises(unityfs.UnityFSError):
+        unityfs.lz4_block_decompress(packed, len(data) + 1)
+
+
+def test_lzma_block_round_trip():
+    data = b"I2Languages" * 3000
+    assert unityfs.lzma_decompress(_lzma_compress(data), len(data)) == data
+
+
+@pytest.mark.parametrize(
+    "version, e, type_tree",
+    [
+        (22, "<", False),
+        (21, ">", True),
+        (17, "<", True),
+        (15, "<", True),
+        (14, "<", False),
+    ],
+)
+def test_iter_objects_and_read_text_asset(tmp_path, version, e, type_tree):
+    path = tmp_path / "data.unity3d"
+    node = serialized_file(_objects(e), version, e, type_tree)
+    path.write_bytes(unityfs_bundle([("CAB-x", node, 4)]))
+    with unityfs.UnityFSBundle(path) as bundle:
+        objects = {o.path_id: o for o in bundle.iter_objects()}
+        assert {i: o.name for i, o in objects.items()} == {
+            1: "WeaponInfo",
+            2: "WeaponItem",
+            3: "I2Languages",
+            4: "Other",
+            5: "",
+        }
+        assert all(o.big_endian == (e == ">") for o in objects.values())
+        assert unityfs.read_text_asset(bundle, objects[1]) == WEAPON_INFO
+        assert unityfs.read_text_asset(bundle, objects[2]) == b"item" * 10
+        assert unityfs.read_object(bundle, objects[3]) == mono_behaviour(
+            "I2Languages", I2_PAYLOAD, e
+        )
+        text_assets = bundle.iter_objects([unityfs.CLASS_IDS["textasset"]])
+        assert sorted(o.path_id for o in text_assets) == [1, 2, 4]
+
+
+def test_object_index_find(tmp_path):
+    path, _ = _write_bundle(tmp_path)
+    with unityfs.UnityFSBundle(path) as bundle:
+        index = object_index.build_index(bundle, "hash")
+
+        assert len(index) == 4
+        assert [o.name for o in index.find("textasset")] == [
+            "WeaponInfo",
+            "WeaponItem",
+            "Other",
+        ]
+        assert [o.name for o in index.find("TextAsset", "weapon")] == [
+            "WeaponInfo",
+            "WeaponItem",
+        ]
+        i2 = index.find("monobehaviour", "i2lang")
+        assert [o.name for o in i2] == ["I2Languages"]
+        assert [o.name for o in index.find(None, "other")] == ["Other"]
+        assert index.find("textasset", "i2languages") == []
+        assert index.find("monobehaviour", "missing") == []
+
+        (entry,) = index.find("textasset", "WeaponInfo")
+        info = object_index.object_info(bundle, entry)
+        assert unityfs.read_text_asset(bundle, info) == WEAPON_INFO
+
+    restored = object_index.ObjectIndex.from_json(index.to_json())
+    assert restored.objects == index.objects
+
+
+def test_skips_nodes_without_serialized_flag(tmp_path):
+    # data.unity3d thật có node JSON (flags=0) cạnh các SerializedFile
+    path = tmp_path / "data.unity3d"
+    nodes = [
+        ("ScriptingAssemblies.json", b'{"names": ["Assembly-CSharp.dll"]}', 0),
+        ("CAB-abc", serialized_file(_objects()), 4),
+        ("RuntimeInitializeOnLoads.json", b'{"root": []}', 0),
+    ]
+    path.write_bytes(unityfs_bundle(nodes))
+    with unityfs.UnityFSBundle(path) as bundle:
+        assert [n.path for n in bundle.serialized_nodes()] == ["CAB-abc"]
+        index = object_index.build_index(bundle, "hash")
+        assert [o.name for o in index.find("textasset", "weapon")] == [
+            "WeaponInfo",
+            "WeaponItem",
+        ]
+
+
+def test_load_or_build_index_caches_by_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(object_index, "OBJECT_INDEX_DIR", tmp_path / "objects")
+    path, _ = _write_bundle(tmp_path)
+
+    built = object_index.load_or_build_index(path, bundle_hash="abc")
+    assert (tmp_path / "objects" / "abc.json").exists()
+
+    # Lần sau đọc từ cache, không mở bundle
+    path.write_bytes(b"not a bundle")
+    cached = object_index.load_or_build_index(path, bundle_hash="abc")
+    assert cached.objects == built.objects
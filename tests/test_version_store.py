@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from src.version_store import VersionStore
+
+
+def _add_versions(store: VersionStore, tmp_path, count: int) -> None:
+    for i in range(count):
+        src = tmp_path / "output" / f"1.{i}"
+        src.mkdir(parents=True)
+        weapons = [{"id": j, "name": f"weapon_{j}", "rev": i} for j in range(20)]
+        (src / "weapons.json").write_text(json.dumps(weapons, indent=2))
+        (src / "notes.txt").write_text(f"version {i}\n")
+        store.add_version(f"1.{i}", src)
+
+
+@pytest.mark.parametrize("cache_size", [1, 2, 4])
+def test_reconstructs_non_head_versions_with_small_cache(tmp_path, cache_size):
+    store = VersionStore(
+        root=tmp_path / "history",
+        cache_dir=tmp_path / "cache",
+        snapshot_interval=3,
+        cache_size=cache_size,
+    )
+    _add_versions(store, tmp_path, 5)
+
+    for version in ["1.1", "1.3", "1.0", "1.4", "1.2"]:
+        path = store.reconstruct(version)
+        for name in ("weapons.json", "notes.txt"):
+            expected = tmp_path / "output" / version / name
+            assert (path / name).read_bytes() == expected.read_bytes()
+
+    cached = {p.name for p in (tmp_path / "cache").iterdir() if p.is_dir()}
+    # Version cuối + tối đa cache_size - 1 version khác; version vừa dựng luôn còn
+    assert "1.2" in cached
+    assert len(cached - {"1.4"}) <= max(1, cache_size - 1)
+
+
+def test_reconstruct_copies_to_dest(tmp_path):
+    store = VersionStore(
+        root=tmp_path / "history", cache_dir=tmp_path / "cache", cache_size=1
+    )
+    _add_versions(store, tmp_path, 3)
+
+    dest = store.reconstruct("1.0", tmp_path / "restored")
+    assert (dest / "notes.txt").read_text() == "version 0\n"
+    with pytest.raises(FileExistsError):
+        store.reconstruct("1.0", dest)